@@ -5,12 +5,15 @@ Hệ thống Tư vấn Lộ trình Học tập Cá nhân hóa
 """
 
 import streamlit as st
-import json
-import networkx as nx  
-from pyvis.network import Network  
-import tempfile
 import os
+import sqlite3
 from reasoning_engine import ReasoningEngine
+from cache import HTMLCache, make_cache_key
+from graph_view import (GRAPH_LAYOUTS, build_graph_data, create_prerequisite_graph, get_graph_options,
+                        render_graph_component, visualize_graph)
+from knowledge_snapshot import thaw
+from student_store import StudentStore
+from what_if import WhatIfSimulator
 
 
 # Page configuration
@@ -122,10 +125,70 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+# GRAPH_RENDERER=pyvis sends a self-contained HTML document per rerun instead of
+# the lightweight component (kept for environments that block component assets)
+GRAPH_RENDERER = os.environ.get('GRAPH_RENDERER', 'component')
+
+
 @st.cache_resource
 def load_reasoning_engine():
     """Load and cache reasoning engine"""
-    return ReasoningEngine()
+    # KB_BACKEND=sqlite answers course filters with indexed queries instead of list scans
+    return ReasoningEngine(backend=os.environ.get('KB_BACKEND', 'json'))
+
+
+@st.cache_resource
+def load_graph_cache():
+    """Load and cache rendered graph HTML (set GRAPH_CACHE_DIR to enable the disk tier)"""
+    return HTMLCache(max_entries=64, disk_dir=os.environ.get('GRAPH_CACHE_DIR'))
+
+@st.cache_resource
+def load_student_store():
+    """Load and cache the SQLite student store (set STUDENT_DB_PATH to relocate it)"""
+    return StudentStore()
+
+
+def restore_student_profile():
+    """Restore the saved profile of the entered student id into the sidebar (button callback)"""
+    student_id = st.session_state.get('student_id', '').strip()
+    profile = load_student_store().load_profile(student_id)
+    if profile is None:
+        st.session_state.profile_message = ('warning', f"Không tìm thấy hồ sơ của sinh viên {student_id}")
+        return
+    
+    engine = load_reasoning_engine()
+    labels = {c['course_id']: f"{c['course_id']} - {c['course_name']}" for c in engine.courses}
+    
+    st.session_state.form_major = profile['major']
+    st.session_state.form_enrollment_year = profile['enrollment_year']
+    st.session_state.form_semester = profile['current_semester_number']
+    st.session_state.completed_courses_state = [labels[c] for c in profile.get('studied_courses', []) if c in labels]
+    st.session_state.current_courses_state = [labels[c] for c in profile.get('current_courses', []) if c in labels]
+    st.session_state.course_grades = dict(profile.get('course_grades', {}))
+    st.session_state.form_interests = profile.get('interests', [])
+    st.session_state.form_time_availability = profile.get('time_availability', 'Medium')
+    
+    # Drop widget state so the sidebar widgets re-initialize from the restored values
+    widget_keys = ['major_select', 'enrollment_year_select', 'semester_select',
+                   'completed_courses_select', 'current_courses_select']
+    widget_keys += [key for key in st.session_state.keys() if str(key).startswith('grade_')]
+    for key in widget_keys:
+        st.session_state.pop(key, None)
+    
+    st.session_state['student_data'] = profile
+    st.session_state.profile_message = ('success', f"Đã khôi phục hồ sơ của sinh viên {student_id}")
+
+
+def save_student_profile(engine, student_id, student_data):
+    """Persist the submitted profile and its computed semester plan"""
+    store = load_student_store()
+    try:
+        store.save_profile(student_id, student_data)
+        store.save_recommendations(student_id, engine.kb_version,
+                                   thaw(engine.get_remaining_semester_plan(student_data)))
+    except sqlite3.Error as e:
+        st.sidebar.warning(f"Không lưu được hồ sơ: {e}")
+
 
 def display_header():
     """Display application header"""
@@ -136,104 +199,28 @@ def display_header():
     st.markdown("---")
 
 
-def create_prerequisite_graph(courses_dict, student_completed=None, student_current=None):
-    """Create prerequisite relationship graph"""
-    G = nx.DiGraph()
-    
-    # Add nodes
-    for course_id, course in courses_dict.items():
-        label = f"{course_id}\n{course['course_name'][:15]}..."
-        
-        # Color based on completion status
-        if student_completed and course_id in student_completed:
-            color = "#4CAF50"  # Green for completed
-            size = 30
-        elif student_current and course_id in student_current:
-            color = "#FF9800"  # Orange for currently taking
-            size = 35
-        else:
-            color = "#2196F3"  # Blue for not completed
-            size = 25
-        
-        G.add_node(course_id, label=label, color=color, title=course['course_name'], size=size)
-    
-    # Add edges (prerequisites)
-    for course_id, course in courses_dict.items():
-        for prereq in course.get('prerequisites', []):
-            if prereq in courses_dict:
-                G.add_edge(prereq, course_id)
-    
-    return G
-
-
-def visualize_graph(G, height="800px"):
-    """Visualize graph using pyvis with improved settings"""
-    net = Network(height=height, width="100%", directed=True, 
-                  bgcolor="#ffffff", font_color="black")
-    net.from_nx(G)
-    
-    # Configure physics for better layout
-    net.set_options("""
-    {
-      "nodes": {
-        "font": {
-          "size": 14,
-          "face": "arial"
-        },
-        "scaling": {
-          "min": 20,
-          "max": 40
-        }
-      },
-      "edges": {
-        "arrows": {
-          "to": {
-            "enabled": true,
-            "scaleFactor": 1.2
-          }
-        },
-        "color": {
-          "color": "#666666",
-          "highlight": "#000000"
-        },
-        "smooth": {
-          "type": "curvedCW",
-          "roundness": 0.2
-        }
-      },
-      "physics": {
-        "enabled": true,
-        "barnesHut": {
-          "gravitationalConstant": -50000,
-          "centralGravity": 0.5,
-          "springLength": 250,
-          "springConstant": 0.02,
-          "damping": 0.5
-        },
-        "maxVelocity": 50,
-        "minVelocity": 0.1
-      },
-      "interaction": {
-        "hover": true,
-        "tooltipDelay": 100,
-        "zoomView": true,
-        "dragView": true
-      }
-    }
-    """)
-    
-    # Save to temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.html', mode='w', encoding='utf-8') as f:
-        net.save_graph(f.name)
-        return f.name
-
-
 def display_student_input_form():
     """Display form for student information input with real-time updates"""
     st.sidebar.header("Thông tin Sinh viên")
     
     engine = load_reasoning_engine()
     
+    # Saved profiles - restore with one lookup by student id
+    st.sidebar.text_input(
+        "Mã số sinh viên (MSSV)",
+        key="student_id",
+        help="Nhập MSSV để khôi phục hồ sơ đã lưu. Hồ sơ được lưu lại mỗi khi nhấn \"Phân tích & Gợi ý\""
+    )
+    st.sidebar.button(
+        "Khôi phục hồ sơ",
+        on_click=restore_student_profile,
+        disabled=not st.session_state.get('student_id', '').strip(),
+        use_container_width=True
+    )
+    if 'profile_message' in st.session_state:
+        level, message = st.session_state.pop('profile_message')
+        getattr(st.sidebar, level)(message)
+    
     # Initialize session state for form values (outside form for reactivity)
     if 'form_major' not in st.session_state:
         st.session_state.form_major = "KHMT"
@@ -296,7 +283,7 @@ def display_student_input_form():
     # Sort by course_group first, then by course_id
     group_order = ['Đại cương', 'Cơ sở ngành', 'Chuyên ngành', 'Tự chọn', 'Tự chọn tự do', 'Tốt nghiệp']
     sorted_courses = sorted(
-        [c for c in engine.courses if major in c['major']],
+        engine.get_courses_for_major(major),
         key=lambda x: (group_order.index(x.get('course_group', 'Tự chọn')) if x.get('course_group') in group_order else 99, x['course_id'])
     )
     all_available_courses = [
@@ -304,12 +291,28 @@ def display_student_input_form():
         for c in sorted_courses
     ]
     
+    # Diacritic-insensitive search narrows both course lists ("giai tich" finds "Giải tích")
+    search_query = st.sidebar.text_input(
+        "Tìm môn học",
+        key="course_search",
+        placeholder="VD: giai tich, IT003",
+        help="Không cần gõ dấu - lọc danh sách môn đã học và đang học bên dưới theo mức độ phù hợp"
+    )
+    if search_query.strip():
+        hits = [f"{c['course_id']} - {c['course_name']}"
+                for c in engine.search_courses(search_query, major, limit=30)]
+        # Keep already selected courses selectable so the search never drops them
+        selected = st.session_state.completed_courses_state + st.session_state.current_courses_state
+        course_options = list(dict.fromkeys(hits + [c for c in selected if c in all_available_courses]))
+    else:
+        course_options = all_available_courses
+    
     # Course selection OUTSIDE form for real-time filtering
     st.sidebar.subheader("Môn đã học")
     studied_courses = st.sidebar.multiselect(
         "Chọn các môn đã học",
-        options=all_available_courses,
-        default=[c for c in st.session_state.completed_courses_state if c in all_available_courses],
+        options=course_options,
+        default=[c for c in st.session_state.completed_courses_state if c in course_options],
         help="Chọn tất cả môn học bạn đã từng học (bao gồm cả đậu và rớt)",
         key="completed_courses_select"
     )
@@ -342,7 +345,7 @@ def display_student_input_form():
                              ", ".join([c.split(" - ")[0] for c in failed_from_grades]))
     
     # Filter out studied courses from current courses options (real-time)
-    remaining_for_current = [c for c in all_available_courses if c not in studied_courses]
+    remaining_for_current = [c for c in course_options if c not in studied_courses]
     
     st.sidebar.subheader("Môn đang học")
     current_courses = st.sidebar.multiselect(
@@ -361,14 +364,14 @@ def display_student_input_form():
             "Lĩnh vực quan tâm",
             options=["AI", "ML", "NLP", "CV", "Multimedia", "Database", 
                     "Network", "SE", "Algorithm", "KE", "DataScience", "IS", "Embedded"],
-            default=["AI", "ML"],
+            default=st.session_state.get('form_interests', ["AI", "ML"]),
             help="KE = Knowledge Engineering, IS = Information Systems, DataScience = Khoa học dữ liệu"
         )
         
         time_availability = st.select_slider(
             "Thời gian dành cho học tập",
             options=["Low", "Medium", "High"],
-            value="Medium",
+            value=st.session_state.get('form_time_availability', "Medium"),
             help="Low: Ít thời gian, Medium: Trung bình, High: Nhiều thời gian"
         )
         
@@ -408,6 +411,49 @@ def display_student_input_form():
     return None
 
 
+# Rows per page of paginated tables
+TABLE_PAGE_SIZE = 15
+
+
+def display_table(records, make_row, columns, key, page_size=TABLE_PAGE_SIZE, height=None):
+    """
+    Show records as a table, one page at a time
+    
+    records is a precomputed sequence (e.g. the cached pipeline view model); only the
+    visible page is turned into rows with make_row, built into a DataFrame and sent
+    to the browser. Tables up to page_size rows are shown whole, without a pager.
+    
+    Args:
+        records: Sequence of records to list
+        make_row: Maps one record to a row tuple matching columns
+        columns: Column headers
+        key: Unique widget key prefix for the page selector
+    """
+    # pandas (~0.5 s to import) loads with the first table, after the sidebar has rendered
+    import pandas as pd
+    
+    total = len(records)
+    start = 0
+    if total > page_size:
+        pages = (total + page_size - 1) // page_size
+        page_key = f"{key}_page"
+        # A shorter listing than on the previous run must not leave the page out of range
+        if st.session_state.get(page_key, 1) > pages:
+            st.session_state[page_key] = pages
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            page = st.number_input("Trang", min_value=1, max_value=pages, value=1, step=1, key=page_key)
+        start = (page - 1) * page_size
+        with col2:
+            st.caption(f"Dòng {start + 1}–{min(start + page_size, total)} / {total} (trang {page}/{pages})")
+    
+    df = pd.DataFrame([make_row(r) for r in records[start:start + page_size]], columns=columns)
+    if height is None:
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    else:
+        st.dataframe(df, use_container_width=True, hide_index=True, height=height)
+
+
 def display_curriculum_plan(engine, major, student_data):
     """Display future study roadmap with recommendations integrated"""
     st.header("Lộ trình Học tập")
@@ -417,9 +463,12 @@ def display_curriculum_plan(engine, major, student_data):
     completed = set(student_data.get('completed_courses', []))
     current_courses = set(student_data.get('current_courses', []))
     
+    # Progress and the remaining-semester plan come from one shared (cached) pipeline run
+    result = engine.run_recommendation_pipeline(student_data)
+    
     # Display graduation progress
     st.subheader("Tiến độ Tốt nghiệp")
-    progress = engine.calculate_graduation_progress(student_data)
+    progress = result.progress
     
     # Calculate credits from current courses
     current_credits = 0
@@ -474,12 +523,13 @@ def display_curriculum_plan(engine, major, student_data):
     failed_courses = student_data.get('failed_courses', [])
     if failed_courses:
         st.subheader("Môn cần học lại")
-        import pandas as pd
+        # All failed courses are scheduled together, with delays cascading to their dependents
+        retake_schedule = engine.schedule_retakes(student_data)
         retake_info = []
         for course_id in failed_courses:
             course_info = engine.courses_dict.get(course_id)
             if course_info:
-                next_retake = engine.get_next_retake_semester(
+                next_retake = retake_schedule['retakes'].get(course_id) or engine.get_next_retake_semester(
                     course_id, 
                     current_semester,
                     major, cohort
@@ -494,75 +544,53 @@ def display_curriculum_plan(engine, major, student_data):
                     'Ghi chú': 'Học lại' + (' - Tiên quyết cho môn khác' if engine._is_prerequisite_for_others(course_id) else '')
                 })
         if retake_info:
-            df_failed = pd.DataFrame(retake_info)
-            st.dataframe(df_failed, use_container_width=True, hide_index=True)
+            display_table(retake_info, lambda r: tuple(r.values()), list(retake_info[0].keys()), key="retakes")
+        
+        delays = retake_schedule['delays']
+        if delays:
+            st.caption("Môn phía sau bị lùi kỳ: " + ', '.join(
+                f"{course_id} (HK{d['planned']} → HK{d['scheduled']})" for course_id, d in delays.items()))
+        if retake_schedule['graduation_semester'] > retake_schedule['planned_graduation_semester']:
+            st.warning(f"Dự kiến tốt nghiệp sau HK{retake_schedule['graduation_semester']} "
+                       f"(kế hoạch: HK{retake_schedule['planned_graduation_semester']})")
         st.markdown("---")
     
+    if current_courses:
+        display_what_if(engine, student_data)
+        st.markdown("---")
+    
+    display_registration_packing(result.registration)
+    st.markdown("---")
+    
     st.subheader("Gợi ý Học tập Từ Kỳ Hiện tại")
     
-    # Get max credits per semester rule (hard_rules is a list, find R005)
-    max_credits_per_semester = 24  # Default
-    for rule in engine.rules.get('hard_rules', []):
-        if rule.get('rule_id') == 'R005':
-            max_credits_per_semester = rule.get('max_credits', 24)
-            break
+    semester_plan = result.semester_plan
+    max_credits_per_semester = semester_plan['max_credits']
     st.caption(f"**Quy tắc:** Tối đa {max_credits_per_semester} tín chỉ/học kỳ theo kế hoạch giảng dạy")
     
+    def get_label(score):
+        if score >= 0.7: return "Rất phù hợp"
+        elif score > 0.5: return "Phù hợp"
+        else: return "Cân nhắc"
+    
     # Display current semester and future semesters only
-    for semester_num in range(current_semester, 8):
-        semester_data = engine.get_semester_courses(major, semester_num, cohort)
-        
-        is_current = (semester_num == current_semester)
-        
-        # Filter out completed courses
-        compulsory = [c for c in semester_data.get('compulsory', []) 
-                     if c.get('course_id') is None or c.get('course_id') not in completed]
-        elective = [c for c in semester_data.get('elective', []) 
-                   if c.get('course_id') is None or c.get('course_id') not in completed]
-        
-        # Always show semesters (even if no specific courses, show placeholders)
-        # Only skip if past semester with all courses completed
-        # Never skip future semesters
-        
-        # Get elective slots if available
-        elective_slots = semester_data.get('elective_slots', [])
-        
-        # Calculate remaining credits for this semester
-        planned_credits = sum(c['credits'] for c in compulsory) + sum(c['credits'] for c in elective)
+    for semester in semester_plan['semesters']:
+        semester_num = semester['semester']
+        rows = semester['rows']
+        total_credits = semester['total_credits']
         
         # Semester header with status - Use markdown header instead of expander
-        if is_current:
+        if semester['is_current']:
             st.markdown(f"### Học kỳ {semester_num} *(Hiện tại)*")
         else:
-            st.markdown(f"### Học kỳ {semester_num} *(Dự kiến)* — {planned_credits} TC")
-        
-        import pandas as pd
-        all_semester_courses = []
+            st.markdown(f"### Học kỳ {semester_num} *(Dự kiến)* — {total_credits} TC")
         
         # For CURRENT semester: Only show courses being taken, no teaching plan
-        if is_current:
-            if current_courses:
-                for course_id in current_courses:
-                    course_info = engine.courses_dict.get(course_id)
-                    if course_info:
-                        grade = student_data.get('course_grades', {}).get(course_id)
-                        all_semester_courses.append({
-                            'status': 'Đang học',
-                            'id': course_id,
-                            'name': course_info['course_name'],
-                            'credits': course_info['credits'],
-                            'type': 'Đăng ký',
-                            'choices': None
-                        })
-                
-                if all_semester_courses:
-                    total_credits = sum(c['credits'] for c in all_semester_courses)
-                    df = pd.DataFrame([{k: v for k, v in c.items() if k != 'choices'} for c in all_semester_courses])
-                    df.columns = ['Trạng thái', 'Mã môn', 'Tên môn', 'TC', 'Loại']
-                    st.dataframe(df, use_container_width=True, hide_index=True)
-                    st.caption(f"Tổng: {total_credits} TC đang học")
-                else:
-                    st.info("Chưa chọn môn đang học cho học kỳ này")
+        if semester['is_current']:
+            if rows:
+                display_table(rows, lambda r: (r['status'], r['id'], r['name'], r['credits'], r['type']),
+                              ['Trạng thái', 'Mã môn', 'Tên môn', 'TC', 'Loại'], key=f"semester_{semester_num}")
+                st.caption(f"Tổng: {total_credits} TC đang học")
             else:
                 st.info("Chưa chọn môn đang học cho học kỳ này")
             
@@ -570,251 +598,160 @@ def display_curriculum_plan(engine, major, student_data):
             continue  # Skip to next semester - recommendations will be shown separately
         
         # For FUTURE semesters: Show teaching plan
-        # Add compulsory courses from teaching plan
-        for course in compulsory:
-            course_id = course.get('course_id')
-            # Skip if already completed
-            if course_id and course_id in completed:
-                continue
-            
-            # Handle placeholder courses (including courses with '-' as id)
-            if course.get('is_placeholder'):
-                display_id = course_id if course_id == '-' else '(Chọn môn)'
-                all_semester_courses.append({
-                    'status': 'Kế hoạch',
-                    'id': display_id,
-                    'name': course['course_name'],
-                    'credits': course['credits'],
-                    'type': 'Bắt buộc',
-                    'choices': None
-                })
-            else:
-                all_semester_courses.append({
-                    'status': 'Kế hoạch',
-                    'id': course_id if course_id else '',
-                    'name': course['course_name'],
-                    'credits': course['credits'],
-                    'type': 'Bắt buộc',
-                    'choices': None
-                })
-        
-        # Add elective courses from teaching plan
-        for course in elective:
-            course_id = course.get('course_id')
-            if course_id and course_id in completed:
-                continue
-            
-            # Handle elective slot with choices
-            if course.get('is_elective_slot'):
-                slot_name = course.get('slot_name', 'Môn tự chọn')
-                choices_ids = course.get('all_choices', [])
-                choices_str = ', '.join(choices_ids[:5])  # Show first 5
-                if len(choices_ids) > 5:
-                    choices_str += f'... (+{len(choices_ids)-5} môn)'
-                all_semester_courses.append({
-                    'status': 'Kế hoạch',
-                    'id': f'[{len(choices_ids)} môn]',
-                    'name': slot_name,
-                    'credits': course['credits'],
-                    'type': 'Tự chọn',
-                    'choices': choices_str
-                })
-            # Handle old placeholder courses
-            elif course.get('is_placeholder'):
-                all_semester_courses.append({
-                    'status': 'Kế hoạch',
-                    'id': '(Chọn môn)',
-                    'name': course['course_name'],
-                    'credits': course['credits'],
-                    'type': 'Tự chọn',
-                    'choices': None
-                })
-            else:
-                all_semester_courses.append({
-                    'status': 'Kế hoạch',
-                    'id': course_id,
-                    'name': course['course_name'],
-                    'credits': course['credits'],
-                    'type': 'Tự chọn',
-                    'choices': None
-                })
-        
-        if all_semester_courses:
-            # Calculate total credits
-            total_credits = sum(c['credits'] for c in all_semester_courses)
-            
-            # Check if this is semester 7 with graduation options
-            if semester_num == 7:
-                # Count graduation options - each 10TC course is 1 option
-                # Special case: 6TC + 4TC courses together form 1 option
-                grad_10tc = [c for c in all_semester_courses if c['credits'] == 10]
-                grad_6tc = [c for c in all_semester_courses if c['credits'] == 6]
-                grad_4tc = [c for c in all_semester_courses if c['credits'] == 4]
-                
-                num_options = len(grad_10tc)
-                # If there's a 6TC + 4TC pair, count as 1 additional option
-                if grad_6tc and grad_4tc:
-                    num_options += 1
-                
-                if num_options >= 2:
-                    st.info(f"Chọn 1/{num_options} phương án tốt nghiệp (10 TC)")
-            elif total_credits > max_credits_per_semester:
+        if rows:
+            if semester['graduation_option_count'] >= 2:
+                graduation_options = semester['graduation_options']
+                st.info(f"Chọn 1/{semester['graduation_option_count']} phương án tốt nghiệp "
+                        f"({graduation_options[0]['credits']} TC)")
+                with st.expander("Các phương án tốt nghiệp (xếp theo khả năng và điểm gợi ý)", expanded=False):
+                    for i, option in enumerate(graduation_options, 1):
+                        courses = ' + '.join(f"{c['course_name']} ({c['course_id']}, {c['credits']} TC)"
+                                             for c in option['courses'])
+                        score = f"{option['score']:.2f}" if option['score'] is not None else '-'
+                        status = ('✅' if option['feasible']
+                                  else f"⚠️ thiếu {', '.join(option['missing_prerequisites'])}")
+                        st.markdown(f"{i}. {courses} — điểm {score} {status}")
+            elif semester_num != 7 and total_credits > max_credits_per_semester:
                 st.warning(f"Tổng tín chỉ ({total_credits} TC) vượt quá quy định ({max_credits_per_semester} TC)")
             
-            # Create DataFrame - show choices column only if there are elective slots
-            has_choices = any(c['choices'] for c in all_semester_courses)
-            if has_choices:
-                df = pd.DataFrame(all_semester_courses)
-                df.columns = ['Trạng thái', 'Mã môn', 'Tên môn', 'TC', 'Loại', 'Các môn có thể chọn']
-                # Replace None with empty string
-                df['Các môn có thể chọn'] = df['Các môn có thể chọn'].fillna('')
+            # Show choices column only if there are elective slots
+            if semester['has_choices']:
+                display_table(rows, lambda r: (r['status'], r['id'], r['name'], r['credits'], r['type'],
+                                               r['choices'] or ''),
+                              ['Trạng thái', 'Mã môn', 'Tên môn', 'TC', 'Loại', 'Các môn có thể chọn'],
+                              key=f"semester_{semester_num}")
             else:
-                df = pd.DataFrame([{k: v for k, v in c.items() if k != 'choices'} for c in all_semester_courses])
-                df.columns = ['Trạng thái', 'Mã môn', 'Tên môn', 'TC', 'Loại']
-            
-            st.dataframe(df, use_container_width=True, hide_index=True)
+                display_table(rows, lambda r: (r['status'], r['id'], r['name'], r['credits'], r['type']),
+                              ['Trạng thái', 'Mã môn', 'Tên môn', 'TC', 'Loại'], key=f"semester_{semester_num}")
             
             st.caption(f"Tổng: {total_credits} TC")
             
             # Show expandable elective slot details - MERGED similar slots
-            if elective_slots:
-                # Group slots by similar names (chuyên ngành 1,2 / tự do 1,2)
-                import re
-                merged_slots = {}
-                for slot in elective_slots:
-                    # Extract base name (remove numbers like "1", "2")
-                    base_name = re.sub(r'\s*\d+\s*$', '', slot['slot_name']).strip()
-                    base_name = re.sub(r'\(chọn \d+\)', '', base_name).strip()
-                    
-                    if base_name not in merged_slots:
-                        merged_slots[base_name] = {
-                            'credits': slot['credits'],
-                            'choices': [],
-                            'slot_count': 0
-                        }
-                    merged_slots[base_name]['slot_count'] += 1
-                    # Add unique choices
-                    for choice in slot['choices']:
-                        if choice['course_id'] not in [c['course_id'] for c in merged_slots[base_name]['choices']]:
-                            merged_slots[base_name]['choices'].append(choice)
-                
+            if semester['merged_slots']:
                 with st.expander("Chi tiết các môn tự chọn có thể đăng ký", expanded=False):
-                    for base_name, data in merged_slots.items():
-                        slot_label = f"{base_name}"
-                        if data['slot_count'] > 1:
-                            slot_label += f" (cần chọn {data['slot_count']} môn)"
-                        st.markdown(f"**{slot_label}** ({data['credits']} TC/môn):")
+                    for slot_index, slot in enumerate(semester['merged_slots']):
+                        slot_label = f"{slot['name']}"
+                        if slot['slot_count'] > 1:
+                            slot_label += f" (cần chọn {slot['slot_count']} môn)"
+                        st.markdown(f"**{slot_label}** ({slot['credits']} TC/môn):")
                         
-                        # Sort choices by knowledge_area for better grouping
-                        sorted_choices = sorted(data['choices'], 
-                            key=lambda x: (x.get('knowledge_area') or ['ZZZ'])[0])
-                        
-                        choices_df = pd.DataFrame([{
-                            'Mã': c['course_id'],
-                            'Tên môn': c['course_name'],
-                            'TC': c['credits'],
-                            'Lĩnh vực': ', '.join(c.get('knowledge_area') or ['-'])
-                        } for c in sorted_choices])
-                        st.dataframe(choices_df, use_container_width=True, hide_index=True, height=200)
-                
-                # Add recommendation based on interests - PER SLOT TYPE - only for next semester
-                if semester_num == current_semester + 1:
-                    with st.expander("Gợi ý môn tự chọn theo sở thích", expanded=True):
-                        st.caption(f"Dựa trên sở thích: {', '.join(student_data.get('interests', []))}")
-                        
-                        student_ability = engine.infer_student_ability(student_data)
+                        display_table(slot['choices'],
+                                      lambda c: (c['course_id'], c['course_name'], c['credits'],
+                                                 ', '.join(c.get('knowledge_area') or ['-'])),
+                                      ['Mã', 'Tên môn', 'TC', 'Lĩnh vực'],
+                                      key=f"slot_{semester_num}_{slot_index}", height=200)
+            
+            # Recommendation based on interests - PER SLOT TYPE - only for next semester
+            if semester['slot_recommendations']:
+                with st.expander("Gợi ý môn tự chọn theo sở thích", expanded=True):
+                    st.caption(f"Dựa trên sở thích: {', '.join(student_data.get('interests', []))}")
+                    
+                    for slot_index, slot in enumerate(semester['slot_recommendations']):
+                        st.markdown(f"**{slot['name']}** (chọn {slot['slot_count']} trong {slot['num_choices']} môn)")
                         
-                        def get_label(score):
-                            if score >= 0.7: return "Rất phù hợp"
-                            elif score > 0.5: return "Phù hợp"
-                            else: return "Cân nhắc"
+                        if slot['top_courses']:
+                            display_table(slot['top_courses'],
+                                          lambda c: (c['course_id'], c['course_name'], c['credits'],
+                                                     f"{c['total_score']:.2f}", get_label(c['total_score']),
+                                                     ', '.join(c.get('knowledge_area') or ['-'])),
+                                          ['Mã', 'Tên môn', 'TC', 'Điểm', 'Đánh giá', 'Lĩnh vực'],
+                                          key=f"slot_recommendations_{semester_num}_{slot_index}")
                         
-                        # Score and recommend for EACH slot type separately
-                        for base_name, data in merged_slots.items():
-                            slot_label = f"**{base_name}**"
-                            slot_label += f" (chọn {data['slot_count']} trong {len(data['choices'])} môn)"
-                            
-                            st.markdown(slot_label)
-                            
-                            # Score courses in THIS slot
-                            scored = []
-                            for course in data['choices']:
-                                score_data = engine.compute_recommendation_score(course, student_data, student_ability)
-                                scored.append(score_data)
-                            
-                            scored.sort(key=lambda x: x['total_score'], reverse=True)
-                            
-                            # Show top N based on how many need to be chosen (at least 5)
-                            top_n = min(max(data['slot_count'] + 3, 5), len(scored))
-                            top_courses = scored[:top_n]
-                            
-                            if top_courses:
-                                rec_df = pd.DataFrame([{
-                                    'Mã': c['course_id'],
-                                    'Tên môn': c['course_name'],
-                                    'TC': c['credits'],
-                                    'Điểm': f"{c['total_score']:.2f}",
-                                    'Đánh giá': get_label(c['total_score']),
-                                    'Lĩnh vực': ', '.join(c.get('knowledge_area') or ['-'])
-                                } for c in top_courses])
-                                st.dataframe(rec_df, use_container_width=True, hide_index=True)
-                            
-                            st.markdown("---")
+                        st.markdown("---")
         else:
             st.info("Đã hoàn thành tất cả môn học theo kế hoạch cho học kỳ này")
         
         st.markdown("---")  # Separator between semesters
 
 
+def display_registration_packing(registration):
+    """Show the best registration set within the credit window and its alternatives"""
+    title = (f"Phương án đăng ký HK{registration['semester']} "
+             f"({registration['min_credits']}–{registration['max_credits']} TC)")
+    with st.expander(title, expanded=False):
+        if not registration['feasible']:
+            st.warning(f"Không đủ môn đủ điều kiện để đạt tối thiểu {registration['min_credits']} TC")
+        
+        tier_labels = {1: 'Bắt buộc theo KHGD', 2: 'Tự chọn theo KHGD', 3: 'Bắt buộc kỳ trước', 4: 'Khác'}
+        packings = [registration['best'], *registration['alternatives']]
+        for i, packing in enumerate(packings):
+            label = "Tối ưu" if i == 0 else f"Phương án {i + 1}"
+            st.markdown(f"**{label}:** {packing['total_credits']} TC — tổng điểm {packing['total_score']:.2f}")
+            if packing['courses']:
+                display_table(packing['courses'],
+                              lambda c: (c['course_id'], c['course_name'], c['credits'],
+                                         tier_labels[c['tier']], f"{c['total_score']:.2f}"),
+                              ['Mã môn', 'Tên môn', 'TC', 'Ưu tiên', 'Điểm'], key=f"packing_{i}")
+
+
+def display_what_if(engine, student_data):
+    """Let the user mark current courses as failed and show what changes against passing them all"""
+    import pandas as pd
+    
+    with st.expander("Mô phỏng kết quả học kỳ hiện tại (nếu rớt môn)", expanded=False):
+        # The all-pass baseline is evaluated once per profile and knowledge base version,
+        # not on every rerun
+        simulator_key = make_cache_key('what_if', engine.kb_version, student_data)
+        simulator = st.session_state.get('what_if_simulator')
+        if simulator is None or st.session_state.get('what_if_simulator_key') != simulator_key:
+            simulator = WhatIfSimulator(engine, student_data)
+            st.session_state['what_if_simulator'] = simulator
+            st.session_state['what_if_simulator_key'] = simulator_key
+        labels = {c: f"{c} - {engine.courses_dict[c]['course_name']}"
+                  for c in simulator.current_courses if c in engine.courses_dict}
+        failed = st.multiselect("Giả sử rớt các môn:", options=list(labels),
+                                format_func=labels.get, key="what_if_failed")
+        if not failed:
+            st.caption("Chọn môn đang học để xem ảnh hưởng so với trường hợp đạt tất cả")
+            return
+        
+        diff = simulator.simulate({course_id: 'fail' for course_id in failed})
+        progress = diff['progress']
+        st.metric("Tín chỉ tích lũy sau kỳ này", f"{progress['total_completed']} TC",
+                  f"{progress['total_delta']} TC")
+        
+        st.dataframe(pd.DataFrame([{
+            'Mã môn': course_id,
+            'Tên môn': engine.courses_dict[course_id]['course_name'],
+            'Kỳ đăng ký lại': f"HK{semester}"
+        } for course_id, semester in diff['retake_semesters'].items()]), use_container_width=True, hide_index=True)
+        
+        lost = diff['eligibility']['lost']
+        if lost:
+            st.warning(f"Không còn đủ điều kiện đăng ký: {', '.join(lost)}")
+        blocked = diff['blocked_courses']
+        if blocked:
+            st.markdown(f"**Các môn phía sau bị chặn ({len(blocked)}):** {', '.join(blocked)}")
+        else:
+            st.info("Không có môn nào phía sau bị ảnh hưởng")
+
+
 def display_reasoning_trace(engine, student_data):
     """Display reasoning trace for course recommendations"""
     st.header("Luồng Suy luận")
     
     cohort = student_data.get('cohort', 'K20')
     current_semester = student_data.get('current_semester_number', 1)
-    next_semester = min(current_semester + 1, 7)
     major = student_data['major']
     failed_courses = student_data.get('failed_courses', [])
     
-    st.caption(f"Các bước suy luận của hệ thống để đưa ra gợi ý môn học cho **HK{next_semester}**")
-    
-    # Get eligible courses for reasoning
-    eligible = engine.get_eligible_courses(student_data)
+    # Eligible courses, ability and scored electives come from the shared pipeline run
+    result = engine.run_recommendation_pipeline(student_data)
+    scored_electives = result.scored
     
-    # Score elective courses for reasoning trace
-    student_ability = engine.infer_student_ability(student_data)
-    semester_plan = engine.get_semester_courses(major, next_semester, cohort)
-    planned_compulsory_ids = [c['course_id'] for c in semester_plan.get('compulsory', [])]
+    st.caption(f"Các bước suy luận của hệ thống để đưa ra gợi ý môn học cho **HK{result.next_semester}**")
     
-    other_eligible = [c for c in eligible 
-                     if not c.get('is_failed') 
-                     and c['course_id'] not in planned_compulsory_ids]
-    
-    scored_electives = []
-    for course in other_eligible:
-        score_data = engine.compute_recommendation_score(course, student_data, student_ability)
-        scored_electives.append(score_data)
-    scored_electives.sort(key=lambda x: x['total_score'], reverse=True)
-    
-    # Get detailed reasoning trace from engine
-    reasoning_trace = engine.get_reasoning_trace(student_data, eligible, scored_electives)
-    
-    # Display reasoning trace with rule descriptions
-    for trace_step in reasoning_trace:
+    # Display reasoning trace with rule descriptions (step texts are formatted on first access)
+    for trace_step in result.trace:
         with st.container():
-            step_num = trace_step['step']
-            rule_id = trace_step['rule_id']
-            rule_name = trace_step['rule_name']
-            description = trace_step['description']
-            
-            st.markdown(f"#### Bước {step_num}: {rule_name}")
-            st.info(f"📜 **Luật {rule_id}:** {description}")
+            st.markdown(f"#### Bước {trace_step.step}: {trace_step.rule_name}")
+            st.info(f"📜 **Luật {trace_step.rule_id}:** {trace_step.description}")
             
-            if trace_step['result']:
-                for item in trace_step['result']:
+            if trace_step.result:
+                for item in trace_step.result:
                     st.markdown(f"- {item}")
             
-            st.caption(f"=> {trace_step['summary']}")
+            st.caption(f"=> {trace_step.summary}")
             st.markdown("---")
     
     # Additional context analysis
@@ -875,12 +812,15 @@ def display_knowledge_view(engine, student_data):
         "Môn học", "Sinh viên", "Luật", "Năng lực Suy diễn"
     ])
     
+    result = engine.run_recommendation_pipeline(student_data)
+    ability = thaw(result.ability)
+    
     with tab1:
         st.subheader("Knowledge Base - Courses")
         
         # Filter courses by major
         major = student_data.get('major')
-        major_courses = [c for c in engine.courses if major in c['major']]
+        major_courses = thaw(engine.get_courses_for_major(major))
         
         st.info(f"Tổng số môn học cho ngành {major}: {len(major_courses)}")
         
@@ -895,30 +835,21 @@ def display_knowledge_view(engine, student_data):
         st.json(student_data)
         
         st.subheader("Inferred Attributes")
-        ability = engine.infer_student_ability(student_data)
         st.json(ability)
     
     with tab3:
         st.subheader("Rules Base")
-        st.json(engine.rules)
+        st.json(thaw(engine.rules))
         
         st.subheader("Activated Rules")
-        year = student_data['current_year']
-        semester = student_data['current_semester']
-        eligible = engine.get_eligible_courses(student_data, year, semester)
-        eligible_ids = [c['course_id'] for c in eligible[:10]]
-        
-        activated = engine.get_activated_rules(student_data, eligible_ids)
-        if activated:
-            st.json(activated)
+        if result.activated_rules:
+            st.json(thaw(result.activated_rules))
         else:
             st.info("Không có luật đặc biệt nào được kích hoạt")
     
     with tab4:
         st.subheader("Student Ability Inference")
         
-        ability = engine.infer_student_ability(student_data)
-        
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric("Programming Level", f"{ability['programming_level']:.1f}/3.5")
@@ -945,6 +876,92 @@ def display_knowledge_view(engine, student_data):
         """)
 
 
+def display_graph_html(engine, major, base_graph, status_overlay, layout):
+    """Render the graph as a self-contained pyvis HTML document (GRAPH_RENDERER=pyvis)"""
+    # Rendered HTML only depends on the displayed courses' status - key the cache on it
+    graph_height = "900px"
+    cache_key = make_cache_key('prerequisite_graph', engine.kb_version, major,
+                               status_overlay, graph_height, layout)
+    graph_cache = load_graph_cache()
+    html_content = graph_cache.get(cache_key)
+    
+    # Create and visualize graph
+    if html_content is None:
+        with st.spinner("Đang tạo đồ thị..."):
+            G = create_prerequisite_graph(base_graph, status_overlay)
+            # Layered positions are computed once per major on the server
+            positions = engine.get_prerequisite_layout(major) if layout == "layered" else None
+            html_content = visualize_graph(G, height=graph_height, positions=positions)
+        graph_cache.put(cache_key, html_content)
+    
+    # Display graph
+    st.components.v1.html(html_content, height=950)
+
+
+# Graph scopes: the major's whole graph or the k-hop neighborhood of one course
+GRAPH_SCOPES = {
+    "Toàn ngành": "major",
+    "Lân cận một môn": "neighborhood"
+}
+
+
+def display_course_neighborhood(engine, student_data):
+    """Show the k-hop prerequisite neighborhood of one course, expandable course by course"""
+    major = student_data['major']
+    course_ids = [c['course_id'] for c in engine.get_courses_for_major(major)]
+    if not course_ids:
+        st.warning(f"Không có môn học nào cho ngành {major}")
+        return
+    
+    def course_label(course_id):
+        return f"{course_id} - {engine.courses_dict[course_id]['course_name']}"
+    
+    # Start from a course that has prerequisite relations at all
+    dependents = engine.get_prerequisite_dependents()
+    default_index = next((i for i, c in enumerate(course_ids)
+                          if dependents.get(c) or engine.courses_dict[c].get('prerequisites')), 0)
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        center = st.selectbox("Môn trung tâm", options=course_ids, index=default_index,
+                              format_func=course_label, key="ego_center")
+    with col2:
+        hops = st.slider("Số bước (k)", min_value=1, max_value=4, value=2, key="ego_hops")
+    
+    # Expansions belong to one center - start over when it changes
+    if st.session_state.get("ego_expanded_center") != center:
+        st.session_state["ego_expanded_center"] = center
+        st.session_state["ego_expanded"] = []
+    expanded = st.session_state.get("ego_expanded", [])
+    
+    # Only the subgraph is extracted and rendered (cost grows with the subgraph, not the catalog)
+    neighborhood = engine.get_course_neighborhood(center, hops, expanded)
+    st.multiselect(
+        "Mở rộng thêm từ môn",
+        options=list(dict.fromkeys(expanded + neighborhood['frontier'])),
+        format_func=course_label,
+        key="ego_expanded",
+        help="Chọn môn ở rìa đồ thị để hiện thêm môn tiên quyết và môn phụ thuộc trực tiếp của môn đó"
+    )
+    st.info(f"Hiển thị {len(neighborhood['nodes'])} môn, {len(neighborhood['edges'])} quan hệ tiên quyết "
+            f"quanh {center} ({len(neighborhood['frontier'])} môn còn lân cận chưa hiển thị)")
+    
+    status_overlay = engine.get_graph_status_overlay(
+        major,
+        student_data.get('completed_courses', []),
+        student_data.get('current_courses', []),
+        graph=neighborhood
+    )
+    if GRAPH_RENDERER == "pyvis":
+        G = create_prerequisite_graph(neighborhood, status_overlay)
+        st.components.v1.html(visualize_graph(G, height="700px", positions=neighborhood['positions']), height=750)
+    else:
+        graph_id = make_cache_key('course_neighborhood', engine.kb_version, center, hops, expanded)
+        render_graph_component(graph_id, status_overlay,
+                               lambda: build_graph_data(neighborhood, status_overlay, neighborhood['positions']),
+                               get_graph_options("layered"), height=700)
+
+
 def display_prerequisite_graph(engine, student_data):
     """Display prerequisite relationship graph with legend"""
     st.header("Đồ thị Quan hệ Tiên quyết")
@@ -954,6 +971,7 @@ def display_prerequisite_graph(engine, student_data):
     **Giải thích đồ thị:**
     - Mỗi **nút (node)** đại diện cho một môn học
     - **Mũi tên** chỉ hướng từ môn tiên quyết đến môn yêu cầu (A -> B nghĩa là A là tiên quyết của B)
+    - Bố cục phân tầng: môn ở tầng trên là tiên quyết của môn ở tầng dưới
     - Kéo thả các nút để xem rõ hơn quan hệ giữa các môn
     - Cuộn chuột để phóng to/thu nhỏ
     """)
@@ -969,55 +987,55 @@ def display_prerequisite_graph(engine, student_data):
     
     st.markdown("---")
     
-    # Filter courses - use course_group instead of course_role
-    major = student_data['major']
-    compulsory_groups = ['Đại cương', 'Cơ sở ngành', 'Chuyên ngành']
-    major_courses = {
-        c['course_id']: c 
-        for c in engine.courses 
-        if major in c['major'] and c.get('course_group') in compulsory_groups
-    }
-    
-    # Add some electives for demonstration
-    elective_groups = ['Tự chọn', 'Tự chọn tự do']
-    electives = [c for c in engine.courses 
-                if major in c['major'] and c.get('course_group') in elective_groups]
-    for course in electives[:10]:
-        major_courses[course['course_id']] = course
-    
-    completed = student_data.get('completed_courses', [])
-    current = student_data.get('current_courses', [])
-    
-    st.info(f"Hiển thị {len(major_courses)} môn học cho ngành {major}")
-    
-    # Create and visualize graph
-    with st.spinner("Đang tạo đồ thị..."):
-        G = create_prerequisite_graph(major_courses, completed, current)
-        html_file = visualize_graph(G, height="900px")
-    
-    # Display graph
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
-    st.components.v1.html(html_content, height=950)
+    scope_label = st.radio("Phạm vi", options=list(GRAPH_SCOPES.keys()), horizontal=True, key="graph_scope")
+    if GRAPH_SCOPES[scope_label] == "neighborhood":
+        display_course_neighborhood(engine, student_data)
+        return
     
-    # Statistics
+    # Base graph is built once per major; only the status overlay depends on the student
+    major = student_data['major']
+    base_graph = engine.get_prerequisite_graph(major)
+    status_overlay = engine.get_graph_status_overlay(
+        major,
+        student_data.get('completed_courses', []),
+        student_data.get('current_courses', [])
+    )
+    stats = base_graph['stats']
+    
+    st.info(f"Hiển thị {stats['num_nodes']} môn học cho ngành {major}")
+    
+    layout_label = st.radio("Bố cục đồ thị", options=list(GRAPH_LAYOUTS.keys()),
+                            horizontal=True, key="graph_layout")
+    layout = GRAPH_LAYOUTS[layout_label]
+    
+    if GRAPH_RENDERER == "pyvis":
+        display_graph_html(engine, major, base_graph, status_overlay, layout)
+    else:
+        # Only the node/edge JSON is sent (vis-network is loaded once from lib/), and
+        # once the browser holds this graph only the changed node statuses are sent
+        graph_id = make_cache_key('prerequisite_graph', engine.kb_version, major, layout)
+        # Layered positions are computed once per major on the server
+        positions = engine.get_prerequisite_layout(major) if layout == "layered" else None
+        render_graph_component(graph_id, status_overlay,
+                               lambda: build_graph_data(base_graph, status_overlay, positions),
+                               get_graph_options(layout), height=900)
+    
+    # Statistics (precomputed once per major)
     with st.expander("Thống kê đồ thị", expanded=False):
-        st.write(f"- Tổng số môn học: {G.number_of_nodes()}")
-        st.write(f"- Tổng số quan hệ tiên quyết: {G.number_of_edges()}")
-        
-        # Find courses with most prerequisites
-        prereq_counts = [(node, G.in_degree(node)) for node in G.nodes()]
-        prereq_counts.sort(key=lambda x: x[1], reverse=True)
+        st.write(f"- Tổng số môn học: {stats['num_nodes']}")
+        st.write(f"- Tổng số quan hệ tiên quyết: {stats['num_edges']}")
         
         st.write("**Môn có nhiều tiên quyết nhất:**")
-        for course_id, count in prereq_counts[:5]:
-            if count > 0:
-                course_name = major_courses[course_id]['course_name']
-                st.write(f"  - {course_id}: {course_name} ({count} tiên quyết)")
-    
-    # Cleanup
-    os.unlink(html_file)
+        for course_id, course_name, count in stats['most_prerequisites']:
+            st.write(f"  - {course_id}: {course_name} ({count} tiên quyết)")
+
+
+# Main navigation: view label -> render function
+MAIN_VIEWS = {
+    "Lộ trình Học tập": lambda engine, student_data: display_curriculum_plan(engine, student_data['major'], student_data),
+    "Luồng Suy luận": display_reasoning_trace,
+    "Đồ thị Tiên quyết": display_prerequisite_graph
+}
 
 
 def main():
@@ -1030,9 +1048,23 @@ def main():
     # Sidebar input - returns student_data when form is submitted
     new_student_data = display_student_input_form()
     
+    # Data problems found when the knowledge base was loaded (validated once per content hash)
+    validation = engine.get_validation_report()
+    if validation['issue_count']:
+        with st.sidebar.expander(f"Cơ sở tri thức: {validation['issue_count']} vấn đề dữ liệu"):
+            st.json({check: thaw(found) for check, found in validation.items()
+                     if check != 'issue_count' and found})
+    
     # Store in session state when form is submitted
     if new_student_data is not None:
         st.session_state['student_data'] = new_student_data
+        st.session_state.form_interests = new_student_data['interests']
+        st.session_state.form_time_availability = new_student_data['time_availability']
+        
+        # Persist the profile when a student id is given
+        student_id = st.session_state.get('student_id', '').strip()
+        if student_id:
+            save_student_profile(engine, student_id, new_student_data)
     
     # Get student_data from session state (persists across button clicks)
     student_data = st.session_state.get('student_data', None)
@@ -1081,21 +1113,16 @@ def main():
     st.success(f"Đã tải thông tin sinh viên ngành **{student_data['major']}** - "
               f"Năm {student_data['current_year']} {student_data['current_semester']}")
     
-    # Main tabs - Lộ trình, Suy luận, Đồ thị
-    tab1, tab2, tab3 = st.tabs([
-        "Lộ trình Học tập",
-        "Luồng Suy luận",
-        "Đồ thị Tiên quyết"
-    ])
-    
-    with tab1:
-        display_curriculum_plan(engine, student_data['major'], student_data)
-    
-    with tab2:
-        display_reasoning_trace(engine, student_data)
-    
-    with tab3:
-        display_prerequisite_graph(engine, student_data)
+    # Main views - Lộ trình, Suy luận, Đồ thị
+    # Unlike st.tabs (which runs every tab body on each rerun), only the selected view is computed
+    view = st.radio(
+        "Chế độ xem",
+        options=list(MAIN_VIEWS.keys()),
+        horizontal=True,
+        label_visibility="collapsed",
+        key="main_view"
+    )
+    MAIN_VIEWS[view](engine, student_data)
     
     # Footer
     st.markdown("---")
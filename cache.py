@@ -0,0 +1,137 @@
+"""
+Caching utilities for the Course Recommendation System
+In-memory LRU cache with an optional on-disk tier for rendered views
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+
+def make_cache_key(*parts) -> str:
+    """
+    Build a content-addressed cache key from JSON-serializable parts
+
+    Sets are sorted before hashing so the key does not depend on insertion order.
+
+    Returns:
+        Hex digest identifying the given parts
+    """
+    def _normalize(value):
+        if isinstance(value, (set, frozenset)):
+            return sorted(value)
+        raise TypeError(f"Unsupported cache key part: {type(value).__name__}")
+
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=_normalize)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory cache evicting the least recently used entry"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return cached value (marking it as recently used) or default"""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: str, value: Any) -> None:
+        """Store value, evicting least recently used entries beyond max_entries"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class HTMLCache(LRUCache):
+    """
+    LRU cache for rendered HTML documents with an optional on-disk tier
+
+    Memory misses fall back to `<disk_dir>/<key>.html` and are promoted back
+    into memory. The disk tier keeps at most max_disk_entries files, evicting
+    the least recently used (by modification time, refreshed on every hit).
+    """
+
+    def __init__(self, max_entries: int = 64, disk_dir: Optional[str] = None,
+                 max_disk_entries: int = 512):
+        super().__init__(max_entries)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_entries = max_disk_entries
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.html"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        html = super().get(key)
+        if html is not None or self.disk_dir is None:
+            return html if html is not None else default
+
+        path = self._disk_path(key)
+        try:
+            html = path.read_text(encoding='utf-8')
+            os.utime(path)  # Mark as recently used for disk eviction
+        except OSError:
+            return default
+
+        super().put(key, html)
+        return html
+
+    def put(self, key: str, value: str) -> None:
+        super().put(key, value)
+        if self.disk_dir is None:
+            return
+
+        # Write atomically so concurrent sessions never read a partial file
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_text(value, encoding='utf-8')
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Drop least recently used files beyond max_disk_entries"""
+        files = list(self.disk_dir.glob('*.html'))
+        if len(files) <= self.max_disk_entries:
+            return
+
+        def _mtime(p: Path) -> float:
+            try:
+                return p.stat().st_mtime
+            except OSError:
+                return 0.0
+
+        files.sort(key=_mtime)
+        for path in files[:len(files) - self.max_disk_entries]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
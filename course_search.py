@@ -0,0 +1,146 @@
+"""
+Course Search for Course Recommendation System
+Diacritic-insensitive trigram index over course ids, names and descriptions
+"""
+
+import math
+import re
+import unicodedata
+from typing import Dict, List, Mapping, Sequence, Set, Tuple
+
+import numpy as np
+
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip Vietnamese diacritics (đ -> d) and collapse everything else to single spaces"""
+    text = unicodedata.normalize('NFD', (text or '').lower().replace('đ', 'd'))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(' ', text).strip()
+
+
+def make_trigrams(normalized: str) -> Set[str]:
+    """Get the character trigrams of each word, padded so word starts and short words count"""
+    grams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class CourseSearchIndex:
+    """
+    Ranked fuzzy search over a course catalog
+
+    Ids and names form each course's title; descriptions are indexed separately
+    with a lower weight. A query scores every course by the idf-weighted share of
+    its trigrams the course contains (typos still share most trigrams), then the
+    best candidates get a boost for an id prefix or an exact substring match.
+    Postings are numpy index arrays (or masks for common trigrams), so one query
+    costs a few vectorized adds.
+    """
+
+    DESCRIPTION_WEIGHT = 0.3
+    ID_PREFIX_BOOST = 1.0
+    SUBSTRING_BOOST = 0.5
+
+    def __init__(self, courses: Sequence[Mapping]):
+        self._courses = courses
+        self._ids = [normalize_text(c['course_id']) for c in courses]
+        self._titles = [normalize_text(f"{c['course_id']} {c.get('course_name', '')}") for c in courses]
+
+        title_postings: Dict[str, List[int]] = {}
+        description_postings: Dict[str, List[int]] = {}
+        for i, course in enumerate(courses):
+            title_grams = make_trigrams(self._titles[i])
+            for gram in title_grams:
+                title_postings.setdefault(gram, []).append(i)
+            # Description trigrams already in the title would only double count
+            for gram in make_trigrams(normalize_text(course.get('description', ''))) - title_grams:
+                description_postings.setdefault(gram, []).append(i)
+
+        n = max(len(courses), 1)
+        self._title_postings = {g: self._pack(p, n) for g, p in title_postings.items()}
+        self._description_postings = {g: self._pack(p, n) for g, p in description_postings.items()}
+        self._idf = {
+            gram: math.log(1 + n / (len(title_postings.get(gram, ())) + len(description_postings.get(gram, ()))))
+            for gram in title_postings.keys() | description_postings.keys()
+        }
+        self._unseen_idf = math.log(1 + n)
+        self._major_masks: Dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def _pack(postings: List[int], n: int) -> np.ndarray:
+        # Scattered adds cost ~10x a dense pass per element, so common trigrams
+        # (in 1/8+ of the courses) are kept as boolean masks instead of index arrays
+        if len(postings) * 8 >= n:
+            mask = np.zeros(n, dtype=bool)
+            mask[postings] = True
+            return mask
+        return np.array(postings, dtype=np.int32)
+
+    @staticmethod
+    def _add(scores: np.ndarray, postings: np.ndarray, weight: float, buffer: np.ndarray) -> None:
+        if postings.dtype == bool:
+            np.add(scores, np.multiply(postings, np.float32(weight), out=buffer), out=scores)
+        else:
+            scores[postings] += weight
+
+    def _major_mask(self, major: str) -> np.ndarray:
+        mask = self._major_masks.get(major)
+        if mask is None:
+            mask = np.array([major in c.get('major', ()) for c in self._courses], dtype=bool)
+            self._major_masks[major] = mask
+        return mask
+
+    def search(self, query: str, limit: int = 20, major: str = None) -> List[Tuple[int, float]]:
+        """
+        Find the courses best matching a query
+
+        Args:
+            query: Free text ("giai tich", "IT00", "cau truc du lieu", ...)
+            limit: Maximum number of results
+            major: Only return courses of this major
+
+        Returns:
+            (course index, score) pairs, best first; indices refer to the indexed course list
+        """
+        normalized = normalize_text(query)
+        grams = make_trigrams(normalized)
+        if not grams or not self._courses:
+            return []
+
+        scores = np.zeros(len(self._courses), dtype=np.float32)
+        buffer = np.empty_like(scores)
+        total = 0.0
+        for gram in grams:
+            weight = self._idf.get(gram, self._unseen_idf)
+            total += weight
+            postings = self._title_postings.get(gram)
+            if postings is not None:
+                self._add(scores, postings, weight, buffer)
+            postings = self._description_postings.get(gram)
+            if postings is not None:
+                self._add(scores, postings, weight * self.DESCRIPTION_WEIGHT, buffer)
+        scores /= total
+        if major is not None:
+            scores[~self._major_mask(major)] = 0.0
+
+        # Boosts only need checking on the best few candidates
+        matched = np.flatnonzero(scores)
+        pool = min(len(matched), limit * 4)
+        if pool == 0:
+            return []
+        candidates = matched[np.argpartition(-scores[matched], pool - 1)[:pool]]
+        results = []
+        for i in candidates.tolist():
+            score = float(scores[i])
+            if self._ids[i].startswith(normalized):
+                score += self.ID_PREFIX_BOOST
+            elif normalized in self._titles[i]:
+                score += self.SUBSTRING_BOOST
+            results.append((i, score))
+        results.sort(key=lambda r: (-r[1], r[0]))
+        return results[:limit]
@@ -0,0 +1,155 @@
+"""
+Course Store for Course Recommendation System
+Interned course records shared by every curriculum and major hosted in one engine
+"""
+
+import sys
+from array import array
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Sequence, Set
+
+from knowledge_snapshot import freeze
+
+
+def _intern_list(values) -> List[str]:
+    return [sys.intern(v) if isinstance(v, str) else v for v in (values or [])]
+
+
+class CourseView(Sequence):
+    """
+    Zero-copy, read-only view of some courses in a CourseStore
+
+    Holds only a compact array of store indices; items are the store's own course dicts.
+    """
+
+    __slots__ = ('_courses', '_indices')
+
+    def __init__(self, courses: Sequence[Mapping], indices: array):
+        self._courses = courses
+        self._indices = indices
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._courses[i] for i in self._indices[position]]
+        return self._courses[self._indices[position]]
+
+    def __iter__(self) -> Iterator[Dict]:
+        courses = self._courses
+        for i in self._indices:
+            yield courses[i]
+
+    def filter(self, predicate: Callable[[Dict], bool]) -> 'CourseView':
+        """Get the sub-view of courses matching predicate"""
+        courses = self._courses
+        return CourseView(courses, array('I', (i for i in self._indices if predicate(courses[i]))))
+
+    @property
+    def indices(self) -> array:
+        return self._indices
+
+
+class CourseStore:
+    """
+    Deduplicated store of course records
+
+    Each course_id is stored once no matter how many faculties' catalogs list it
+    (ENG01, ME001, MA006, ...); majors from later catalogs are merged into the
+    existing record. Repeated strings (ids, groups, areas, majors) are interned.
+
+    Records are read-only mappings. Once frozen the store itself is immutable too;
+    changes go into a copy() that shares the unchanged records.
+    """
+
+    def __init__(self):
+        self.courses: Sequence[Mapping] = []
+        self.by_id: Mapping[str, Mapping] = {}
+        self._index: Dict[str, int] = {}
+        # course_id -> fields that differ between catalogs (first definition wins)
+        self.conflicts: Dict[str, List[str]] = {}
+        # Ids listed more than once within a single catalog
+        self.duplicate_ids: Set[str] = set()
+        self.frozen = False
+
+    def __len__(self) -> int:
+        return len(self.courses)
+
+    def index_of(self, course_id: str) -> int:
+        return self._index[course_id]
+
+    def freeze(self) -> None:
+        """Make the store immutable (records are already read-only)"""
+        if not self.frozen:
+            self.courses = tuple(self.courses)
+            self.by_id = MappingProxyType(self.by_id)
+            self.frozen = True
+
+    def copy(self) -> 'CourseStore':
+        """Get a mutable copy sharing this store's records"""
+        store = CourseStore()
+        store.courses = list(self.courses)
+        store.by_id = dict(self.by_id)
+        store._index = dict(self._index)
+        store.conflicts = dict(self.conflicts)
+        store.duplicate_ids = set(self.duplicate_ids)
+        return store
+
+    def intern(self, course: Dict) -> int:
+        """
+        Add a course record, or merge it into the already stored record with the same id
+
+        Returns:
+            Store index of the course
+        """
+        if self.frozen:
+            raise TypeError("Course store is frozen - intern into a copy()")
+
+        course_id = sys.intern(course['course_id'])
+        if course_id in self._index:
+            idx = self._index[course_id]
+            existing = self.courses[idx]
+            new_majors = tuple(m for m in _intern_list(course.get('major')) if m not in existing['major'])
+            if new_majors:
+                # Records are shared with earlier snapshots - replace, never mutate
+                merged = MappingProxyType({**existing, 'major': existing['major'] + new_majors})
+                self.courses[idx] = merged
+                self.by_id[course_id] = merged
+            differing = [key for key, value in course.items()
+                         if key != 'major' and existing.get(key) != freeze(value)]
+            if differing:
+                self.conflicts[course_id] = differing
+            return idx
+
+        record = dict(course)
+        record['course_id'] = course_id
+        record['major'] = _intern_list(course.get('major'))
+        record['prerequisites'] = _intern_list(course.get('prerequisites'))
+        if record.get('knowledge_area') is not None:
+            record['knowledge_area'] = _intern_list(record['knowledge_area'])
+        if isinstance(record.get('course_group'), str):
+            record['course_group'] = sys.intern(record['course_group'])
+        record = freeze(record)
+
+        idx = len(self.courses)
+        self.courses.append(record)
+        self.by_id[course_id] = record
+        self._index[course_id] = idx
+        return idx
+
+    def intern_catalog(self, courses: Iterable[Dict]) -> None:
+        """Intern every course of one catalog, noting ids the catalog lists more than once"""
+        seen = set()
+        for course in courses:
+            course_id = course.get('course_id')
+            if course_id in seen:
+                self.duplicate_ids.add(course_id)
+            seen.add(course_id)
+            self.intern(course)
+    
+    def view(self, predicate: Callable[[Dict], bool] = None) -> CourseView:
+        """Get a zero-copy view of all courses, or of those matching predicate"""
+        if predicate is None:
+            return CourseView(self.courses, array('I', range(len(self.courses))))
+        return CourseView(self.courses, array('I', (i for i, c in enumerate(self.courses) if predicate(c))))
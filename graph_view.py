@@ -0,0 +1,197 @@
+"""
+Prerequisite Graph Rendering for Course Recommendation System
+Renders the prerequisite graph tab, either as a lightweight component fed with
+node/edge JSON or as a self-contained pyvis HTML document
+"""
+
+import json
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+# networkx and pyvis (which pulls in IPython and jinja2) take ~0.9 s to import,
+# so they are imported inside the functions that need them: app startup and
+# engine users never pay for them, and a graph cache hit never loads them at all.
+
+
+# Node style (color, size) for each student status in the graph overlay
+GRAPH_STATUS_STYLES = {
+    'completed': ("#4CAF50", 30),  # Green for completed
+    'current': ("#FF9800", 35),    # Orange for currently taking
+    'not_taken': ("#2196F3", 25)   # Blue for not completed
+}
+
+
+def create_prerequisite_graph(base_graph, status_overlay):
+    """Create prerequisite relationship graph from the engine's base graph and a student overlay"""
+    import networkx as nx
+    
+    G = nx.DiGraph()
+    
+    # Add nodes - only color and size depend on the student
+    for node in base_graph['nodes']:
+        color, size = GRAPH_STATUS_STYLES[status_overlay.get(node['id'], 'not_taken')]
+        G.add_node(node['id'], label=node['label'], color=color, title=node['title'], size=size)
+    
+    # Add edges (prerequisites)
+    G.add_edges_from(base_graph['edges'])
+    
+    return G
+
+
+# Graph layout modes: server-side layered positions or client-side force simulation
+GRAPH_LAYOUTS = {
+    "Phân tầng (theo tiên quyết)": "layered",
+    "Mô phỏng lực (physics)": "physics"
+}
+
+
+def get_graph_options(layout="layered"):
+    """Build vis-network options for the given layout mode"""
+    options = {
+        "nodes": {
+            "shape": "dot",
+            "font": {"size": 14, "face": "arial", "color": "black"},
+            "scaling": {"min": 20, "max": 40}
+        },
+        "edges": {
+            "arrows": {"to": {"enabled": True, "scaleFactor": 1.2}},
+            "color": {"color": "#666666", "highlight": "#000000"},
+            "smooth": {"type": "curvedCW", "roundness": 0.2}
+        },
+        "interaction": {
+            "hover": True,
+            "tooltipDelay": 100,
+            "zoomView": True,
+            "dragView": True
+        }
+    }
+    
+    if layout == "layered":
+        # Positions come from the server - the browser runs no simulation
+        options["physics"] = {"enabled": False}
+        options["edges"]["smooth"] = {"type": "cubicBezier", "forceDirection": "vertical", "roundness": 0.4}
+    else:
+        # Configure physics for better layout
+        options["physics"] = {
+            "enabled": True,
+            "barnesHut": {
+                "gravitationalConstant": -50000,
+                "centralGravity": 0.5,
+                "springLength": 250,
+                "springConstant": 0.02,
+                "damping": 0.5
+            },
+            "maxVelocity": 50,
+            "minVelocity": 0.1
+        }
+    return options
+
+
+def visualize_graph(G, height="800px", positions=None):
+    """
+    Visualize graph using pyvis with improved settings
+    
+    If positions (course_id -> (x, y)) are given, nodes are pinned there and physics is disabled.
+    """
+    from pyvis.network import Network
+    
+    net = Network(height=height, width="100%", directed=True, 
+                  bgcolor="#ffffff", font_color="black")
+    net.from_nx(G)
+    
+    layout = "physics"
+    if positions:
+        layout = "layered"
+        for node in net.nodes:
+            if node['id'] in positions:
+                node['x'], node['y'] = positions[node['id']]
+                node['physics'] = False
+    
+    net.set_options(json.dumps(get_graph_options(layout)))
+    
+    # Render directly to a string (no temp file round trip)
+    return net.generate_html()
+
+
+# The component page (lib/index.html) loads the vis-network build shipped in lib/;
+# the browser fetches and caches it once instead of receiving it on every rerun
+_graph_component = components.declare_component(
+    "prerequisite_graph",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib")
+)
+
+
+def build_graph_data(base_graph, status_overlay, positions=None):
+    """
+    Build the JSON payload of the graph component
+    
+    Styles shared by all nodes and edges live in the options, so a node only carries
+    its id, label, tooltip, status color and size (and position in the layered layout).
+    
+    Returns:
+        Dictionary with 'nodes' (vis-network node dicts) and 'edges' ([prereq, course_id] pairs)
+    """
+    nodes = []
+    for node in base_graph['nodes']:
+        color, size = GRAPH_STATUS_STYLES[status_overlay.get(node['id'], 'not_taken')]
+        item = {'id': node['id'], 'label': node['label'], 'title': node['title'],
+                'color': color, 'size': size}
+        if positions and node['id'] in positions:
+            item['x'], item['y'] = positions[node['id']]
+        nodes.append(item)
+    return {'nodes': nodes, 'edges': [list(edge) for edge in base_graph['edges']]}
+
+
+def get_overlay_updates(old_overlay, new_overlay):
+    """Get the style updates (id, color, size) of nodes whose status differs between two overlays"""
+    updates = []
+    for course_id in old_overlay.keys() | new_overlay.keys():
+        status = new_overlay.get(course_id, 'not_taken')
+        if old_overlay.get(course_id, 'not_taken') != status:
+            color, size = GRAPH_STATUS_STYLES[status]
+            updates.append({'id': course_id, 'color': color, 'size': size})
+    updates.sort(key=lambda u: u['id'])
+    return updates
+
+
+def render_graph_component(graph_id, status_overlay, build_graph, options, height=900,
+                           key="prerequisite_graph"):
+    """
+    Render the graph component, sending only status changes once the browser holds the graph
+    
+    The browser is assumed to have applied the last (graph_id, version) sent in this
+    session, so a status change sends only the nodes whose status changed since then
+    and the browser updates them in place (no new layout) - one rerun, no round trip.
+    The full graph is sent on the first render, for another major or layout, and when
+    the page asks for a resync: a remounted page receiving an update against a graph
+    it does not hold reports a new resync token as the component value.
+    
+    Args:
+        graph_id: Identifies the graph structure (nodes, edges, positions, options)
+        status_overlay: course_id -> status of the displayed courses
+        build_graph: Callable returning build_graph_data(...), only called for full sends
+        options: vis-network options
+        key: Component key; '<key>_sync' in session state holds the last sent version
+    """
+    sync_key = f"{key}_sync"
+    sync = st.session_state.get(sync_key)
+    resync = (st.session_state.get(key) or {}).get('resync')
+    
+    if sync is None or sync['graph'] != graph_id or resync != sync['resync']:
+        version = sync['version'] + 1 if sync is not None else 1
+        args = {'graph': graph_id, 'version': version, 'full': build_graph(), 'options': options}
+    elif sync['overlay'] == status_overlay:
+        # Nothing changed: a page holding this version ignores it, a remounted one asks for a resync
+        version = sync['version']
+        args = {'graph': graph_id, 'version': version, 'base_version': version, 'updates': []}
+    else:
+        version = sync['version'] + 1
+        args = {'graph': graph_id, 'version': version, 'base_version': sync['version'],
+                'updates': get_overlay_updates(sync['overlay'], status_overlay)}
+    
+    st.session_state[sync_key] = {'graph': graph_id, 'version': version,
+                                  'overlay': dict(status_overlay), 'resync': resync}
+    
+    return _graph_component(**args, height=height, key=key, default=None)
@@ -0,0 +1,176 @@
+"""
+Knowledge Base Validation for Course Recommendation System
+Single-pass checks of courses, rules and teaching plans, cached by content hash
+"""
+
+from typing import Dict, Iterator, List, Mapping, Sequence, Tuple
+
+from cache import LRUCache
+
+
+# Fields every course record must carry (and their expected types)
+REQUIRED_COURSE_FIELDS = {
+    'course_id': str,
+    'course_name': str,
+    'credits': int,
+    'course_group': str,
+    'major': (list, tuple),
+    'prerequisites': (list, tuple)
+}
+
+# Reports keyed by kb_version (a content hash) - unchanged data is never revalidated
+_reports = LRUCache(max_entries=32)
+
+
+def iter_plan_semesters(plan: Mapping) -> Iterator[Tuple[int, Mapping]]:
+    """Yield (semester number, semester data) of a teaching plan, skipping non-numeric keys"""
+    for semester, semester_data in plan.get('semesters', {}).items():
+        if str(semester).strip().isdigit():
+            yield int(semester), semester_data
+
+
+def find_prerequisite_cycles(courses: Sequence[Mapping]) -> List[List[str]]:
+    """
+    Find prerequisite cycles with Tarjan's strongly connected components algorithm
+
+    Iterative, O(V + E). Edges run from a course to its prerequisites; edges to
+    unknown courses are ignored (reported as dangling references instead).
+
+    Returns:
+        Course ids of every cycle (components of 2+ courses, or a self-prerequisite)
+    """
+    graph = {c['course_id']: [p for p in dict.fromkeys(c.get('prerequisites') or ())] for c in courses}
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    cycles = []
+    counter = 0
+
+    for root in graph:
+        if root in index:
+            continue
+        # Each frame: (node, iterator over its successors)
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        frames = [(root, iter(graph[root]))]
+        while frames:
+            node, successors = frames[-1]
+            advanced = False
+            for successor in successors:
+                if successor not in graph:
+                    continue
+                if successor not in index:
+                    index[successor] = lowlink[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    frames.append((successor, iter(graph[successor])))
+                    advanced = True
+                    break
+                if successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            if advanced:
+                continue
+
+            frames.pop()
+            if frames:
+                parent = frames[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                if len(component) > 1 or node in graph[node]:
+                    cycles.append(component[::-1])
+    return cycles
+
+
+def validate_knowledge(courses: Sequence[Mapping], rules: Mapping, teaching_plans: Mapping,
+                       duplicate_ids: Sequence[str] = (), conflicting_ids: Sequence[str] = ()) -> Dict:
+    """
+    Check the knowledge base in one pass over courses, prerequisites and plan entries
+
+    Args:
+        courses: Course records (one per course_id)
+        duplicate_ids: Ids listed more than once within one catalog (see CourseStore)
+        conflicting_ids: Ids defined differently by different catalogs
+
+    Returns:
+        Dictionary with 'cycles', 'dangling_prerequisites' (course_id, prereq_id),
+        'dangling_plan_entries' (curriculum, semester, course_id),
+        'invalid_semesters' (curriculum, semester key that is not a number),
+        'dangling_option_courses' (curriculum, course_id), 'duplicate_ids',
+        'conflicting_ids', 'unknown_groups' (course_id, group),
+        'missing_fields' (course_id, field) and 'issue_count'
+    """
+    course_ids = {c.get('course_id') for c in courses}
+    known_groups = rules.get('difficulty_weights', {}).get('group_codes', {})
+
+    missing_fields = []
+    unknown_groups = []
+    dangling_prerequisites = []
+    for course in courses:
+        course_id = course.get('course_id')
+        for field, expected in REQUIRED_COURSE_FIELDS.items():
+            value = course.get(field)
+            if value is None or not isinstance(value, expected) or isinstance(value, bool):
+                missing_fields.append((course_id, field))
+        group = course.get('course_group')
+        if known_groups and isinstance(group, str) and group not in known_groups:
+            unknown_groups.append((course_id, group))
+        for prereq_id in course.get('prerequisites') or ():
+            if prereq_id not in course_ids:
+                dangling_prerequisites.append((course_id, prereq_id))
+
+    # Plan entries may use '-' (or no id) for placeholders; semesters must be numbered
+    dangling_plan_entries = []
+    invalid_semesters = []
+    for curriculum_key, plan in teaching_plans.get('teaching_plans', {}).items():
+        invalid_semesters.extend((curriculum_key, semester) for semester in plan.get('semesters', {})
+                                 if not str(semester).strip().isdigit())
+        for semester, semester_data in iter_plan_semesters(plan):
+            for entry in semester_data.get('courses', []):
+                entry_id = entry.get('id') or entry.get('course_id')
+                listed = [entry_id] if entry_id and entry_id != '-' else []
+                for course_id in listed + list(entry.get('choices', [])):
+                    if course_id not in course_ids:
+                        dangling_plan_entries.append((curriculum_key, semester, course_id))
+
+    dangling_option_courses = []
+    for curriculum_key, requirements in rules.get('graduation_requirements', {}).items():
+        options = requirements.get('categories', {}).get('tot_nghiep', {}).get('options', [])
+        for option in options:
+            if option.get('course_id') not in course_ids:
+                dangling_option_courses.append((curriculum_key, option.get('course_id')))
+
+    report = {
+        'cycles': find_prerequisite_cycles([c for c in courses if 'course_id' in c]),
+        'dangling_prerequisites': dangling_prerequisites,
+        'dangling_plan_entries': dangling_plan_entries,
+        'invalid_semesters': invalid_semesters,
+        'dangling_option_courses': dangling_option_courses,
+        'duplicate_ids': sorted(duplicate_ids),
+        'conflicting_ids': sorted(conflicting_ids),
+        'unknown_groups': unknown_groups,
+        'missing_fields': missing_fields
+    }
+    report['issue_count'] = sum(len(found) for found in report.values())
+    return report
+
+
+def get_validation_report(kb_version: str, courses: Sequence[Mapping], rules: Mapping,
+                          teaching_plans: Mapping, duplicate_ids: Sequence[str] = (),
+                          conflicting_ids: Sequence[str] = ()) -> Dict:
+    """Validate the knowledge base unless a report for this content hash already exists"""
+    report = _reports.get(kb_version)
+    if report is None:
+        report = validate_knowledge(courses, rules, teaching_plans, duplicate_ids, conflicting_ids)
+        _reports.put(kb_version, report)
+    return report
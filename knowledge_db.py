@@ -0,0 +1,274 @@
+"""
+SQLite Knowledge Base Backend for Course Recommendation System
+Imports courses.json, rules.json and teaching_plans.json into indexed SQLite tables
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from kb_validator import iter_plan_semesters
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS courses (
+    course_idx INTEGER PRIMARY KEY,
+    course_id TEXT NOT NULL UNIQUE,
+    course_name TEXT,
+    credits INTEGER,
+    course_group TEXT,
+    recommended_year INTEGER,
+    recommended_semester TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_courses_group ON courses (course_group);
+CREATE INDEX IF NOT EXISTS idx_courses_year_semester ON courses (recommended_year, recommended_semester);
+
+CREATE TABLE IF NOT EXISTS course_majors (
+    major TEXT NOT NULL,
+    course_idx INTEGER NOT NULL,
+    PRIMARY KEY (major, course_idx)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS course_areas (
+    knowledge_area TEXT NOT NULL,
+    course_idx INTEGER NOT NULL,
+    PRIMARY KEY (knowledge_area, course_idx)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS prerequisites (
+    course_id TEXT NOT NULL,
+    prereq_id TEXT NOT NULL,
+    PRIMARY KEY (course_id, prereq_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_prerequisites_prereq ON prerequisites (prereq_id, course_id);
+
+CREATE TABLE IF NOT EXISTS plan_entries (
+    curriculum_key TEXT NOT NULL,
+    semester INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    course_id TEXT,
+    entry_type TEXT,
+    elective_slot TEXT,
+    credits INTEGER,
+    PRIMARY KEY (curriculum_key, semester, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_plan_entries_course ON plan_entries (course_id);
+
+CREATE TABLE IF NOT EXISTS slot_choices (
+    curriculum_key TEXT NOT NULL,
+    semester INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    course_id TEXT NOT NULL,
+    PRIMARY KEY (curriculum_key, semester, position, course_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_slot_choices_course ON slot_choices (course_id);
+
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+_TABLES = ['courses', 'course_majors', 'course_areas', 'prerequisites',
+           'plan_entries', 'slot_choices', 'documents', 'meta']
+
+
+def get_default_db_path() -> Path:
+    """Get the default knowledge database path"""
+    return Path(__file__).parent / "data" / "knowledge.db"
+
+
+def get_versioned_db_path(db_path: Path, kb_version: str) -> Path:
+    """Get the database file holding one knowledge base version (knowledge.db -> knowledge_<version>.db)"""
+    return db_path.with_name(f"{db_path.stem}_{kb_version}{db_path.suffix}")
+
+
+# Open versioned databases: path -> [database, number of snapshots using it]
+_versioned_dbs = {}
+_versioned_lock = threading.Lock()
+
+
+def acquire_versioned_db(db_path: Path, kb_version: str) -> 'SQLiteKnowledgeBase':
+    """Open (or share the already open) database of one knowledge base version"""
+    path = get_versioned_db_path(db_path, kb_version)
+    with _versioned_lock:
+        entry = _versioned_dbs.get(path)
+        if entry is None:
+            entry = _versioned_dbs[path] = [SQLiteKnowledgeBase(path), 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def release_versioned_db(kb_db: 'SQLiteKnowledgeBase') -> None:
+    """Drop one user of a versioned database; the last one closes and deletes its files"""
+    with _versioned_lock:
+        entry = _versioned_dbs.get(kb_db.db_path)
+        if entry is None or entry[0] is not kb_db:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del _versioned_dbs[kb_db.db_path]
+    kb_db.close()
+    for suffix in ('', '-wal', '-shm'):
+        Path(f"{kb_db.db_path}{suffix}").unlink(missing_ok=True)
+
+
+class SQLiteKnowledgeBase:
+    """
+    Indexed SQLite copy of the JSON knowledge base
+
+    The database is (re)imported only when its stored kb_version differs from the
+    version of the JSON files. Queries return course ids in courses.json order.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = Path(db_path) if db_path else get_default_db_path()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection per thread (Streamlit serves sessions from several threads),
+        # all tracked so close() can release them
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Only used by the creating thread; close() may run on another one
+            conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=64, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Close the connections of every thread"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+    def get_kb_version(self) -> Optional[str]:
+        """Get the version of the imported knowledge base (None if empty)"""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'kb_version'").fetchone()
+        return row[0] if row else None
+
+    def import_knowledge(self, courses: List[Dict], rules: Dict, teaching_plans: Dict,
+                         kb_version: str, features: Dict[str, Dict] = None) -> bool:
+        """
+        Import the knowledge base unless this version is already present
+
+        Args:
+            features: Resolved per-course features (year/semester are taken from here when given)
+
+        Returns:
+            True if data was (re)imported
+        """
+        if self.get_kb_version() == kb_version:
+            return False
+
+        course_rows = []
+        major_rows = []
+        area_rows = []
+        prereq_rows = []
+        for idx, course in enumerate(courses):
+            course_id = course['course_id']
+            timing = features[course_id] if features is not None else {
+                'year': course.get('recommended_year'), 'semester': course.get('recommended_semester')
+            }
+            course_rows.append((
+                idx, course_id, course.get('course_name'), course.get('credits'),
+                course.get('course_group'), timing['year'], timing['semester']
+            ))
+            major_rows.extend((major, idx) for major in set(course.get('major') or []))
+            area_rows.extend((area, idx) for area in set(course.get('knowledge_area') or []))
+            prereq_rows.extend((course_id, pre) for pre in set(course.get('prerequisites') or []))
+
+        entry_rows = []
+        choice_rows = []
+        for curriculum_key, plan in teaching_plans.get('teaching_plans', {}).items():
+            for semester, semester_data in iter_plan_semesters(plan):
+                for position, entry in enumerate(semester_data.get('courses', [])):
+                    entry_rows.append((
+                        curriculum_key, semester, position,
+                        entry.get('course_id') or entry.get('id'), entry.get('type'),
+                        entry.get('elective_slot'), entry.get('credits')
+                    ))
+                    choice_rows.extend(
+                        (curriculum_key, semester, position, choice_id)
+                        for choice_id in set(entry.get('choices', []))
+                    )
+
+        conn = self._connection()
+        with conn:
+            for table in _TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            conn.executemany("INSERT INTO courses VALUES (?, ?, ?, ?, ?, ?, ?)", course_rows)
+            conn.executemany("INSERT INTO course_majors VALUES (?, ?)", major_rows)
+            conn.executemany("INSERT INTO course_areas VALUES (?, ?)", area_rows)
+            conn.executemany("INSERT INTO prerequisites VALUES (?, ?)", prereq_rows)
+            conn.executemany("INSERT INTO plan_entries VALUES (?, ?, ?, ?, ?, ?, ?)", entry_rows)
+            conn.executemany("INSERT INTO slot_choices VALUES (?, ?, ?, ?)", choice_rows)
+            conn.executemany("INSERT INTO documents VALUES (?, ?)", [
+                ('rules', json.dumps(rules, ensure_ascii=False)),
+                ('teaching_plans', json.dumps(teaching_plans, ensure_ascii=False))
+            ])
+            conn.execute("INSERT INTO meta VALUES ('kb_version', ?)", (kb_version,))
+        conn.execute("ANALYZE")
+        return True
+
+    def _course_ids(self, query: str, params) -> List[str]:
+        return [row[0] for row in self._connection().execute(query, params).fetchall()]
+
+    def get_courses_for_major(self, major: str, course_groups: List[str] = None) -> List[str]:
+        """Get ids of the major's courses, optionally restricted to some course groups"""
+        if course_groups is None:
+            return self._course_ids(
+                "SELECT c.course_id FROM course_majors m JOIN courses c ON c.course_idx = m.course_idx "
+                "WHERE m.major = ? ORDER BY m.course_idx",
+                (major,)
+            )
+        placeholders = ', '.join('?' for _ in course_groups)
+        return self._course_ids(
+            "SELECT c.course_id FROM course_majors m JOIN courses c ON c.course_idx = m.course_idx "
+            f"WHERE m.major = ? AND c.course_group IN ({placeholders}) ORDER BY m.course_idx",
+            (major, *course_groups)
+        )
+
+    def get_courses_by_knowledge_area(self, areas: List[str]) -> List[str]:
+        """Get ids of courses having any of the given knowledge areas"""
+        placeholders = ', '.join('?' for _ in areas)
+        return self._course_ids(
+            "SELECT DISTINCT c.course_id, c.course_idx FROM course_areas a "
+            f"JOIN courses c ON c.course_idx = a.course_idx WHERE a.knowledge_area IN ({placeholders}) "
+            "ORDER BY c.course_idx",
+            tuple(areas)
+        )
+
+    def get_courses_for_semester(self, major: str, year: int, semester: str,
+                                 course_groups: List[str]) -> List[str]:
+        """Get ids of the major's courses recommended for a year/semester within some course groups"""
+        placeholders = ', '.join('?' for _ in course_groups)
+        return self._course_ids(
+            "SELECT c.course_id FROM courses c JOIN course_majors m ON m.course_idx = c.course_idx "
+            "WHERE c.recommended_year = ? AND c.recommended_semester = ? AND m.major = ? "
+            f"AND c.course_group IN ({placeholders}) ORDER BY c.course_idx",
+            (year, semester, major, *course_groups)
+        )
+
+    def get_dependent_courses(self, course_id: str) -> List[str]:
+        """Get ids of courses that list course_id as a prerequisite"""
+        return self._course_ids(
+            "SELECT p.course_id FROM prerequisites p JOIN courses c ON c.course_id = p.course_id "
+            "WHERE p.prereq_id = ? ORDER BY c.course_idx",
+            (course_id,)
+        )
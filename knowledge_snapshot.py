@@ -0,0 +1,63 @@
+"""
+Knowledge Snapshots for Course Recommendation System
+Immutable, versioned copies of the knowledge base shared by all sessions
+"""
+
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Sequence
+
+
+def freeze(value: Any) -> Any:
+    """
+    Recursively convert a JSON-like value into read-only structures
+
+    dicts become mapping proxies, lists tuples and sets frozensets.
+    """
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Recursively convert a frozen value back into plain (mutable, JSON-serializable) dicts and lists"""
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        return [thaw(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return set(thaw(item) for item in value)
+    return value
+
+
+class KnowledgeSnapshot:
+    """
+    One immutable version of the knowledge base
+
+    courses, rules, teaching_plans, the per-course feature table and the validation
+    report are frozen, so a snapshot can be read by every session without locks.
+    Updates never touch a published snapshot - they build a new one and swap the
+    engine's reference. derived holds caches computed from this version only, and
+    is dropped together with the snapshot.
+    """
+
+    __slots__ = ('version', 'course_store', 'courses', 'courses_dict', 'rules', 'teaching_plans',
+                 'features', 'feature_misses', 'validation', 'derived', '__weakref__')
+
+    def __init__(self, course_store, rules: Mapping, teaching_plans: Mapping, version: str,
+                 features: Mapping, feature_misses: Mapping, validation: Mapping,
+                 derived: Dict[str, Any]):
+        course_store.freeze()
+        self.version = version
+        self.course_store = course_store
+        self.courses = course_store.courses
+        self.courses_dict = course_store.by_id
+        self.rules = freeze(rules)
+        self.teaching_plans = freeze(teaching_plans)
+        self.features = freeze(features)
+        self.feature_misses = freeze(feature_misses)
+        self.validation = freeze(validation)
+        self.derived = derived
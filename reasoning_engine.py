@@ -3,10 +3,37 @@ Reasoning Engine for Course Recommendation System
 Implements rule-based reasoning and scoring logic
 """
 
+import functools
+import hashlib
+import heapq
 import json
 import os
-from typing import Dict, List, Set, Tuple
+import re
+import threading
+import weakref
+from array import array
+from typing import Callable, Dict, List, Mapping, Sequence, Set, Tuple
 from pathlib import Path
+from types import MappingProxyType
+
+from cache import LRUCache, make_cache_key
+from course_store import CourseStore, CourseView
+from kb_validator import get_validation_report, iter_plan_semesters
+from knowledge_db import acquire_versioned_db, get_default_db_path, release_versioned_db
+from knowledge_snapshot import KnowledgeSnapshot, freeze, thaw
+from recommendation_result import RecommendationResult, TraceStep
+
+
+# Slot names like "Môn chuyên ngành 2 (chọn 1)" merge into "Môn chuyên ngành"
+_SLOT_NUMBER_PATTERN = re.compile(r'\s*\d+\s*$')
+_SLOT_CHOOSE_PATTERN = re.compile(r'\(chọn \d+\)')
+
+# Time availability -> preferred credit range
+_TIME_PREFERENCES = {
+    'Low': (1, 3),     # Prefer 1-3 credit courses
+    'Medium': (3, 4),  # Prefer 3-4 credit courses
+    'High': (4, 5)     # Can handle 4+ credit courses
+}
 
 
 def get_base_path():
@@ -18,8 +45,19 @@ def get_base_path():
 class ReasoningEngine:
     def __init__(self, courses_path: str = None, 
                  rules_path: str = None,
-                 teaching_plans_path: str = None):
-        """Initialize reasoning engine with knowledge base"""
+                 teaching_plans_path: str = None,
+                 backend: str = 'json',
+                 kb_db_path: str = None):
+        """
+        Initialize reasoning engine with knowledge base
+        
+        Args:
+            backend: 'json' scans the in-memory lists for course filters,
+                     'sqlite' answers them with indexed queries on an imported copy
+            kb_db_path: SQLite database path for the 'sqlite' backend; each knowledge
+                        base version is imported into its own file next to it,
+                        deleted once no snapshot of that version is in use
+        """
         base_path = get_base_path()
         
         # Use default paths relative to the script location
@@ -30,10 +68,274 @@ class ReasoningEngine:
         if teaching_plans_path is None:
             teaching_plans_path = base_path / "knowledge" / "teaching_plans.json"
             
-        self.courses = self._load_courses(courses_path)
-        self.rules = self._load_rules(rules_path)
-        self.teaching_plans = self._load_teaching_plans(teaching_plans_path)
-        self.courses_dict = {c['course_id']: c for c in self.courses}
+        # Courses of every hosted catalog live once in an interned store
+        course_store = CourseStore()
+        course_store.intern_catalog(self._load_courses(courses_path))
+        rules = self._load_rules(rules_path)
+        teaching_plans = self._load_teaching_plans(teaching_plans_path)
+        
+        # Content hash of the knowledge base - used to key derived caches
+        self._kb_sources = [courses_path, rules_path, teaching_plans_path]
+        
+        # Optional indexed backend for course filter queries
+        if backend not in ('json', 'sqlite'):
+            raise ValueError(f"Unknown knowledge base backend: {backend}")
+        self.backend = backend
+        self._kb_db_path = Path(kb_db_path) if kb_db_path else get_default_db_path()
+        
+        # Readers take no lock: they just read the current snapshot reference.
+        # Writers serialize on this lock and publish a new snapshot (copy-on-write).
+        self._update_lock = threading.Lock()
+        self._publish(course_store, rules, teaching_plans, self._compute_kb_version(self._kb_sources))
+    
+    def _publish(self, course_store: CourseStore, rules: Dict, teaching_plans: Dict, kb_version: str):
+        """Validate and freeze the knowledge base into a new snapshot and make it current"""
+        features, feature_misses = self._build_feature_table(course_store, rules, teaching_plans)
+        validation = get_validation_report(kb_version, course_store.courses, rules, teaching_plans,
+                                           course_store.duplicate_ids, course_store.conflicts.keys())
+        snapshot = KnowledgeSnapshot(course_store, rules, teaching_plans, kb_version,
+                                     features, feature_misses, validation, derived={
+            # Zero-copy per-major course views
+            'major_views': {},
+            # Per-major prerequisite graphs and layouts, built lazily once
+            'prerequisite_graphs': {},
+            'prerequisite_layouts': {},
+            # Per-profile semester plans
+            'semester_plans': LRUCache(max_entries=256),
+            # Inverted knowledge-area index and per-interest-set match counts
+            'interest_index': None,
+            'interest_counts': LRUCache(max_entries=256),
+            # Reverse prerequisite index (course -> dependents), built lazily once
+            'prerequisite_dependents': None,
+            # Per-curriculum teaching-plan index (offered semester types, plan semesters)
+            'plan_offerings': {},
+            # Per-(curriculum, semester) graduation option combinations
+            'graduation_options': {},
+            # Diacritic-insensitive trigram index for course search, built lazily once
+            'search_index': None,
+            # Per-profile recommendation pipeline results shared by all views
+            'pipeline_results': LRUCache(max_entries=256),
+            # Indexed SQLite copy of this version ('sqlite' backend only)
+            'kb_db': None,
+        })
+        if self.backend == 'sqlite':
+            # One database file per version: sessions still holding an older snapshot
+            # keep querying that version's file while the new one is imported
+            kb_db = acquire_versioned_db(self._kb_db_path, kb_version)
+            kb_db.import_knowledge(snapshot.courses, thaw(snapshot.rules),
+                                   thaw(snapshot.teaching_plans), kb_version, snapshot.features)
+            snapshot.derived['kb_db'] = kb_db
+            # Closed and deleted once no session holds a snapshot of this version.
+            # Not at interpreter exit: a restart on unchanged data reuses the file.
+            weakref.finalize(snapshot, release_versioned_db, kb_db).atexit = False
+        # A single reference assignment - sessions see either the old or the new snapshot
+        self._snapshot = snapshot
+    
+    def _build_feature_table(self, course_store: CourseStore, rules: Dict,
+                             teaching_plans: Dict) -> Tuple[Dict[str, Dict], Dict[str, List[str]]]:
+        """
+        Resolve the scoring and filtering features of every course once per snapshot
+        
+        Returns:
+            (features, misses) - course_id -> feature dict, and field -> ids of the
+            courses for which that field fell back to a default
+        """
+        # Earliest teaching-plan semester listing each course (compulsory or as a slot choice)
+        first_semester = {}
+        for plan in teaching_plans.get('teaching_plans', {}).values():
+            for semester, semester_data in iter_plan_semesters(plan):
+                for entry in semester_data.get('courses', []):
+                    for course_id in [entry.get('id') or entry.get('course_id'), *entry.get('choices', [])]:
+                        if course_id and semester < first_semester.get(course_id, semester + 1):
+                            first_semester[course_id] = semester
+        
+        features = {}
+        misses = {}
+        for course in course_store.courses:
+            course_features, missed = self._resolve_course_features(course, rules, first_semester)
+            features[course['course_id']] = course_features
+            for field in missed:
+                misses.setdefault(field, []).append(course['course_id'])
+        return features, misses
+    
+    def _resolve_course_features(self, course: Mapping, rules: Mapping,
+                                 first_semester: Mapping[str, int]) -> Tuple[Dict, List[str]]:
+        """
+        Resolve one course's features, applying defaults for missing fields
+        
+        year/semester come from the course record if present, else from the first
+        teaching-plan semester listing it. group_code maps the Vietnamese course_group
+        onto the difficulty group weights via rules['difficulty_weights']['group_codes'].
+        
+        Returns:
+            (features, names of the fields that fell back to a default)
+        """
+        weights = rules['difficulty_weights']
+        group_weights = weights['group_weights']
+        missed = []
+        
+        if course.get('recommended_year') is not None:
+            year = course['recommended_year']
+            semester = course.get('recommended_semester', 'HK1')
+        elif course['course_id'] in first_semester:
+            year = (first_semester[course['course_id']] + 1) // 2
+            semester = 'HK1' if first_semester[course['course_id']] % 2 else 'HK2'
+        else:
+            year, semester = 1, 'HK1'
+            missed.append('year')
+        
+        group = course.get('course_group')
+        group_code = group if group in group_weights else weights.get('group_codes', {}).get(group)
+        if group_code is None:
+            group_code = 'General'
+            missed.append('group_code')
+        
+        credits = course.get('credits')
+        if credits is None:
+            credits = 3
+            missed.append('credits')
+        
+        # Formula: difficulty = 2 × w1 × Npre + w2 × Yrec + w3 × Wgroup
+        n_pre = len(course.get('prerequisites') or [])
+        difficulty = (2 * weights['w1_prerequisite'] * n_pre + weights['w2_year'] * year
+                      + weights['w3_group'] * group_weights.get(group_code, 1))
+        
+        if credits <= 2:
+            credit_band = 'Low'
+        elif credits <= 4:
+            credit_band = 'Medium'
+        else:
+            credit_band = 'High'
+        
+        return {
+            'difficulty': difficulty,
+            'credits': credits,
+            'credit_band': credit_band,
+            'time_fit': {level: self._time_fit(credits, level) for level in _TIME_PREFERENCES},
+            'group_code': group_code,
+            'year': year,
+            'semester': semester
+        }, missed
+    
+    def get_course_features(self, course_id: str) -> Mapping:
+        """Get the precomputed features of a course (difficulty, credits, credit_band, time_fit, group_code, year, semester)"""
+        return self._snapshot.features[course_id]
+    
+    def get_validation_report(self) -> Mapping:
+        """Get the validation report of the current knowledge base (see kb_validator)"""
+        return self._snapshot.validation
+    
+    def get_feature_misses(self) -> Mapping[str, Sequence[str]]:
+        """Get, per feature field, the ids of courses that fell back to a default value"""
+        return self._snapshot.feature_misses
+    
+    @property
+    def snapshot(self) -> KnowledgeSnapshot:
+        """The current immutable knowledge base version"""
+        return self._snapshot
+    
+    @property
+    def course_store(self) -> CourseStore:
+        return self._snapshot.course_store
+    
+    @property
+    def courses(self) -> Sequence[Mapping]:
+        return self._snapshot.courses
+    
+    @property
+    def courses_dict(self) -> Mapping[str, Mapping]:
+        return self._snapshot.courses_dict
+    
+    @property
+    def rules(self) -> Mapping:
+        return self._snapshot.rules
+    
+    @property
+    def teaching_plans(self) -> Mapping:
+        return self._snapshot.teaching_plans
+    
+    @property
+    def kb_version(self) -> str:
+        return self._snapshot.version
+    
+    def add_knowledge_base(self, courses_path: str, teaching_plans_path: str = None,
+                           rules_path: str = None):
+        """
+        Host another faculty's catalog and curricula in this engine
+        
+        Courses already in the store (shared ones such as ENG01, ME001, MA006) are
+        not duplicated - the new catalog's majors are merged into the existing record.
+        Teaching plans, cohort mappings and graduation requirements are merged by key.
+        
+        Args:
+            courses_path: courses.json of the faculty
+            teaching_plans_path: teaching_plans.json of the faculty (optional)
+            rules_path: rules.json with faculty-specific requirements (optional)
+        """
+        with self._update_lock:
+            current = self._snapshot
+            course_store = current.course_store.copy()
+            course_store.intern_catalog(self._load_courses(courses_path))
+            sources = self._kb_sources + [courses_path]
+            
+            teaching_plans = thaw(current.teaching_plans)
+            rules = thaw(current.rules)
+            if teaching_plans_path is not None:
+                self._merge_knowledge(teaching_plans, self._load_teaching_plans(teaching_plans_path))
+                sources.append(teaching_plans_path)
+            if rules_path is not None:
+                self._merge_knowledge(rules, self._load_rules(rules_path))
+                sources.append(rules_path)
+            
+            self._publish(course_store, rules, teaching_plans, self._compute_kb_version(sources))
+            self._kb_sources = sources
+    
+    def update_knowledge(self, apply: Callable[[Dict], None]) -> str:
+        """
+        Copy-on-write update of the knowledge base
+        
+        Sessions already holding the current snapshot keep reading it unchanged;
+        calls made after the update see the new one.
+        
+        Args:
+            apply: Callback editing mutable copies in place, passed as
+                   {'courses': [...], 'rules': {...}, 'teaching_plans': {...}}
+            
+        Returns:
+            kb_version of the new snapshot
+        """
+        with self._update_lock:
+            current = self._snapshot
+            knowledge = {
+                'courses': thaw(current.courses),
+                'rules': thaw(current.rules),
+                'teaching_plans': thaw(current.teaching_plans)
+            }
+            apply(knowledge)
+            
+            course_store = CourseStore()
+            course_store.intern_catalog(knowledge['courses'])
+            payload = json.dumps(knowledge, sort_keys=True, ensure_ascii=False)
+            kb_version = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+            
+            self._publish(course_store, knowledge['rules'], knowledge['teaching_plans'], kb_version)
+            return kb_version
+    
+    def _merge_knowledge(self, target: Dict, source: Dict):
+        """Merge a knowledge document into target: dict sections by key, others kept if present"""
+        for key, value in source.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                target[key] = {**target[key], **value}
+            else:
+                target.setdefault(key, value)
+    
+    def get_majors(self) -> List[str]:
+        """Get all majors hosted by the engine"""
+        return sorted({major for c in self.courses for major in c['major']})
+    
+    def get_curricula(self) -> List[str]:
+        """Get all hosted curriculum keys (e.g. 'KHMT_K2024')"""
+        return sorted(self.teaching_plans.get('teaching_plans', {}).keys())
         
     def _load_courses(self, path: str) -> List[Dict]:
         """Load courses from JSON file"""
@@ -51,6 +353,199 @@ class ReasoningEngine:
         with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
     
+    def _compute_kb_version(self, paths: List[str]) -> str:
+        """Hash the raw knowledge files so any content change yields a new version"""
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()[:16]
+    
+    def get_courses_for_major(self, major: str, course_groups: List[str] = None) -> Sequence[Dict]:
+        """
+        Get the courses of a major, optionally restricted to some course groups
+        
+        Returns:
+            Read-only sequence of course dicts in knowledge base order
+        """
+        # Ids and records must come from the same snapshot
+        snapshot = self._snapshot
+        kb_db = snapshot.derived['kb_db']
+        if kb_db is not None:
+            return [snapshot.courses_dict[cid] for cid in kb_db.get_courses_for_major(major, course_groups)]
+        
+        # Views share the store's course records - only an index array is built per major
+        major_views = snapshot.derived['major_views']
+        view_key = (major, tuple(course_groups) if course_groups is not None else None)
+        view = major_views.get(view_key)
+        if view is None:
+            if course_groups is None:
+                view = snapshot.course_store.view(lambda c: major in c['major'])
+            else:
+                view = self.get_courses_for_major(major).filter(
+                    lambda c: c.get('course_group') in course_groups
+                )
+            major_views[view_key] = view
+        return view
+    
+    def get_courses_by_knowledge_area(self, areas: List[str]) -> List[Dict]:
+        """Get courses having any of the given knowledge areas"""
+        snapshot = self._snapshot
+        kb_db = snapshot.derived['kb_db']
+        if kb_db is not None:
+            return [snapshot.courses_dict[cid] for cid in kb_db.get_courses_by_knowledge_area(areas)]
+        
+        area_postings = self._get_interest_index(snapshot)[0]
+        matched = set().union(*(area_postings.get(area, ()) for area in areas))
+        return [snapshot.courses[idx] for idx in sorted(matched)]
+    
+    def _get_interest_index(self, snapshot: KnowledgeSnapshot) -> Tuple[Dict[str, array], Dict[str, array]]:
+        """
+        Get the snapshot's inverted indexes over course store indices (built once)
+        
+        Returns:
+            (area_postings, interest_postings) - knowledge area -> indices of its courses,
+            and interest (area or app tag from rules['interest_tags']) -> indices of matching courses
+        """
+        index = snapshot.derived['interest_index']
+        if index is None:
+            area_postings = {}
+            for idx, course in enumerate(snapshot.courses):
+                for area in set(course.get('knowledge_area') or ()):
+                    area_postings.setdefault(area, array('I')).append(idx)
+            
+            # App tags (ML, CV, ...) also match the knowledge areas they stand for
+            interest_postings = dict(area_postings)
+            for tag, tag_areas in snapshot.rules.get('interest_tags', {}).items():
+                matched = set(area_postings.get(tag, ()))
+                for area in tag_areas:
+                    matched.update(area_postings.get(area, ()))
+                interest_postings[tag] = array('I', sorted(matched))
+            
+            index = (area_postings, interest_postings)
+            snapshot.derived['interest_index'] = index
+        return index
+    
+    def get_interest_match_counts(self, interests: List[str]) -> Mapping[str, int]:
+        """
+        Count how many of the given interests every course matches
+        
+        One pass over the interests' posting lists; cached per interest set.
+        
+        Returns:
+            Read-only dict course_id -> number of matched interests (matching courses only)
+        """
+        snapshot = self._snapshot
+        key = frozenset(interests)
+        counts = snapshot.derived['interest_counts'].get(key)
+        if counts is None:
+            interest_postings = self._get_interest_index(snapshot)[1]
+            counts = {}
+            for interest in key:
+                for idx in interest_postings.get(interest, ()):
+                    course_id = snapshot.courses[idx]['course_id']
+                    counts[course_id] = counts.get(course_id, 0) + 1
+            counts = MappingProxyType(counts)
+            snapshot.derived['interest_counts'].put(key, counts)
+        return counts
+    
+    def get_courses_matching_interests(self, interests: List[str]) -> CourseView:
+        """Get a zero-copy view of the courses matching any of the given interests"""
+        snapshot = self._snapshot
+        interest_postings = self._get_interest_index(snapshot)[1]
+        matched = set().union(*(interest_postings.get(interest, ()) for interest in interests))
+        return CourseView(snapshot.courses, array('I', sorted(matched)))
+    
+    def search_courses(self, query: str, major: str = None, limit: int = 20) -> List[Mapping]:
+        """
+        Ranked fuzzy course search ignoring Vietnamese diacritics ("giai tich" finds "Giải tích")
+        
+        Args:
+            query: Text matched against course ids, names and descriptions
+            major: Only return courses of this major
+            limit: Maximum number of results
+            
+        Returns:
+            Matching course dicts, best first
+        """
+        snapshot = self._snapshot
+        index = snapshot.derived['search_index']
+        if index is None:
+            # Imported on first search: the index needs numpy, which CLI and
+            # worker users of the engine should not pay for at import time
+            from course_search import CourseSearchIndex
+            
+            # Benign race: two first searches may both build, one index is kept
+            index = CourseSearchIndex(snapshot.courses)
+            snapshot.derived['search_index'] = index
+        return [snapshot.courses[i] for i, _ in index.search(query, limit, major)]
+    
+    def get_dependent_courses(self, course_id: str) -> List[str]:
+        """Get ids of courses that have course_id as a prerequisite"""
+        kb_db = self._snapshot.derived['kb_db']
+        if kb_db is not None:
+            return kb_db.get_dependent_courses(course_id)
+        
+        return list(self.get_prerequisite_dependents().get(course_id, ()))
+    
+    def get_prerequisite_dependents(self) -> Mapping[str, Tuple[str, ...]]:
+        """
+        Get the reverse prerequisite index of the knowledge base (built once per snapshot)
+        
+        Returns:
+            Mapping of course_id -> ids of the courses listing it as a prerequisite, in course order
+        """
+        snapshot = self._snapshot
+        dependents = snapshot.derived['prerequisite_dependents']
+        if dependents is None:
+            index = {}
+            for course in snapshot.courses:
+                for pre in dict.fromkeys(course.get('prerequisites', ())):
+                    index.setdefault(pre, []).append(course['course_id'])
+            dependents = freeze(index)
+            snapshot.derived['prerequisite_dependents'] = dependents
+        return dependents
+    
+    def get_downstream_courses(self, course_ids: List[str]) -> List[str]:
+        """
+        Get every course that transitively depends on any of course_ids
+        
+        Returns:
+            Dependent course ids in breadth-first order (the given courses excluded)
+        """
+        dependents = self.get_prerequisite_dependents()
+        seen = set(course_ids)
+        downstream = []
+        frontier = list(course_ids)
+        while frontier:
+            next_frontier = []
+            for course_id in frontier:
+                for dependent in dependents.get(course_id, ()):
+                    if dependent not in seen:
+                        seen.add(dependent)
+                        downstream.append(dependent)
+                        next_frontier.append(dependent)
+            frontier = next_frontier
+        return downstream
+    
+    def _get_courses_for_semester(self, major: str, year: int, semester: str,
+                                  course_groups: List[str]) -> List[Dict]:
+        """Get the major's courses recommended for a year/semester within some course groups"""
+        snapshot = self._snapshot
+        kb_db = snapshot.derived['kb_db']
+        if kb_db is not None:
+            return [snapshot.courses_dict[cid]
+                    for cid in kb_db.get_courses_for_semester(major, year, semester, course_groups)]
+        
+        features = snapshot.features
+        return [
+            c for c in snapshot.courses
+            if features[c['course_id']]['year'] == year
+            and features[c['course_id']]['semester'] == semester
+            and c.get('course_group', '') in course_groups
+            and major in c['major']
+        ]
+    
     def determine_cohort(self, enrollment_year: int) -> str:
         """
         Determine student cohort (K18/K19/K20) from enrollment year
@@ -172,6 +667,377 @@ class ReasoningEngine:
             'total_credits': semester_data.get('total_credits', 0)
         }
     
+    def get_max_credits_per_semester(self) -> int:
+        """Get the R005 maximum credits per semester"""
+        for rule in self.rules.get('hard_rules', []):
+            if rule.get('rule_id') == 'R005':
+                return rule.get('max_credits', 24)
+        return 24
+    
+    def get_min_credits_per_semester(self) -> int:
+        """Get the R005 minimum credits per semester"""
+        for rule in self.rules.get('hard_rules', []):
+            if rule.get('rule_id') == 'R005':
+                return rule.get('min_credits', 14)
+        return 14
+    
+    def get_remaining_semester_plan(self, student_data: Dict) -> Mapping:
+        """
+        Build the view model for the current and all remaining semesters in one pass
+        
+        Results are cached per student profile, so repeated reruns only render. The
+        cached plan is shared by every session and therefore frozen.
+        
+        Args:
+            student_data: Student information including major, cohort, current_semester_number,
+                          completed_courses, current_courses, interests
+            
+        Returns:
+            Dictionary with 'max_credits' and 'semesters' - a list of per-semester entries with
+            display rows, credit totals, merged elective slot catalogs and (for the next
+            semester) scored choices per slot
+        """
+        snapshot = self._snapshot
+        semester_plans = snapshot.derived['semester_plans']
+        cache_key = make_cache_key('semester_plan', snapshot.version, student_data)
+        plan = semester_plans.get(cache_key)
+        if plan is None:
+            plan = freeze(self._build_remaining_semester_plan(student_data))
+            semester_plans.put(cache_key, plan)
+        return plan
+    
+    def run_recommendation_pipeline(self, student_data: Dict) -> RecommendationResult:
+        """
+        Run the recommendation pipeline once and share its result with every view
+        
+        Eligible courses, elective slot groups, inferred ability, scored candidates for
+        the next semester, activated rules, graduation progress, the remaining-semester
+        plan and the next semester's packed registration set are computed together and
+        cached per student profile, so the plan, trace and knowledge views read one
+        frozen result instead of each recomputing them.
+        
+        Args:
+            student_data: Student information (see get_remaining_semester_plan)
+            
+        Returns:
+            Immutable RecommendationResult for the current knowledge snapshot
+        """
+        snapshot = self._snapshot
+        pipeline_results = snapshot.derived['pipeline_results']
+        cache_key = make_cache_key('pipeline', snapshot.version, student_data)
+        result = pipeline_results.get(cache_key)
+        if result is None:
+            result = self._build_recommendation_result(snapshot.version, student_data)
+            pipeline_results.put(cache_key, result)
+        return result
+    
+    def _build_recommendation_result(self, kb_version: str, student_data: Dict) -> RecommendationResult:
+        """Compute one pipeline result (see run_recommendation_pipeline)"""
+        major = student_data.get('major')
+        cohort = student_data.get('cohort', 'K20')
+        next_semester = min(student_data.get('current_semester_number', 1) + 1, 7)
+        
+        eligible = freeze(self.get_eligible_courses(student_data))
+        slot_groups = freeze(self._get_elective_slot_groups(major, cohort))
+        ability = freeze(self.infer_student_ability(student_data))
+        
+        # Score the next semester's candidates outside its compulsory plan
+        semester_courses = self.get_semester_courses(major, next_semester, cohort)
+        planned_compulsory_ids = {c['course_id'] for c in semester_courses.get('compulsory', [])}
+        match_counts = self.get_interest_match_counts(student_data.get('interests', []))
+        scored = [self.compute_recommendation_score(course, student_data, ability, match_counts)
+                  for course in eligible
+                  if not course.get('is_failed') and course['course_id'] not in planned_compulsory_ids]
+        scored.sort(key=lambda x: x['total_score'], reverse=True)
+        scored = freeze(scored)
+        
+        activated_rules = freeze(self.get_activated_rules(
+            student_data, [c['course_id'] for c in eligible[:10]]))
+        
+        return RecommendationResult(
+            kb_version=kb_version,
+            next_semester=next_semester,
+            eligible=eligible,
+            slot_groups=slot_groups,
+            ability=ability,
+            scored=scored,
+            activated_rules=activated_rules,
+            progress=freeze(self.calculate_graduation_progress(student_data)),
+            semester_plan=self.get_remaining_semester_plan(student_data),
+            registration=freeze(self.pack_semester(student_data, eligible, next_semester)),
+            trace=self._build_reasoning_trace(freeze(student_data), eligible, scored, slot_groups, ability)
+        )
+    
+    def _build_remaining_semester_plan(self, student_data: Dict) -> Dict:
+        """Compute the remaining-semester view model (see get_remaining_semester_plan)"""
+        major = student_data.get('major')
+        cohort = student_data.get('cohort', 'K20')
+        current_semester = student_data.get('current_semester_number', 1)
+        completed = set(student_data.get('completed_courses', []))
+        current_courses = list(dict.fromkeys(student_data.get('current_courses', [])))
+        student_ability = None
+        match_counts = None
+        
+        semesters = []
+        for semester_num in range(current_semester, 8):
+            # For CURRENT semester: Only show courses being taken, no teaching plan
+            if semester_num == current_semester:
+                rows = []
+                for course_id in current_courses:
+                    course_info = self.courses_dict.get(course_id)
+                    if course_info:
+                        rows.append({
+                            'status': 'Đang học',
+                            'id': course_id,
+                            'name': course_info['course_name'],
+                            'credits': course_info['credits'],
+                            'type': 'Đăng ký',
+                            'choices': None
+                        })
+                semesters.append({
+                    'semester': semester_num,
+                    'is_current': True,
+                    'rows': rows,
+                    'total_credits': sum(r['credits'] for r in rows),
+                    'has_choices': False,
+                    'merged_slots': [],
+                    'slot_recommendations': [],
+                    'graduation_options': [],
+                    'graduation_option_count': 0
+                })
+                continue
+            
+            semester_data = self.get_semester_courses(major, semester_num, cohort)
+            
+            # For FUTURE semesters: Show teaching plan without completed courses
+            rows = []
+            for course in semester_data.get('compulsory', []):
+                course_id = course.get('course_id')
+                if course_id and course_id in completed:
+                    continue
+                if course.get('is_placeholder'):
+                    display_id = course_id if course_id == '-' else '(Chọn môn)'
+                else:
+                    display_id = course_id if course_id else ''
+                rows.append({
+                    'status': 'Kế hoạch',
+                    'id': display_id,
+                    'name': course['course_name'],
+                    'credits': course['credits'],
+                    'type': 'Bắt buộc',
+                    'choices': None
+                })
+            
+            for course in semester_data.get('elective', []):
+                course_id = course.get('course_id')
+                if course_id and course_id in completed:
+                    continue
+                
+                # Handle elective slot with choices
+                if course.get('is_elective_slot'):
+                    choices_ids = course.get('all_choices', [])
+                    choices_str = ', '.join(choices_ids[:5])  # Show first 5
+                    if len(choices_ids) > 5:
+                        choices_str += f'... (+{len(choices_ids)-5} môn)'
+                    rows.append({
+                        'status': 'Kế hoạch',
+                        'id': f'[{len(choices_ids)} môn]',
+                        'name': course.get('slot_name', 'Môn tự chọn'),
+                        'credits': course['credits'],
+                        'type': 'Tự chọn',
+                        'choices': choices_str
+                    })
+                else:
+                    rows.append({
+                        'status': 'Kế hoạch',
+                        'id': '(Chọn môn)' if course.get('is_placeholder') else course_id,
+                        'name': course['course_name'],
+                        'credits': course['credits'],
+                        'type': 'Tự chọn',
+                        'choices': None
+                    })
+            
+            total_credits = sum(r['credits'] for r in rows)
+            
+            # Semester-7 graduation options - course combinations meeting the tot_nghiep credits
+            graduation_options = []
+            if semester_num == 7:
+                graduation_options = self.rank_graduation_options(student_data, semester_num)
+            
+            # Merge similar slots (chuyên ngành 1,2 / tự do 1,2) with unique choices
+            merged = {}
+            for slot in semester_data.get('elective_slots', []):
+                base_name = self._get_slot_base_name(slot['slot_name'])
+                
+                if base_name not in merged:
+                    merged[base_name] = {
+                        'name': base_name,
+                        'credits': slot['credits'],
+                        'choices': [],
+                        'choice_ids': set(),
+                        'slot_count': 0
+                    }
+                entry = merged[base_name]
+                entry['slot_count'] += 1
+                for choice in slot['choices']:
+                    if choice['course_id'] not in entry['choice_ids']:
+                        entry['choice_ids'].add(choice['course_id'])
+                        entry['choices'].append(choice)
+            
+            # Score slot choices by interests - only for next semester
+            slot_recommendations = []
+            if semester_num == current_semester + 1 and merged:
+                if student_ability is None:
+                    student_ability = self.infer_student_ability(student_data)
+                    match_counts = self.get_interest_match_counts(student_data.get('interests', []))
+                for entry in merged.values():
+                    scored = [self.compute_recommendation_score(course, student_data, student_ability, match_counts)
+                              for course in entry['choices']]
+                    scored.sort(key=lambda x: x['total_score'], reverse=True)
+                    # Show top N based on how many need to be chosen (at least 5)
+                    top_n = min(max(entry['slot_count'] + 3, 5), len(scored))
+                    slot_recommendations.append({
+                        'name': entry['name'],
+                        'slot_count': entry['slot_count'],
+                        'num_choices': len(entry['choices']),
+                        'top_courses': scored[:top_n]
+                    })
+            
+            merged_slots = []
+            for entry in merged.values():
+                del entry['choice_ids']
+                # Sort choices by knowledge_area for better grouping
+                entry['choices'] = sorted(entry['choices'],
+                                          key=lambda x: (x.get('knowledge_area') or ['ZZZ'])[0])
+                merged_slots.append(entry)
+            
+            semesters.append({
+                'semester': semester_num,
+                'is_current': False,
+                'rows': rows,
+                'total_credits': total_credits,
+                'has_choices': any(r['choices'] for r in rows),
+                'merged_slots': merged_slots,
+                'slot_recommendations': slot_recommendations,
+                'graduation_options': graduation_options,
+                'graduation_option_count': len(graduation_options)
+            })
+        
+        return {
+            'max_credits': self.get_max_credits_per_semester(),
+            'semesters': semesters
+        }
+    
+    def get_graduation_options(self, major: str, cohort: str, semester_number: int = 7) -> Tuple[Mapping, ...]:
+        """
+        Enumerate the course combinations of a semester that meet the graduation credits
+        
+        Candidates are the semester's teaching-plan entries (elective slots excluded);
+        combinations must sum exactly to the tot_nghiep credits of graduation_requirements
+        (memoized subset-sum). Cached per curriculum.
+        
+        Returns:
+            Tuple of frozen options with 'courses' (course_id, course_name, credits,
+            is_placeholder), 'credits' and 'option_type' (matched requirement option, or None)
+        """
+        curriculum_key = self.get_curriculum_for_cohort(cohort, major)
+        snapshot = self._snapshot
+        graduation_options = snapshot.derived['graduation_options']
+        cache_key = (curriculum_key, semester_number)
+        if cache_key in graduation_options:
+            return graduation_options[cache_key]
+        
+        tot_nghiep = (snapshot.rules.get('graduation_requirements', {}).get(curriculum_key, {})
+                      .get('categories', {}).get('tot_nghiep', {}))
+        required_credits = tot_nghiep.get('credits', 10)
+        option_types = {option['course_id']: option['type'] for option in tot_nghiep.get('options', [])}
+        
+        # Credits come from the plan entry (a course may count differently in this plan)
+        semester_data = (snapshot.teaching_plans.get('teaching_plans', {}).get(curriculum_key, {})
+                         .get('semesters', {}).get(str(semester_number), {}))
+        candidates = []
+        for entry in semester_data.get('courses', []):
+            if 'elective_slot' in entry:
+                continue
+            course_id = entry.get('id') or entry.get('course_id')
+            course_info = snapshot.courses_dict.get(course_id, {})
+            candidates.append({
+                'course_id': course_id,
+                'course_name': entry.get('name') or course_info.get('course_name') or entry.get('placeholder', ''),
+                'credits': entry.get('credits', course_info.get('credits', 0)),
+                'is_placeholder': course_id not in snapshot.courses_dict
+            })
+        
+        @functools.lru_cache(maxsize=None)
+        def combinations(start: int, remaining: int) -> Tuple[Tuple[int, ...], ...]:
+            # Index tuples of candidates[start:] summing to exactly `remaining` credits
+            if remaining == 0:
+                return ((),)
+            found = []
+            for i in range(start, len(candidates)):
+                credits = candidates[i]['credits']
+                if 0 < credits <= remaining:
+                    found.extend((i,) + rest for rest in combinations(i + 1, remaining - credits))
+            return tuple(found)
+        
+        options = []
+        for combination in combinations(0, required_credits):
+            courses = [candidates[i] for i in combination]
+            option_type = next((option_types[c['course_id']] for c in courses
+                                if c['course_id'] in option_types), None)
+            options.append({'courses': courses, 'credits': required_credits, 'option_type': option_type})
+        
+        options = freeze(options)
+        graduation_options[cache_key] = options
+        return options
+    
+    def rank_graduation_options(self, student_data: Dict, semester_number: int = 7) -> List[Dict]:
+        """
+        Rank a student's remaining graduation options by feasibility, then score
+        
+        Options containing an already completed course are left out. An option is
+        feasible when every real course has its prerequisites completed or in progress;
+        its score is the mean recommendation score of its real (non-placeholder) courses.
+        
+        Returns:
+            List of options (see get_graduation_options) with 'feasible',
+            'missing_prerequisites' and 'score' (None for placeholder-only options)
+        """
+        completed = set(student_data.get('completed_courses', []))
+        passed_or_current = completed | set(student_data.get('current_courses', []))
+        student_ability = None
+        match_counts = None
+        
+        ranked = []
+        for option in self.get_graduation_options(student_data.get('major'),
+                                                  student_data.get('cohort', 'K20'), semester_number):
+            real_courses = [c for c in option['courses'] if not c['is_placeholder']]
+            if any(c['course_id'] in completed for c in real_courses):
+                continue
+            
+            missing = []
+            scores = []
+            for course in real_courses:
+                course_info = self.courses_dict.get(course['course_id'])
+                if course_info is None:
+                    continue
+                missing += self.check_prerequisites(course['course_id'], passed_or_current)[1]
+                if student_ability is None:
+                    student_ability = self.infer_student_ability(student_data)
+                    match_counts = self.get_interest_match_counts(student_data.get('interests', []))
+                scores.append(self.compute_recommendation_score(
+                    course_info, student_data, student_ability, match_counts)['total_score'])
+            
+            ranked.append({
+                **thaw(option),
+                'feasible': not missing,
+                'missing_prerequisites': list(dict.fromkeys(missing)),
+                'score': sum(scores) / len(scores) if scores else None
+            })
+        
+        ranked.sort(key=lambda o: (not o['feasible'], o['score'] is None, -(o['score'] or 0)))
+        return ranked
+    
     def calculate_graduation_progress(self, student_data: Dict) -> Dict:
         """
         Calculate graduation progress based on completed courses
@@ -287,25 +1153,51 @@ class ReasoningEngine:
         Returns:
             List of semester types where course is offered ['HK1'] or ['HK2'] or ['HK1', 'HK2']
         """
-        curriculum_key = self.get_curriculum_for_cohort(cohort, major)
-        teaching_plan = self.teaching_plans.get('teaching_plans', {}).get(curriculum_key, {})
-        
-        offered_semesters = set()
+        offered = self._get_plan_offerings(major, cohort)['offered'].get(course_id)
+        return sorted(offered) if offered else ['HK1', 'HK2']  # Default: both
+    
+    def _get_plan_offerings(self, major: str, cohort: str) -> Mapping:
+        """
+        Index the curriculum's teaching plan once per snapshot
         
-        for semester_num, semester_data in teaching_plan.get('semesters', {}).items():
-            sem_num = int(semester_num)
+        Returns:
+            Frozen mapping with 'offered' (course_id -> semester types listing it, as a
+            compulsory entry or elective choice), 'planned' (course_id -> earliest plan
+            semester), 'compulsory' (ids of compulsory plan courses) and 'last_semester'
+        """
+        curriculum_key = self.get_curriculum_for_cohort(cohort, major)
+        snapshot = self._snapshot
+        plan_offerings = snapshot.derived['plan_offerings']
+        if curriculum_key in plan_offerings:
+            return plan_offerings[curriculum_key]
+        
+        teaching_plan = snapshot.teaching_plans.get('teaching_plans', {}).get(curriculum_key, {})
+        offered = {}
+        planned = {}
+        compulsory = set()
+        last_semester = 0
+        for sem_num, semester_data in iter_plan_semesters(teaching_plan):
             semester_type = "HK1" if sem_num % 2 == 1 else "HK2"
+            last_semester = max(last_semester, sem_num)
             
-            # Check courses - support both 'id' and 'course_id' keys
+            # Support both 'id' and 'course_id' keys, plus elective choices
             for course in semester_data.get('courses', []):
                 cid = course.get('course_id') or course.get('id')
-                if cid == course_id:
-                    offered_semesters.add(semester_type)
-                # Check elective choices
-                if 'choices' in course and course_id in course['choices']:
-                    offered_semesters.add(semester_type)
-        
-        return list(offered_semesters) if offered_semesters else ['HK1', 'HK2']  # Default: both
+                if cid in snapshot.courses_dict and 'elective_slot' not in course:
+                    compulsory.add(cid)
+                for listed in [cid, *course.get('choices', [])]:
+                    if listed:
+                        offered.setdefault(listed, set()).add(semester_type)
+                        planned[listed] = min(planned.get(listed, sem_num), sem_num)
+        
+        offerings = freeze({
+            'offered': offered,
+            'planned': planned,
+            'compulsory': frozenset(compulsory),
+            'last_semester': last_semester
+        })
+        plan_offerings[curriculum_key] = offerings
+        return offerings
     
     def get_next_retake_semester(self, course_id: str, current_semester_number: int, 
                                   major: str, cohort: str) -> int:
@@ -341,6 +1233,90 @@ class ReasoningEngine:
         
         return current_semester_number + 2  # Default: skip one semester
     
+    def schedule_retakes(self, student_data: Dict) -> Dict:
+        """
+        Schedule all failed courses at once and propagate the delays downstream
+        
+        Each failed course is retaken in the first semester after the current one in
+        which it is offered (and after any failed prerequisite it waits for). Its
+        dependents can then start no earlier than the semester after it, again aligned
+        to their offered semester type, and so on through the prerequisite DAG in
+        topological order. Current courses are assumed passed.
+        
+        Args:
+            student_data: Student information including major, cohort, current_semester_number,
+                          completed_courses, current_courses, failed_courses
+            
+        Returns:
+            Dictionary with 'retakes' (failed course_id -> retake semester), 'delays'
+            (course_id -> {'planned', 'scheduled'} for downstream courses pushed past their
+            plan semester), 'planned_graduation_semester' and 'graduation_semester'
+        """
+        major = student_data.get('major')
+        cohort = student_data.get('cohort', 'K20')
+        current_semester = student_data.get('current_semester_number', 1)
+        completed = set(student_data.get('completed_courses', []))
+        current_courses = set(student_data.get('current_courses', []))
+        courses_dict = self.courses_dict
+        failed = [c for c in dict.fromkeys(student_data.get('failed_courses', []))
+                  if c in courses_dict and c not in completed and c not in current_courses]
+        
+        offerings = self._get_plan_offerings(major, cohort)
+        offered = offerings['offered']
+        planned = offerings['planned']
+        
+        def align(semester: int, course_id: str) -> int:
+            # First semester >= semester whose type (odd HK1 / even HK2) offers the course
+            types = offered.get(course_id)
+            if not types or len(types) == 2:
+                return semester
+            return semester if ("HK1" if semester % 2 == 1 else "HK2") in types else semester + 1
+        
+        # Topological order (Kahn) over the failed courses and everything downstream of them
+        affected = set(failed)
+        affected.update(c for c in self.get_downstream_courses(failed)
+                        if major in courses_dict[c]['major'] and c not in completed and c not in current_courses)
+        dependents = self.get_prerequisite_dependents()
+        in_degree = {c: sum(1 for pre in dict.fromkeys(courses_dict[c].get('prerequisites', ())) if pre in affected)
+                     for c in affected}
+        ready = [c for c in failed if in_degree[c] == 0]
+        ready += [c for c, degree in in_degree.items() if degree == 0 and c not in ready]
+        
+        earliest = {}
+        scheduled = {}
+        while ready:
+            course_id = ready.pop()
+            # Unaffected courses run from their plan semester (but never before next semester)
+            start = max(current_semester + 1, earliest.get(course_id, 0),
+                        0 if course_id in failed else planned.get(course_id, 0))
+            scheduled[course_id] = align(start, course_id)
+            for dependent in dependents.get(course_id, ()):
+                if dependent in in_degree:
+                    earliest[dependent] = max(earliest.get(dependent, 0), scheduled[course_id] + 1)
+                    in_degree[dependent] -= 1
+                    if in_degree[dependent] == 0:
+                        ready.append(dependent)
+        
+        retakes = {c: scheduled[c] for c in failed if c in scheduled}
+        delays = {}
+        for course_id, semester in sorted(scheduled.items(), key=lambda item: (item[1], item[0])):
+            if course_id in retakes:
+                continue
+            baseline = align(max(current_semester + 1, planned.get(course_id, 0)), course_id)
+            if semester > baseline:
+                delays[course_id] = {'planned': baseline, 'scheduled': semester}
+        
+        # Elective choices can be swapped for another choice; failed and compulsory courses cannot
+        planned_graduation = max(offerings['last_semester'], current_semester)
+        binding = [semester for c, semester in scheduled.items()
+                   if c in retakes or c in offerings['compulsory']]
+        return {
+            'retakes': retakes,
+            'delays': delays,
+            'planned_graduation_semester': planned_graduation,
+            'graduation_semester': max([planned_graduation, *binding])
+        }
+    
     def prioritize_courses_by_teaching_plan(self, eligible_courses: List[Dict], 
                                            semester_number: int, major: str, cohort: str) -> List[Dict]:
         """
@@ -381,6 +1357,180 @@ class ReasoningEngine:
         
         return priority_1 + priority_2 + priority_3 + priority_4
     
+    @staticmethod
+    def _get_slot_base_name(slot_name: str) -> str:
+        """Get the merged name of an elective slot ("Môn chuyên ngành 2 (chọn 1)" -> "Môn chuyên ngành")"""
+        base_name = _SLOT_NUMBER_PATTERN.sub('', slot_name).strip()
+        return _SLOT_CHOOSE_PATTERN.sub('', base_name).strip()
+    
+    @staticmethod
+    def _fits_slots(slot_memberships: Sequence[Sequence[int]], capacities: Sequence[int]) -> bool:
+        """
+        Check that chosen slot courses can be assigned to distinct slots
+        
+        Args:
+            slot_memberships: For each chosen slot course, the slot groups listing it
+            capacities: Number of slots of each group
+        """
+        remaining = list(capacities)
+        
+        # Backtracking over a handful of courses and groups
+        def _assign(i: int) -> bool:
+            if i == len(slot_memberships):
+                return True
+            for group in slot_memberships[i]:
+                if remaining[group]:
+                    remaining[group] -= 1
+                    if _assign(i + 1):
+                        return True
+                    remaining[group] += 1
+            return False
+        
+        return _assign(0)
+    
+    def pack_semester(self, student_data: Dict, eligible_courses: Sequence[Mapping] = None,
+                      semester_number: int = None, num_alternatives: int = 3) -> Dict:
+        """
+        Choose the registration set for a semester within the R005 credit window
+        
+        0/1 knapsack over credits (dynamic programming, keeping the k best sets per
+        credit total). Sets are compared lexicographically: more courses of a higher
+        prioritize_courses_by_teaching_plan tier first, then the summed recommendation
+        score. Only the best few courses of each (tier, credits) group can be part of
+        one of the k best sets, so large eligible pools are pruned before the DP.
+        
+        Candidates must pass the hard rules (_check_special_course_rules) for the
+        target year and semester. Alternatives of the semester's elective slots
+        (merged by name as in the plan view) fill at most slot_count picks per slot
+        group; sets breaking that are never extended.
+        
+        Args:
+            student_data: Student information
+            eligible_courses: Candidate courses (default: get_eligible_courses)
+            semester_number: Semester to register for (default: the next semester)
+            num_alternatives: Number of runner-up sets to return besides the best one
+            
+        Returns:
+            Dictionary with 'semester', 'min_credits', 'max_credits', 'feasible' (whether the
+            minimum is reachable), 'best' and 'alternatives' - sets of 'courses' (course_id,
+            course_name, credits, tier, total_score), 'total_credits' and 'total_score'
+        """
+        major = student_data.get('major')
+        cohort = student_data.get('cohort', 'K20')
+        if semester_number is None:
+            semester_number = min(student_data.get('current_semester_number', 1) + 1, 7)
+        if eligible_courses is None:
+            eligible_courses = self.get_eligible_courses(student_data)
+        min_credits = self.get_min_credits_per_semester()
+        max_credits = self.get_max_credits_per_semester()
+        keep = num_alternatives + 1
+        year = (semester_number + 1) // 2
+        semester = 'HK1' if semester_number % 2 else 'HK2'
+        
+        # Tier of each course = its priority group in prioritize_courses_by_teaching_plan
+        planned = self.get_semester_courses(major, semester_number, cohort)
+        planned_compulsory_ids = {c['course_id'] for c in planned['compulsory']}
+        planned_elective_ids = {c['course_id'] for c in planned['elective']}
+        
+        # Elective slot groups of the semester: slot_count picks among their choices
+        slot_indices = {}
+        slot_capacities = []
+        slot_memberships = {}
+        for slot in planned['elective_slots']:
+            base_name = self._get_slot_base_name(slot['slot_name'])
+            if base_name not in slot_indices:
+                slot_indices[base_name] = len(slot_capacities)
+                slot_capacities.append(0)
+            group = slot_indices[base_name]
+            slot_capacities[group] += 1
+            for choice in slot['choices']:
+                memberships = slot_memberships.setdefault(choice['course_id'], [])
+                if group not in memberships:
+                    memberships.append(group)
+        
+        def tier_of(course: Mapping) -> int:
+            if course['course_id'] in planned_compulsory_ids:
+                return 1
+            if course['course_id'] in planned_elective_ids:
+                return 2
+            return 3 if course.get('course_group', '') in ['Đại cương', 'Cơ sở ngành'] else 4
+        
+        student_ability = self.infer_student_ability(student_data)
+        match_counts = self.get_interest_match_counts(student_data.get('interests', []))
+        groups = {}
+        # Zero-credit courses (PE, ME) do not count toward R005 and join every set
+        free_items = []
+        for course in eligible_courses:
+            credits = course.get('credits') or 0
+            if credits <= max_credits and self._check_special_course_rules(course, year, semester):
+                scored = self.compute_recommendation_score(course, student_data, student_ability, match_counts)
+                if credits > 0:
+                    # Courses with the same tier, credits and slot groups are interchangeable
+                    memberships = tuple(slot_memberships.get(course['course_id'], ()))
+                    groups.setdefault((tier_of(course), credits, memberships), []).append(
+                        (scored['total_score'], course, scored))
+                else:
+                    free_items.append((0, tier_of(course), scored))
+        
+        # A set holds at most max_credits courses scoring <= 1 each, so one course of a tier
+        # outweighs any number of lower-tier courses and any score difference
+        tier_base = max_credits + 1
+        tier_weights = {tier: float(tier_base ** (5 - tier)) for tier in range(1, 5)}
+        items = []
+        for (tier, credits, memberships), members in groups.items():
+            members.sort(key=lambda m: m[0], reverse=True)
+            limit = max_credits // credits
+            if memberships:
+                limit = min(limit, sum(slot_capacities[group] for group in memberships))
+            for score, course, scored in members[:limit + num_alternatives]:
+                items.append((tier_weights[tier] + score, credits, tier, scored, memberships))
+        
+        def _fits(chosen: Tuple[int, ...], idx: int) -> bool:
+            if not items[idx][4]:
+                return True
+            return self._fits_slots([items[i][4] for i in chosen + (idx,) if items[i][4]], slot_capacities)
+        
+        # best[c]: up to `keep` (value, chosen item indices) with exactly c credits, best first
+        best = [[] for _ in range(max_credits + 1)]
+        best[0] = [(0.0, ())]
+        for idx, (value, credits, _, _, _) in enumerate(items):
+            for total in range(max_credits, credits - 1, -1):
+                source = best[total - credits]
+                if source:
+                    candidates = [(v + value, chosen + (idx,)) for v, chosen in source if _fits(chosen, idx)]
+                    if candidates:
+                        best[total] = heapq.nlargest(keep, best[total] + candidates, key=lambda x: x[0])
+        
+        feasible = any(best[total] for total in range(min_credits, max_credits + 1))
+        window = range(min_credits, max_credits + 1) if feasible else range(max_credits + 1)
+        ranked = heapq.nlargest(keep, (entry for total in window for entry in best[total]),
+                                key=lambda x: x[0])
+        
+        packings = []
+        for _, chosen in ranked:
+            courses = sorted(({
+                'course_id': scored['course_id'],
+                'course_name': scored['course_name'],
+                'credits': credits,
+                'tier': tier,
+                'total_score': scored['total_score']
+            } for credits, tier, scored in [items[i][1:4] for i in chosen] + free_items),
+                key=lambda c: (c['tier'], -c['total_score']))
+            packings.append({
+                'courses': courses,
+                'total_credits': sum(c['credits'] for c in courses),
+                'total_score': sum(c['total_score'] for c in courses)
+            })
+        
+        return {
+            'semester': semester_number,
+            'min_credits': min_credits,
+            'max_credits': max_credits,
+            'feasible': feasible,
+            'best': packings[0],
+            'alternatives': packings[1:]
+        }
+    
     def check_prerequisites(self, course_id: str, completed_courses: List[str]) -> Tuple[bool, List[str]]:
         """
         Check if student has completed all prerequisites for a course
@@ -424,42 +1574,15 @@ class ReasoningEngine:
         # Prioritize failed courses that are prerequisites
         failed_priority = []
         
-        for course in self.courses:
+        # Only courses of the student's major are considered
+        for course in self.get_courses_for_major(major):
             course_id = course['course_id']
-            
-            # Skip PE012 (removed from system)
-            if course_id == 'PE012':
-                continue
-            
-            # Skip if already completed or currently taking
-            if course_id in completed or course_id in current_courses:
-                continue
-            
-            # Check major compatibility
-            if major not in course['major']:
-                continue
-            
-            # Check if this is a failed course
-            is_failed = course_id in failed_courses
-            
-            # If failed, check if alternative in same slot is completed/in-progress
-            if is_failed and course_id in elective_slot_groups:
-                alternatives = elective_slot_groups[course_id]
-                # Check if any alternative is completed or being taken
-                alternative_done = any(
-                    alt in completed or alt in current_courses 
-                    for alt in alternatives if alt != course_id
-                )
-                if alternative_done:
-                    # Skip this failed course, student has alternative
-                    continue
-            
-            # Check prerequisites
-            is_eligible, missing = self.check_prerequisites(course_id, completed)
-            if not is_eligible:
+            if not self._is_course_eligible(course_id, completed, current_courses,
+                                            failed_courses, elective_slot_groups):
                 continue
             
             # Add course to appropriate list
+            is_failed = course_id in failed_courses
             course_copy = course.copy()
             course_copy['is_failed'] = is_failed
             course_copy['is_prerequisite_for_other'] = self._is_prerequisite_for_others(course_id)
@@ -472,6 +1595,31 @@ class ReasoningEngine:
         # Return failed prerequisites first, then other courses
         return failed_priority + eligible
     
+    def _is_course_eligible(self, course_id: str, completed, current_courses, failed_courses,
+                            elective_slot_groups: Mapping[str, Sequence[str]]) -> bool:
+        """Check one course of the student's major against the get_eligible_courses rules"""
+        # Skip PE012 (removed from system)
+        if course_id == 'PE012':
+            return False
+        
+        # Skip if already completed or currently taking
+        if course_id in completed or course_id in current_courses:
+            return False
+        
+        # If failed, check if alternative in same slot is completed/in-progress
+        if course_id in failed_courses and course_id in elective_slot_groups:
+            alternative_done = any(
+                alt in completed or alt in current_courses
+                for alt in elective_slot_groups[course_id] if alt != course_id
+            )
+            if alternative_done:
+                # Skip this failed course, student has alternative
+                return False
+        
+        # Check prerequisites
+        is_eligible, missing = self.check_prerequisites(course_id, completed)
+        return is_eligible
+    
     def _get_elective_slot_groups(self, major: str, cohort: str) -> Dict[str, List[str]]:
         """
         Build a mapping of course_id -> list of alternative course_ids in same slot
@@ -496,10 +1644,7 @@ class ReasoningEngine:
     
     def _is_prerequisite_for_others(self, course_id: str) -> bool:
         """Check if a course is a prerequisite for other courses"""
-        for course in self.courses:
-            if course_id in course.get('prerequisites', []):
-                return True
-        return False
+        return len(self.get_dependent_courses(course_id)) > 0
     
     def _check_special_course_rules(self, course: Dict, year: int, semester: str) -> bool:
         """Apply hard rules for AV, PE, ME courses"""
@@ -530,25 +1675,12 @@ class ReasoningEngine:
         Calculate course difficulty score
         
         Formula: difficulty = 2 × w1 × Npre + w2 × Yrec + w3 × Wgroup
+        (precomputed in the feature table for knowledge-base courses)
         """
-        weights = self.rules['difficulty_weights']
-        w1 = weights['w1_prerequisite']
-        w2 = weights['w2_year']
-        w3 = weights['w3_group']
-        
-        # Number of prerequisites (with double weight)
-        n_pre = len(course.get('prerequisites', []))
-        
-        # Recommended year
-        y_rec = course.get('recommended_year', 1)
-        
-        # Course group weight
-        group = course.get('course_group', 'General')
-        w_group = weights['group_weights'].get(group, 1)
-        
-        difficulty = 2 * w1 * n_pre + w2 * y_rec + w3 * w_group
-        
-        return difficulty
+        features = self._snapshot.features.get(course['course_id'])
+        if features is None:
+            features = self._resolve_course_features(course, self.rules, {})[0]
+        return features['difficulty']
     
     def infer_student_ability(self, student_data: Dict) -> Dict[str, float]:
         """
@@ -656,30 +1788,32 @@ class ReasoningEngine:
             'foundation_avg_grade': round(sum(course_grades.get(c, 7.0) for c in foundation_completed) / max(len(foundation_completed), 1), 2) if foundation_completed else 0
         }
     
-    def compute_interest_match(self, course: Dict, student_interests: List[str]) -> float:
+    def compute_interest_match(self, course: Dict, student_interests: List[str],
+                               match_counts: Mapping[str, int] = None) -> float:
         """
         Calculate interest match score
         
+        Args:
+            match_counts: get_interest_match_counts(student_interests), when scoring many courses
+        
         Returns value between 0 and 1
         """
         if not student_interests:
             return 0.5  # Neutral score if no interests specified
         
         # Handle None knowledge_area (when JSON has null)
-        knowledge_area = course.get('knowledge_area')
-        course_areas = set(knowledge_area) if knowledge_area else set()
-        student_areas = set(student_interests)
-        
-        if not course_areas:
+        if not course.get('knowledge_area'):
             return 0.3  # Low score for courses without knowledge area
         
-        intersection = course_areas.intersection(student_areas)
+        if match_counts is None:
+            match_counts = self.get_interest_match_counts(student_interests)
+        matched = match_counts.get(course['course_id'], 0)
         
-        if len(intersection) == 0:
+        if matched == 0:
             return 0.2  # Low but not zero for non-matching courses
         
         # Score based on proportion of student interests matched
-        score = len(intersection) / len(student_areas)
+        score = matched / len(set(student_interests))
         return min(score, 1.0)
     
     def compute_difficulty_fit(self, course_difficulty: float, 
@@ -709,16 +1843,16 @@ class ReasoningEngine:
         
         Returns value between 0 and 1
         """
-        credits = course.get('credits', 3)
-        
-        # Map time availability to preferred credit range
-        time_map = {
-            'Low': (1, 3),     # Prefer 1-3 credit courses
-            'Medium': (3, 4),  # Prefer 3-4 credit courses
-            'High': (4, 5)     # Can handle 4+ credit courses
-        }
-        
-        min_pref, max_pref = time_map.get(time_availability, (3, 4))
+        features = self._snapshot.features.get(course['course_id'])
+        if features is None:
+            return self._time_fit(course.get('credits', 3), time_availability)
+        time_fit = features['time_fit']
+        return time_fit.get(time_availability, time_fit['Medium'])
+    
+    @staticmethod
+    def _time_fit(credits: int, time_availability: str) -> float:
+        """Time fit of a course load for a time availability level"""
+        min_pref, max_pref = _TIME_PREFERENCES.get(time_availability, _TIME_PREFERENCES['Medium'])
         
         if min_pref <= credits <= max_pref:
             return 1.0  # Perfect match
@@ -729,12 +1863,15 @@ class ReasoningEngine:
             return max(0.3, 1.0 - penalty)
     
     def compute_recommendation_score(self, course: Dict, student_data: Dict,
-                                    student_ability: Dict) -> Dict:
+                                    student_ability: Dict, match_counts: Mapping[str, int] = None) -> Dict:
         """
         Compute overall recommendation score for a course
         
         Formula: score = α × interest_match + β × difficulty_fit + γ × time_fit
         
+        Args:
+            match_counts: get_interest_match_counts() of the student's interests, when scoring many courses
+        
         Returns:
             Dictionary with score and component breakdowns
         """
@@ -749,7 +1886,8 @@ class ReasoningEngine:
         # Calculate component scores
         interest_score = self.compute_interest_match(
             course, 
-            student_data.get('interests', [])
+            student_data.get('interests', []),
+            match_counts
         )
         
         difficulty_score = self.compute_difficulty_fit(
@@ -799,9 +1937,10 @@ class ReasoningEngine:
         student_ability = self.infer_student_ability(student_data)
         
         # Score each course
+        match_counts = self.get_interest_match_counts(student_data.get('interests', []))
         scored_courses = []
         for course in electives:
-            score_data = self.compute_recommendation_score(course, student_data, student_ability)
+            score_data = self.compute_recommendation_score(course, student_data, student_ability, match_counts)
             scored_courses.append(score_data)
         
         # Sort by total score (descending)
@@ -823,13 +1962,9 @@ class ReasoningEngine:
                 key = f"Year {year} - {semester}"
                 
                 # Get compulsory courses for this semester
-                semester_courses = [
-                    c for c in self.courses
-                    if c['recommended_year'] == year
-                    and c['recommended_semester'] == semester
-                    and c.get('course_group', '') in ['Đại cương', 'Cơ sở ngành', 'Chuyên ngành']
-                    and major in c['major']
-                ]
+                semester_courses = self._get_courses_for_semester(
+                    major, year, semester, ['Đại cương', 'Cơ sở ngành', 'Chuyên ngành']
+                )
                 
                 if semester_courses:
                     plan[key] = semester_courses
@@ -840,16 +1975,261 @@ class ReasoningEngine:
         """
         Check if there are elective courses available in the given semester
         """
-        electives = [
-            c for c in self.courses
-            if c['recommended_year'] == year
-            and c['recommended_semester'] == semester
-            and c.get('course_group', '') in ['Tự chọn', 'Tự chọn tự do']
-            and major in c['major']
-        ]
+        electives = self._get_courses_for_semester(major, year, semester, ['Tự chọn', 'Tự chọn tự do'])
         
         return len(electives) > 0
     
+    def get_prerequisite_graph(self, major: str) -> Mapping:
+        """
+        Get the student-independent prerequisite graph for a major (built once)
+        
+        Contains all compulsory-group courses of the major plus the first 10 electives.
+        
+        Returns:
+            Read-only mapping with 'nodes' (id, label, title), 'edges' (prereq, course_id)
+            and precomputed 'stats'
+        """
+        # Built results are stored in the snapshot they were requested from, so a
+        # build overlapping an update never leaks into the newer snapshot's cache
+        graphs = self._snapshot.derived['prerequisite_graphs']
+        if major in graphs:
+            return graphs[major]
+        
+        compulsory_groups = ['Đại cương', 'Cơ sở ngành', 'Chuyên ngành']
+        elective_groups = ['Tự chọn', 'Tự chọn tự do']
+        major_courses = {c['course_id']: c for c in self.get_courses_for_major(major, compulsory_groups)}
+        electives = self.get_courses_for_major(major, elective_groups)
+        for course in electives[:10]:
+            major_courses[course['course_id']] = course
+        
+        nodes = []
+        edges = []
+        prereq_counts = []
+        for course_id, course in major_courses.items():
+            nodes.append(self._make_graph_node(course))
+            course_edges = [(pre, course_id) for pre in course.get('prerequisites', [])
+                            if pre in major_courses]
+            edges.extend(course_edges)
+            prereq_counts.append((course_id, len(course_edges)))
+        
+        # Courses with most prerequisites (top 5, stable order)
+        prereq_counts.sort(key=lambda x: x[1], reverse=True)
+        most_prerequisites = [
+            (course_id, major_courses[course_id]['course_name'], count)
+            for course_id, count in prereq_counts[:5] if count > 0
+        ]
+        
+        graph = freeze({
+            'nodes': nodes,
+            'edges': edges,
+            'stats': {
+                'num_nodes': len(nodes),
+                'num_edges': len(edges),
+                'most_prerequisites': most_prerequisites
+            }
+        })
+        graphs[major] = graph
+        return graph
+    
+    @staticmethod
+    def _make_graph_node(course: Mapping) -> Dict:
+        """Get the graph node (id, short label, full-name tooltip) of a course"""
+        return {
+            'id': course['course_id'],
+            'label': f"{course['course_id']}\n{course['course_name'][:15]}...",
+            'title': course['course_name']
+        }
+    
+    def get_graph_status_overlay(self, major: str, completed_courses: List[str],
+                                 current_courses: List[str], graph: Dict = None) -> Dict[str, str]:
+        """
+        Get the per-student status of every node in the major's prerequisite graph
+        
+        Args:
+            graph: Graph to overlay instead of the major's (e.g. from get_course_neighborhood)
+        
+        Returns:
+            Dict mapping course_id -> 'completed' / 'current' / 'not_taken'
+        """
+        completed = set(completed_courses or [])
+        current = set(current_courses or [])
+        
+        overlay = {}
+        for node in (graph or self.get_prerequisite_graph(major))['nodes']:
+            course_id = node['id']
+            if course_id in completed:
+                overlay[course_id] = 'completed'
+            elif course_id in current:
+                overlay[course_id] = 'current'
+            else:
+                overlay[course_id] = 'not_taken'
+        return overlay
+    
+    def get_prerequisite_layout(self, major: str, layer_spacing: int = 220,
+                                node_spacing: int = 170, max_layer_width: int = 12) -> Mapping[str, Tuple[int, int]]:
+        """
+        Compute a deterministic layered layout for the major's prerequisite graph
+        
+        Layers are topological generations (prerequisite depth, on the y axis).
+        Node order inside each layer (x axis) is crossing-reduced with barycenter
+        sweeps. Wide layers are wrapped into rows of max_layer_width nodes.
+        
+        Returns:
+            Read-only mapping of course_id -> (x, y) position in pixels
+        """
+        layouts = self._snapshot.derived['prerequisite_layouts']
+        cache_key = (major, layer_spacing, node_spacing, max_layer_width)
+        if cache_key in layouts:
+            return layouts[cache_key]
+        
+        graph = self.get_prerequisite_graph(major)
+        node_ids = [node['id'] for node in graph['nodes']]
+        parents = {course_id: [] for course_id in node_ids}
+        children = {course_id: [] for course_id in node_ids}
+        for prereq, course_id in graph['edges']:
+            parents[course_id].append(prereq)
+            children[prereq].append(course_id)
+        
+        # Topological generations (Kahn) - depth = longest prerequisite chain
+        depth = {}
+        in_degree = {course_id: len(parents[course_id]) for course_id in node_ids}
+        frontier = sorted(c for c in node_ids if in_degree[c] == 0)
+        level = 0
+        while frontier:
+            next_frontier = []
+            for course_id in frontier:
+                depth[course_id] = level
+                for child in children[course_id]:
+                    in_degree[child] -= 1
+                    if in_degree[child] == 0:
+                        next_frontier.append(child)
+            frontier = sorted(next_frontier)
+            level += 1
+        # Nodes on a prerequisite cycle never reach in-degree 0 - put them last
+        for course_id in node_ids:
+            if course_id not in depth:
+                depth[course_id] = level
+        
+        layers = {}
+        for course_id in sorted(node_ids):
+            layers.setdefault(depth[course_id], []).append(course_id)
+        layer_keys = sorted(layers)
+        
+        # Crossing reduction: alternate downward (by parents) and upward (by children) sweeps
+        def _reorder(layer: List[str], neighbors: Dict[str, List[str]], order: Dict[str, int]):
+            def _barycenter(course_id: str) -> float:
+                positions = [order[n] for n in neighbors[course_id] if n in order]
+                if not positions:
+                    return order.get(course_id, 0)
+                return sum(positions) / len(positions)
+            layer.sort(key=lambda c: (_barycenter(c), c))
+        
+        order = {}
+        for layer in layers.values():
+            order.update({course_id: idx for idx, course_id in enumerate(layer)})
+        for _ in range(4):
+            for key in layer_keys[1:]:
+                _reorder(layers[key], parents, order)
+                order.update({course_id: idx for idx, course_id in enumerate(layers[key])})
+            for key in reversed(layer_keys[:-1]):
+                _reorder(layers[key], children, order)
+                order.update({course_id: idx for idx, course_id in enumerate(layers[key])})
+        
+        # Assign coordinates, wrapping wide layers into several rows
+        positions = {}
+        y = 0
+        for key in layer_keys:
+            layer = layers[key]
+            for row_start in range(0, len(layer), max_layer_width):
+                row = layer[row_start:row_start + max_layer_width]
+                offset = (len(row) - 1) / 2
+                for idx, course_id in enumerate(row):
+                    positions[course_id] = (int((idx - offset) * node_spacing), y)
+                y += layer_spacing // 2
+            y += layer_spacing // 2
+        
+        positions = freeze(positions)
+        layouts[cache_key] = positions
+        return positions
+    
+    def get_course_neighborhood(self, course_id: str, hops: int = 2, expanded: Sequence[str] = (),
+                                layer_spacing: int = 220, node_spacing: int = 170,
+                                max_layer_width: int = 12) -> Dict:
+        """
+        Get the k-hop prerequisite neighborhood (ego network) of a course
+        
+        Walks prerequisites and dependents of course_id up to hops steps each, then
+        one more step around every course in expanded. Neighbors come from the course
+        records and the reverse prerequisite index, so the work is proportional to the
+        subgraph (and its boundary), not to the catalog.
+        
+        Args:
+            course_id: Center course
+            hops: Steps to walk in each direction
+            expanded: Shown courses whose direct neighbors are added as well
+        
+        Returns:
+            Dictionary with 'nodes' and 'edges' as in get_prerequisite_graph, 'positions'
+            (course_id -> (x, y), layered by signed distance: prerequisites above the
+            center, dependents below) and 'frontier' (shown courses with neighbors not
+            shown yet, in node order)
+        """
+        courses_dict = self.courses_dict
+        if course_id not in courses_dict:
+            raise ValueError(f"Unknown course {course_id}")
+        dependents = self.get_prerequisite_dependents()
+        
+        def _prerequisites(cid: str) -> List[str]:
+            return [p for p in dict.fromkeys(courses_dict[cid].get('prerequisites', ())) if p in courses_dict]
+        
+        # BFS in each direction; layer = signed distance from the center
+        layer = {course_id: 0}
+        for step, neighbors in ((-1, _prerequisites), (1, lambda cid: dependents.get(cid, ()))):
+            frontier = [course_id]
+            for _ in range(hops):
+                next_frontier = []
+                for cid in frontier:
+                    for neighbor in neighbors(cid):
+                        if neighbor not in layer:
+                            layer[neighbor] = layer[cid] + step
+                            next_frontier.append(neighbor)
+                frontier = next_frontier
+        for cid in expanded:
+            if cid not in layer:
+                continue
+            for neighbor in _prerequisites(cid):
+                layer.setdefault(neighbor, layer[cid] - 1)
+            for neighbor in dependents.get(cid, ()):
+                layer.setdefault(neighbor, layer[cid] + 1)
+        
+        nodes = []
+        edges = []
+        frontier = []
+        for cid in layer:
+            nodes.append(self._make_graph_node(courses_dict[cid]))
+            prerequisites = _prerequisites(cid)
+            edges.extend((p, cid) for p in prerequisites if p in layer)
+            if any(n not in layer for n in prerequisites) or any(n not in layer for n in dependents.get(cid, ())):
+                frontier.append(cid)
+        
+        # Layer rows centered on x = 0, wide layers wrapped like the major layout
+        rows = {}
+        for cid in sorted(layer):
+            rows.setdefault(layer[cid], []).append(cid)
+        positions = {}
+        y = 0
+        for key in sorted(rows):
+            row_ids = rows[key]
+            for row_start in range(0, len(row_ids), max_layer_width):
+                row = row_ids[row_start:row_start + max_layer_width]
+                offset = (len(row) - 1) / 2
+                for idx, cid in enumerate(row):
+                    positions[cid] = (int((idx - offset) * node_spacing), y)
+                y += layer_spacing // 2
+            y += layer_spacing // 2
+        
+        return {'nodes': nodes, 'edges': edges, 'positions': positions, 'frontier': frontier}
+    
     def get_rule_description(self, rule_id: str) -> str:
         """Get description for a rule by ID from rules.json"""
         # Search in hard_rules
@@ -936,32 +2316,39 @@ class ReasoningEngine:
         Returns:
             List of reasoning steps with rule applications
         """
-        trace = []
+        major = student_data.get('major')
+        cohort = student_data.get('cohort', 'K20')
+        trace = self._build_reasoning_trace(student_data, eligible_courses, scored_courses,
+                                            self._get_elective_slot_groups(major, cohort),
+                                            self.infer_student_ability(student_data))
+        return [step.as_dict() for step in trace]
+    
+    def _build_reasoning_trace(self, student_data: Mapping, eligible_courses: Sequence[Mapping],
+                               scored_courses: Sequence[Mapping], slot_groups: Mapping[str, Sequence[str]],
+                               ability: Mapping[str, float]) -> Tuple[TraceStep, ...]:
+        """
+        Build the reasoning trace steps from already computed pipeline outputs
+        
+        Only step identities are fixed here; each step's text is formatted on first display.
+        
+        Returns:
+            Tuple of TraceStep
+        """
         completed = student_data.get('completed_courses', [])
         current = student_data.get('current_courses', [])
         failed = student_data.get('failed_courses', [])
         major = student_data.get('major')
         cohort = student_data.get('cohort', 'K20')
         
-        # Step 1: Prerequisites Check
-        prereq_results = []
-        for course in eligible_courses[:10]:  # Check first 10
-            is_eligible, missing = self.check_prerequisites(course['course_id'], completed)
-            if is_eligible:
-                prereq_results.append(f"✅ {course['course_id']}: Đủ tiên quyết")
-        trace.append({
-            'step': 1,
-            'rule_id': 'R001',
-            'rule_name': 'Kiểm tra Tiên quyết',
-            'description': self.get_rule_description('R001'),
-            'result': prereq_results[:5],
-            'summary': f'{len(eligible_courses)} môn đủ điều kiện tiên quyết'
-        })
+        # Step 1: Prerequisites Check (eligible courses have all prerequisites completed)
+        def prerequisites_text():
+            return (self.get_rule_description('R001'),
+                    [f"✅ {course['course_id']}: Đủ tiên quyết" for course in eligible_courses[:5]],
+                    f'{len(eligible_courses)} môn đủ điều kiện tiên quyết')
         
         # Step 2: Failed course alternative check (always show)
-        slot_groups = self._get_elective_slot_groups(major, cohort)
-        alt_check = []
-        if failed:
+        def failed_alternatives_text():
+            alt_check = []
             for course_id in failed:
                 if course_id in slot_groups:
                     alts = [a for a in slot_groups[course_id] if a != course_id]
@@ -972,69 +2359,49 @@ class ReasoningEngine:
                         alt_check.append(f"🔄 {course_id}: Cần học lại")
                 else:
                     alt_check.append(f"🔄 {course_id}: Cần học lại")
-        trace.append({
-            'step': 2,
-            'rule_id': 'F001',
-            'rule_name': 'Kiểm tra Môn rớt có Thay thế',
-            'description': self.get_rule_description('F001'),
-            'result': alt_check if alt_check else ['✅ Không có môn rớt'],
-            'summary': f'{len(failed)} môn rớt được kiểm tra' if failed else 'Không có môn rớt'
-        })
+            return (self.get_rule_description('F001'),
+                    alt_check if alt_check else ['✅ Không có môn rớt'],
+                    f'{len(failed)} môn rớt được kiểm tra' if failed else 'Không có môn rớt')
         
         # Step 3: Teaching plan alignment
-        trace.append({
-            'step': 3,
-            'rule_id': 'R008',
-            'rule_name': 'Đối chiếu Kế hoạch Giảng dạy',
-            'description': self.get_rule_description('R008'),
-            'result': [f'Áp dụng KHGD: {major}_{cohort}'],
-            'summary': f'Lọc môn theo kế hoạch giảng dạy {major}'
-        })
+        def teaching_plan_text():
+            return (self.get_rule_description('R008'),
+                    [f'Áp dụng KHGD: {major}_{cohort}'],
+                    f'Lọc môn theo kế hoạch giảng dạy {major}')
         
         # Step 4: Ability inference
-        ability = self.infer_student_ability(student_data)
-        trace.append({
-            'step': 4,
-            'rule_id': 'I001-I003',
-            'rule_name': 'Suy diễn Năng lực Sinh viên',
-            'description': 'Suy diễn năng lực từ các môn đã hoàn thành',
-            'result': [
-                f'Programming Level: {ability["programming_level"]:.1f}/3 (I001)',
-                f'Computational Thinking: {ability["computational_thinking"]:.1f}/3 (I002)',
-                f'Academic Readiness: {ability["academic_readiness"]:.2f} (I003)'
-            ],
-            'summary': f'Readiness = {ability["academic_readiness"]:.2f}'
-        })
+        def ability_text():
+            return ('Suy diễn năng lực từ các môn đã hoàn thành',
+                    [f'Programming Level: {ability["programming_level"]:.1f}/3 (I001)',
+                     f'Computational Thinking: {ability["computational_thinking"]:.1f}/3 (I002)',
+                     f'Academic Readiness: {ability["academic_readiness"]:.2f} (I003)'],
+                    f'Readiness = {ability["academic_readiness"]:.2f}')
         
         # Step 5: Scoring
-        if scored_courses:
-            score_examples = []
-            for c in scored_courses[:3]:
-                score_examples.append(
-                    f"📊 {c['course_id']}: Score={c['total_score']:.2f} "
-                    f"(I={c['interest_match']:.2f}, D={c['difficulty_fit']:.2f}, T={c['time_fit']:.2f})"
-                )
-            trace.append({
-                'step': 5,
-                'rule_id': 'S004',
-                'rule_name': 'Tính điểm Gợi ý',
-                'description': self.get_rule_description('S004'),
-                'result': score_examples,
-                'summary': f'Đã tính điểm {len(scored_courses)} môn tự chọn'
-            })
+        def scoring_text():
+            return (self.get_rule_description('S004'),
+                    [f"📊 {c['course_id']}: Score={c['total_score']:.2f} "
+                     f"(I={c['interest_match']:.2f}, D={c['difficulty_fit']:.2f}, T={c['time_fit']:.2f})"
+                     for c in scored_courses[:3]],
+                    f'Đã tính điểm {len(scored_courses)} môn tự chọn')
         
         # Step 6: Top 3 selection
-        trace.append({
-            'step': 6,
-            'rule_id': 'TOP3',
-            'rule_name': 'Chọn Top 3 Môn Gợi ý',
-            'description': 'Chỉ lấy 3 môn tự chọn có điểm cao nhất để gợi ý',
-            'result': [f'🎯 {c["course_id"]}: {c["course_name"]} ({c["total_score"]:.2f})' 
-                      for c in scored_courses[:3]] if scored_courses else ['Không có môn tự chọn'],
-            'summary': f'Top 3 được chọn từ {len(scored_courses)} môn'
-        })
-        
-        return trace
+        def top3_text():
+            return ('Chỉ lấy 3 môn tự chọn có điểm cao nhất để gợi ý',
+                    [f'🎯 {c["course_id"]}: {c["course_name"]} ({c["total_score"]:.2f})'
+                     for c in scored_courses[:3]] if scored_courses else ['Không có môn tự chọn'],
+                    f'Top 3 được chọn từ {len(scored_courses)} môn')
+        
+        trace = [
+            TraceStep(1, 'R001', 'Kiểm tra Tiên quyết', prerequisites_text),
+            TraceStep(2, 'F001', 'Kiểm tra Môn rớt có Thay thế', failed_alternatives_text),
+            TraceStep(3, 'R008', 'Đối chiếu Kế hoạch Giảng dạy', teaching_plan_text),
+            TraceStep(4, 'I001-I003', 'Suy diễn Năng lực Sinh viên', ability_text),
+        ]
+        if scored_courses:
+            trace.append(TraceStep(5, 'S004', 'Tính điểm Gợi ý', scoring_text))
+        trace.append(TraceStep(6, 'TOP3', 'Chọn Top 3 Môn Gợi ý', top3_text))
+        return tuple(trace)
     
     def get_activated_rules(self, student_data: Dict, target_courses: List[str]) -> List[Dict]:
         """
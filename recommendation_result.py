@@ -0,0 +1,87 @@
+"""
+Recommendation Results for Course Recommendation System
+Immutable output of one recommendation pipeline run, shared by every view
+"""
+
+from typing import Any, Callable, Dict, List, Mapping, Sequence, Tuple
+
+
+class TraceStep:
+    """
+    One step of the reasoning trace
+
+    The identifying fields are set up front; description, result and summary are
+    formatted by the given callable on first access only, so views that never
+    display the trace never pay for its strings.
+    """
+
+    __slots__ = ('step', 'rule_id', 'rule_name', '_format', '_text')
+
+    def __init__(self, step: int, rule_id: str, rule_name: str,
+                 format_text: Callable[[], Tuple[str, List[str], str]]):
+        self.step = step
+        self.rule_id = rule_id
+        self.rule_name = rule_name
+        self._format = format_text
+        self._text = None
+
+    def _get_text(self) -> Tuple[str, Tuple[str, ...], str]:
+        if self._text is None:
+            description, result, summary = self._format()
+            # Benign race: concurrent sessions may both format, both store equal text
+            self._text = (description, tuple(result), summary)
+        return self._text
+
+    @property
+    def description(self) -> str:
+        return self._get_text()[0]
+
+    @property
+    def result(self) -> Tuple[str, ...]:
+        return self._get_text()[1]
+
+    @property
+    def summary(self) -> str:
+        return self._get_text()[2]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the step in the plain dict form returned by get_reasoning_trace"""
+        return {
+            'step': self.step,
+            'rule_id': self.rule_id,
+            'rule_name': self.rule_name,
+            'description': self.description,
+            'result': list(self.result),
+            'summary': self.summary
+        }
+
+
+class RecommendationResult:
+    """
+    Everything one pipeline run derives from a student profile
+
+    Built once per (snapshot, profile) and read by the curriculum plan, reasoning
+    trace and knowledge views instead of each recomputing its own copy. All fields
+    are frozen (mapping proxies and tuples), so a cached result can be shared by
+    concurrent sessions.
+    """
+
+    __slots__ = ('kb_version', 'next_semester', 'eligible', 'slot_groups', 'ability',
+                 'scored', 'activated_rules', 'progress', 'semester_plan', 'registration', 'trace')
+
+    def __init__(self, kb_version: str, next_semester: int, eligible: Sequence[Mapping],
+                 slot_groups: Mapping[str, Sequence[str]], ability: Mapping[str, Any],
+                 scored: Sequence[Mapping], activated_rules: Sequence[Mapping],
+                 progress: Mapping, semester_plan: Mapping, registration: Mapping,
+                 trace: Sequence[TraceStep]):
+        self.kb_version = kb_version
+        self.next_semester = next_semester
+        self.eligible = eligible
+        self.slot_groups = slot_groups
+        self.ability = ability
+        self.scored = scored
+        self.activated_rules = activated_rules
+        self.progress = progress
+        self.semester_plan = semester_plan
+        self.registration = registration
+        self.trace = trace
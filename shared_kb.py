@@ -0,0 +1,367 @@
+"""
+Shared Knowledge Base for Course Recommendation System
+Compiled course table and prerequisite bitsets in one shared memory block
+
+Batch jobs split student profiles over a process pool. Instead of every worker parsing
+the knowledge base and rebuilding its indexes, the parent compiles them once into flat
+arrays in multiprocessing.shared_memory; workers attach to the block by name and read
+numpy views over it - nothing is copied, so memory no longer grows with worker count.
+
+Usage:
+    python shared_kb.py --workers 4
+    python shared_kb.py --workers 4 --mode engine   # every worker loads its own engine
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from reasoning_engine import ReasoningEngine
+
+
+# Arrays start on cache-line boundaries inside the block
+_ALIGNMENT = 64
+
+
+class _AllBut:
+    """Membership test for every course id except one"""
+
+    __slots__ = ('_ids', '_excluded')
+
+    def __init__(self, ids: frozenset, excluded: str):
+        self._ids = ids
+        self._excluded = excluded
+
+    def __contains__(self, course_id) -> bool:
+        return course_id != self._excluded and course_id in self._ids
+
+
+def _csr(groups: Sequence[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    indptr = np.zeros(len(groups) + 1, dtype=np.int32)
+    indptr[1:] = np.cumsum([len(g) for g in groups])
+    indices = np.fromiter((i for g in groups for i in g), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, indices
+
+
+def compile_knowledge(engine: ReasoningEngine) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """
+    Compile an engine's knowledge base into flat arrays (see SharedKnowledgeBase)
+
+    Eligibility facts that need the engine's rules (unknown prerequisites, removed
+    courses, elective slots, curriculum per cohort) are evaluated here through the
+    engine, so workers only combine bitsets.
+
+    Returns:
+        (arrays by name, metadata) - the metadata is small and picklable: kb_version,
+        majors, and curriculum index per (cohort, major) with a per-major default
+    """
+    courses = engine.courses
+    ids = [c['course_id'] for c in courses]
+    n = len(ids)
+    index = {course_id: i for i, course_id in enumerate(ids)}
+    words = max((n + 63) // 64, 1)
+
+    # Bit j of row i is set when course j is a prerequisite of course i
+    rows = []
+    cols = []
+    for i, course in enumerate(courses):
+        for prereq_id in course.get('prerequisites', ()):
+            j = index.get(prereq_id)
+            if j is not None:
+                rows.append(i)
+                cols.append(j)
+    rows = np.array(rows, dtype=np.intp)
+    cols = np.array(cols, dtype=np.uint64)
+    prerequisite_bits = np.zeros((n, words), dtype=np.uint64)
+    np.bitwise_or.at(prerequisite_bits, (rows, (cols >> np.uint64(6)).astype(np.intp)),
+                     np.left_shift(np.uint64(1), cols & np.uint64(63)))
+
+    # Never eligible, even with every other course done (unknown prerequisite, removed course)
+    all_ids = frozenset(ids)
+    blocked = np.array([not engine._is_course_eligible(c, _AllBut(all_ids, c), (), (), {}) for c in ids],
+                       dtype=bool)
+
+    majors = sorted({m for c in courses for m in c.get('major', ())})
+    major_indptr, major_indices = _csr([[index[c['course_id']] for c in engine.get_courses_for_major(m)]
+                                        for m in majors])
+
+    # Elective slot alternatives per distinct curriculum; -1 = curriculum without slots
+    cohorts = list(engine.teaching_plans.get('cohort_mappings', {}))
+    curriculum_keys = []
+    slot_groups = []
+    curricula = {}
+    default_curricula = {}
+    for major in majors:
+        for cohort in cohorts + [None]:
+            key = engine.get_curriculum_for_cohort(cohort, major)
+            if key not in curriculum_keys:
+                groups = engine._get_elective_slot_groups(major, cohort)
+                curriculum_keys.append(key)
+                slot_groups.append([[index[alt] for alt in groups.get(course_id, ()) if alt != course_id and alt in index]
+                                    for course_id in ids] if groups else None)
+            position = curriculum_keys.index(key)
+            if slot_groups[position] is None:
+                position = -1
+            if cohort is None:
+                default_curricula[major] = position
+            else:
+                curricula[(cohort, major)] = position
+    # Renumber to the curricula that have slots
+    kept = [i for i, groups in enumerate(slot_groups) if groups is not None]
+    renumber = {old: new for new, old in enumerate(kept)}
+    curricula = {k: renumber.get(v, -1) for k, v in curricula.items()}
+    default_curricula = {k: renumber.get(v, -1) for k, v in default_curricula.items()}
+    slot_indptr = np.zeros((len(kept), n + 1), dtype=np.int32)
+    slot_chunks = []
+    offset = 0
+    for new, old in enumerate(kept):
+        indptr, indices = _csr(slot_groups[old])
+        slot_indptr[new] = indptr + offset
+        slot_chunks.append(indices)
+        offset += len(indices)
+
+    sorted_index = np.argsort(np.array(ids, dtype=str), kind='stable').astype(np.int32)
+    arrays = {
+        'course_ids': np.array(ids, dtype=str),
+        'sorted_index': sorted_index,
+        'credits': np.array([c.get('credits', 0) for c in courses], dtype=np.int16),
+        'prerequisite_bits': prerequisite_bits,
+        'blocked': blocked,
+        'has_dependents': np.array([engine._is_prerequisite_for_others(c) for c in ids], dtype=bool),
+        'major_indptr': major_indptr,
+        'major_indices': major_indices,
+        'slot_indptr': slot_indptr,
+        'slot_indices': np.concatenate(slot_chunks) if slot_chunks else np.zeros(0, dtype=np.int32)
+    }
+    meta = {
+        'kb_version': engine.kb_version,
+        'majors': {major: i for i, major in enumerate(majors)},
+        'curricula': curricula,
+        'default_curricula': default_curricula
+    }
+    return arrays, meta
+
+
+class SharedKnowledgeBase:
+    """
+    Compiled knowledge arrays in one shared memory block
+
+    publish() compiles an engine's knowledge base and copies it into a new block once;
+    attach() maps that block in another process from its handle and exposes read-only
+    numpy views of it. Arrays (n courses in knowledge base order):
+
+        course_ids (n,) str, sorted_index (n,) id lookup order, credits (n,) int16,
+        prerequisite_bits (n, ceil(n/64)) uint64, blocked (n,) bool, has_dependents (n,) bool,
+        major_indptr / major_indices - courses of each major (CSR),
+        slot_indptr / slot_indices - elective slot alternatives per curriculum (CSR)
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, layout: Mapping, meta: Mapping, owner: bool):
+        self._shm = shm
+        self._layout = layout
+        self._owner = owner
+        self.meta = meta
+        for name, (offset, dtype, shape) in layout.items():
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            array.flags.writeable = False
+            setattr(self, name, array)
+        self.words = self.prerequisite_bits.shape[1]
+
+    @classmethod
+    def publish(cls, engine: ReasoningEngine) -> 'SharedKnowledgeBase':
+        """Compile the engine's knowledge base into a new shared memory block (call unlink() when done)"""
+        arrays, meta = compile_knowledge(engine)
+        layout = {}
+        size = 0
+        for name, array in arrays.items():
+            size = -(-size // _ALIGNMENT) * _ALIGNMENT
+            layout[name] = (size, array.dtype.str, array.shape)
+            size += array.nbytes
+        # Slack keeps empty arrays at the end inside the buffer
+        shm = shared_memory.SharedMemory(create=True, size=size + _ALIGNMENT)
+        for name, array in arrays.items():
+            offset, dtype, shape = layout[name]
+            np.ndarray(shape, dtype=array.dtype, buffer=shm.buf, offset=offset)[...] = array
+        return cls(shm, layout, meta, owner=True)
+
+    @classmethod
+    def attach(cls, handle: Tuple) -> 'SharedKnowledgeBase':
+        """Map a published block in this process (zero-copy) from its handle"""
+        name, layout, meta = handle
+        # Only the publisher may unlink the block. Pool workers share the publisher's
+        # resource tracker, so attaching there needs nothing else; Python 3.13+ can
+        # also opt out of tracking for unrelated processes
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, layout, meta, owner=False)
+
+    @property
+    def handle(self) -> Tuple:
+        """Picklable (name, layout, metadata) to pass to worker processes"""
+        return (self._shm.name, self._layout, self.meta)
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def close(self) -> None:
+        """Release this process's mapping (views must no longer be used)"""
+        for name in self._layout:
+            setattr(self, name, None)
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Close and destroy the block (publisher only)"""
+        self.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> 'SharedKnowledgeBase':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.unlink()
+
+    def course_indices(self, course_ids: Iterable[str]) -> np.ndarray:
+        """Get the positions of the known course ids (unknown ids are dropped)"""
+        wanted = np.array(list(course_ids), dtype=str)
+        if not len(wanted):
+            return np.zeros(0, dtype=np.intp)
+        sorted_ids = self.course_ids[self.sorted_index]
+        positions = np.minimum(np.searchsorted(sorted_ids, wanted), len(sorted_ids) - 1)
+        found = self.sorted_index[positions]
+        return found[self.course_ids[found] == wanted].astype(np.intp)
+
+    def encode(self, course_ids: Iterable[str]) -> np.ndarray:
+        """Get the bitset (words,) of the known courses among course_ids"""
+        bits = np.zeros(self.words, dtype=np.uint64)
+        positions = self.course_indices(course_ids).astype(np.uint64)
+        np.bitwise_or.at(bits, (positions >> np.uint64(6)).astype(np.intp),
+                         np.left_shift(np.uint64(1), positions & np.uint64(63)))
+        return bits
+
+    def _test(self, bits: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        shifts = (positions & 63).astype(np.uint64)
+        return ((bits[positions >> 6] >> shifts) & np.uint64(1)).astype(bool)
+
+    def get_eligible_courses(self, student_data: Mapping) -> List[str]:
+        """
+        Get the ids ReasoningEngine.get_eligible_courses returns, from the arrays only
+
+        Same order: failed courses that are prerequisites of others first, then the
+        rest in knowledge base order. Profile course ids outside the catalog are ignored.
+        """
+        major = self.meta['majors'].get(student_data.get('major'))
+        if major is None or not len(self.course_ids):
+            return []
+        rows = self.major_indices[self.major_indptr[major]:self.major_indptr[major + 1]].astype(np.intp)
+
+        completed = self.encode(student_data.get('completed_courses', []))
+        done = completed | self.encode(student_data.get('current_courses', []))
+        failed = self.course_indices(student_data.get('failed_courses', []))
+
+        eligible = ~self.blocked[rows] & ~self._test(done, rows)
+        eligible &= ~(self.prerequisite_bits[rows] & ~completed).any(axis=1)
+
+        # A failed elective is dropped when an alternative of its slot is done or in progress
+        curriculum = self.meta['curricula'].get(
+            (student_data.get('cohort', 'K20'), student_data.get('major')),
+            self.meta['default_curricula'].get(student_data.get('major'), -1))
+        if curriculum >= 0 and len(failed):
+            indptr = self.slot_indptr[curriculum]
+            dropped = [f for f in failed
+                       if self._test(done, self.slot_indices[indptr[f]:indptr[f + 1]].astype(np.intp)).any()]
+            if dropped:
+                eligible &= ~np.isin(rows, dropped)
+
+        rows = rows[eligible]
+        priority = np.isin(rows, failed) & self.has_dependents[rows]
+        return self.course_ids[np.concatenate([rows[priority], rows[~priority]])].tolist()
+
+
+# Per-process worker state, set by the pool initializers
+_worker_kb = None
+_worker_engine = None
+
+
+def _attach_worker(handle: Tuple) -> None:
+    global _worker_kb
+    _worker_kb = SharedKnowledgeBase.attach(handle)
+
+
+def _load_engine_worker(engine_args: Tuple) -> None:
+    global _worker_engine
+    _worker_engine = ReasoningEngine(*engine_args)
+
+
+def _eligible_shared(profiles: List[Mapping]) -> List[List[str]]:
+    return [_worker_kb.get_eligible_courses(p) for p in profiles]
+
+
+def _eligible_engine(profiles: List[Mapping]) -> List[List[str]]:
+    return [[c['course_id'] for c in _worker_engine.get_eligible_courses(p)] for p in profiles]
+
+
+def batch_eligible_courses(profiles: Sequence[Mapping], workers: int = 2, mode: str = 'shared',
+                           engine_args: Tuple = (), chunk_size: int = 64) -> List[List[str]]:
+    """
+    Get the eligible course ids of many profiles with a pool of spawned worker processes
+
+    Args:
+        profiles: Student profiles (get_eligible_courses input)
+        workers: Number of worker processes
+        mode: 'shared' - workers attach one published SharedKnowledgeBase;
+              'engine' - every worker loads its own ReasoningEngine
+        engine_args: ReasoningEngine constructor arguments (knowledge file paths)
+        chunk_size: Profiles per task
+
+    Returns:
+        Eligible course ids per profile, in profile order
+    """
+    if mode not in ('shared', 'engine'):
+        raise ValueError(f"Unknown mode '{mode}' (expected 'shared' or 'engine')")
+    chunks = [list(profiles[i:i + chunk_size]) for i in range(0, len(profiles), chunk_size)]
+    context = get_context('spawn')
+
+    if mode == 'engine':
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_load_engine_worker,
+                                 initargs=(tuple(engine_args),)) as pool:
+            return [ids for chunk in pool.map(_eligible_engine, chunks) for ids in chunk]
+
+    with SharedKnowledgeBase.publish(ReasoningEngine(*engine_args)) as kb:
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_attach_worker,
+                                 initargs=(kb.handle,)) as pool:
+            return [ids for chunk in pool.map(_eligible_shared, chunks) for ids in chunk]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute eligible courses of the stored student population in parallel")
+    parser.add_argument('--db', help="Student database (default: STUDENT_DB_PATH or data/students.db)")
+    parser.add_argument('--major')
+    parser.add_argument('--cohort')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--mode', choices=('shared', 'engine'), default='shared')
+    parser.add_argument('--chunk-size', type=int, default=64)
+    args = parser.parse_args()
+
+    from weight_sweep import load_population
+
+    profiles = load_population(args.db, args.major, args.cohort)
+    if not profiles:
+        parser.error("No student profiles found")
+
+    start = time.perf_counter()
+    results = batch_eligible_courses(profiles, args.workers, args.mode, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"{len(profiles)} profiles, {args.workers} workers ({args.mode}): {elapsed:.2f} s, "
+          f"{sum(len(r) for r in results) / len(results):.1f} eligible courses per profile")
+
+
+if __name__ == "__main__":
+    main()
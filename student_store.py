@@ -0,0 +1,209 @@
+"""
+Student Store for Course Recommendation System
+Persists student profiles, grade histories and computed recommendations in SQLite
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def get_default_db_path() -> Path:
+    """Get the default database path (override with STUDENT_DB_PATH)"""
+    env_path = os.environ.get('STUDENT_DB_PATH')
+    if env_path:
+        return Path(env_path)
+    return Path(__file__).parent / "data" / "students.db"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    student_id TEXT PRIMARY KEY,
+    major TEXT NOT NULL,
+    cohort TEXT NOT NULL,
+    enrollment_year INTEGER,
+    current_semester_number INTEGER,
+    profile TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_students_major_cohort ON students (major, cohort);
+CREATE INDEX IF NOT EXISTS idx_students_cohort ON students (cohort);
+
+CREATE TABLE IF NOT EXISTS grades (
+    student_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    grade REAL,
+    status TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (student_id, course_id)
+);
+CREATE INDEX IF NOT EXISTS idx_grades_course ON grades (course_id);
+
+CREATE TABLE IF NOT EXISTS recommendations (
+    student_id TEXT NOT NULL,
+    kb_version TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    computed_at TEXT NOT NULL,
+    PRIMARY KEY (student_id, kb_version)
+);
+"""
+
+# Statements are kept as constants so sqlite3's statement cache reuses the compiled form
+_UPSERT_STUDENT = """
+INSERT INTO students (student_id, major, cohort, enrollment_year, current_semester_number, profile, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (student_id) DO UPDATE SET
+    major = excluded.major,
+    cohort = excluded.cohort,
+    enrollment_year = excluded.enrollment_year,
+    current_semester_number = excluded.current_semester_number,
+    profile = excluded.profile,
+    updated_at = excluded.updated_at
+"""
+_DELETE_GRADES = "DELETE FROM grades WHERE student_id = ?"
+_INSERT_GRADE = """
+INSERT INTO grades (student_id, course_id, grade, status, recorded_at)
+VALUES (?, ?, ?, ?, ?)
+"""
+_SELECT_PROFILE = "SELECT profile FROM students WHERE student_id = ?"
+_SELECT_GRADES = "SELECT course_id, grade, status FROM grades WHERE student_id = ? ORDER BY course_id"
+_UPSERT_RECOMMENDATIONS = """
+INSERT INTO recommendations (student_id, kb_version, payload, computed_at)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (student_id, kb_version) DO UPDATE SET
+    payload = excluded.payload,
+    computed_at = excluded.computed_at
+"""
+_SELECT_RECOMMENDATIONS = "SELECT payload FROM recommendations WHERE student_id = ? AND kb_version = ?"
+
+
+class StudentStore:
+    """
+    SQLite persistence for student profiles
+
+    The full profile (the student_data dict built by the app) is stored as JSON in the
+    students row, so restoring a profile is a single primary-key lookup. Grades are also
+    normalized into the grades table for cohort-level queries.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = Path(db_path) if db_path else get_default_db_path()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection per thread (Streamlit serves sessions from several threads)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    @staticmethod
+    def _student_row(student_id: str, student_data: Dict, now: str) -> Tuple:
+        return (
+            student_id,
+            student_data.get('major'),
+            student_data.get('cohort', 'K20'),
+            student_data.get('enrollment_year'),
+            student_data.get('current_semester_number'),
+            json.dumps(student_data, ensure_ascii=False),
+            now
+        )
+
+    @staticmethod
+    def _grade_rows(student_id: str, student_data: Dict, now: str) -> List[Tuple]:
+        grades = student_data.get('course_grades', {})
+        failed = set(student_data.get('failed_courses', []))
+        studied = student_data.get('studied_courses') or student_data.get('completed_courses', [])
+        return [
+            (student_id, course_id, grades.get(course_id),
+             'failed' if course_id in failed else 'passed', now)
+            for course_id in studied
+        ]
+
+    def save_profile(self, student_id: str, student_data: Dict) -> None:
+        """Insert or update one student's profile and grades"""
+        self.bulk_upsert_profiles([(student_id, student_data)])
+
+    def bulk_upsert_profiles(self, profiles: Iterable[Tuple[str, Dict]]) -> int:
+        """
+        Insert or update many profiles in a single transaction
+
+        Args:
+            profiles: Iterable of (student_id, student_data) pairs
+
+        Returns:
+            Number of profiles written
+        """
+        now = self._now()
+        student_rows = []
+        grade_rows = []
+        for student_id, student_data in profiles:
+            student_rows.append(self._student_row(student_id, student_data, now))
+            grade_rows.extend(self._grade_rows(student_id, student_data, now))
+
+        conn = self._connection()
+        with conn:
+            conn.executemany(_UPSERT_STUDENT, student_rows)
+            conn.executemany(_DELETE_GRADES, [(row[0],) for row in student_rows])
+            conn.executemany(_INSERT_GRADE, grade_rows)
+        return len(student_rows)
+
+    def load_profile(self, student_id: str) -> Optional[Dict]:
+        """Restore a student's profile with a single primary-key read (None if unknown)"""
+        row = self._connection().execute(_SELECT_PROFILE, (student_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_grades(self, student_id: str) -> List[Dict]:
+        """Get the recorded grades of a student"""
+        rows = self._connection().execute(_SELECT_GRADES, (student_id,)).fetchall()
+        return [{'course_id': r[0], 'grade': r[1], 'status': r[2]} for r in rows]
+
+    def list_students(self, major: str = None, cohort: str = None) -> List[str]:
+        """List student ids, optionally filtered by major and/or cohort (indexed)"""
+        query = "SELECT student_id FROM students"
+        conditions = []
+        params = []
+        if major is not None:
+            conditions.append("major = ?")
+            params.append(major)
+        if cohort is not None:
+            conditions.append("cohort = ?")
+            params.append(cohort)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY student_id"
+        return [r[0] for r in self._connection().execute(query, params).fetchall()]
+
+    def save_recommendations(self, student_id: str, kb_version: str, payload: Dict) -> None:
+        """Store computed recommendations for a student and knowledge-base version"""
+        conn = self._connection()
+        with conn:
+            conn.execute(_UPSERT_RECOMMENDATIONS, (
+                student_id, kb_version, json.dumps(payload, ensure_ascii=False), self._now()
+            ))
+
+    def load_recommendations(self, student_id: str, kb_version: str) -> Optional[Dict]:
+        """Get stored recommendations (None if missing or computed for another knowledge base)"""
+        row = self._connection().execute(_SELECT_RECOMMENDATIONS, (student_id, kb_version)).fetchone()
+        return json.loads(row[0]) if row else None
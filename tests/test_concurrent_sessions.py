@@ -0,0 +1,174 @@
+"""
+Concurrent-session stress tests for the copy-on-write knowledge snapshots
+
+Many threads share one engine (as Streamlit sessions share the cached engine):
+results must equal the single-threaded ones, and updates must only ever be
+seen as a whole old or a whole new snapshot.
+"""
+
+import gc
+import json
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from knowledge_snapshot import thaw
+from reasoning_engine import ReasoningEngine
+
+
+MAJOR = 'KHMT'
+PROFILE_COUNT = 200
+
+
+def make_profile(engine, seed):
+    rng = random.Random(seed)
+    course_ids = [c['course_id'] for c in engine.get_courses_for_major(MAJOR)]
+    done = rng.sample(course_ids, k=rng.randint(5, 30))
+    return {
+        'major': MAJOR, 'cohort': rng.choice(['K18', 'K19', 'K20']), 'enrollment_year': 2024,
+        'current_year': 2, 'current_semester_number': rng.randint(2, 6),
+        'completed_courses': done, 'studied_courses': done, 'failed_courses': [],
+        'current_courses': [], 'course_grades': {c: 7.0 for c in done},
+        'interests': rng.sample(['AI', 'Network', 'SE', 'Data Science'], k=2),
+        'time_availability': 'Medium'
+    }
+
+
+def run_session(engine, profile):
+    result = engine.run_recommendation_pipeline(profile)
+    return json.dumps([
+        [c['course_id'] for c in result.eligible],
+        thaw(result.semester_plan),
+        thaw(result.registration)
+    ], sort_keys=True, ensure_ascii=False)
+
+
+def test_concurrent_sessions_match_single_threaded():
+    reference = ReasoningEngine()
+    profiles = [make_profile(reference, seed) for seed in range(PROFILE_COUNT)]
+    expected = [run_session(reference, profile) for profile in profiles]
+
+    # A fresh engine, so the threads race on building every derived cache
+    engine = ReasoningEngine()
+    jobs = list(range(PROFILE_COUNT)) * 3
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        outputs = list(pool.map(lambda i: run_session(engine, profiles[i]), jobs))
+
+    mismatches = [i for i, output in zip(jobs, outputs) if output != expected[i]]
+    assert mismatches == []
+
+
+def test_update_during_reads_is_seen_whole():
+    engine = ReasoningEngine()
+    old_credits = engine.courses_dict['IT001']['credits']
+    new_credits = old_credits + 1
+    allowed = {(engine.kb_version, old_credits)}
+    seen = set()
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            snapshot = engine.snapshot
+            seen.add((snapshot.version, snapshot.courses_dict['IT001']['credits']))
+            engine.get_prerequisite_graph(MAJOR)
+
+    def bump(knowledge):
+        for course in knowledge['courses']:
+            if course['course_id'] == 'IT001':
+                course['credits'] = new_credits
+
+    readers = [threading.Thread(target=reader) for _ in range(8)]
+    for thread in readers:
+        thread.start()
+    try:
+        allowed.add((engine.update_knowledge(bump), new_credits))
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+    assert seen <= allowed
+    assert engine.courses_dict['IT001']['credits'] == new_credits
+
+
+def test_sqlite_snapshots_keep_their_own_database(tmp_path):
+    engine = ReasoningEngine(backend='sqlite', kb_db_path=tmp_path / 'knowledge.db')
+    removed = engine.get_courses_for_major(MAJOR)[-1]['course_id']
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                engine.get_courses_for_major(MAJOR)
+                engine.get_dependent_courses('IT001')
+            except KeyError as e:  # ids of one version looked up in another
+                errors.append(e)
+                return
+
+    def remove(knowledge):
+        knowledge['courses'] = [c for c in knowledge['courses'] if c['course_id'] != removed]
+
+    old = engine.snapshot
+    readers = [threading.Thread(target=reader) for _ in range(8)]
+    for thread in readers:
+        thread.start()
+    try:
+        engine.update_knowledge(remove)
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+    assert errors == []
+    # The old snapshot still answers from its own version's database
+    old_ids = old.derived['kb_db'].get_courses_for_major(MAJOR)
+    assert removed in old_ids and all(cid in old.courses_dict for cid in old_ids)
+    assert removed not in [c['course_id'] for c in engine.get_courses_for_major(MAJOR)]
+
+
+def test_shared_derived_results_are_read_only():
+    engine = ReasoningEngine()
+    profile = make_profile(engine, 0)
+    graph = engine.get_prerequisite_graph(MAJOR)
+    layout = engine.get_prerequisite_layout(MAJOR)
+    plan = engine.get_remaining_semester_plan(profile)
+
+    targets = [
+        (graph['nodes'][0], 'label'),
+        (graph, 'edges'),
+        (layout, 'IT001'),
+        (plan['semesters'][0], 'total_credits'),
+        (engine.courses_dict['IT001'], 'credits'),
+    ]
+    for container, key in targets:
+        with pytest.raises(TypeError):
+            container[key] = None
+
+
+def test_sqlite_updates_remove_unused_databases(tmp_path):
+    engine = ReasoningEngine(backend='sqlite', kb_db_path=tmp_path / 'knowledge.db')
+    held = engine.snapshot
+
+    def bump(credits):
+        def apply(knowledge):
+            for course in knowledge['courses']:
+                if course['course_id'] == 'IT001':
+                    course['credits'] = credits
+        return apply
+
+    engine.update_knowledge(bump(5))
+    engine.update_knowledge(bump(6))
+    gc.collect()
+
+    # The held first version and the current one; the middle version is gone
+    versioned = sorted(p.name for p in tmp_path.glob('knowledge_*.db'))
+    assert len(versioned) <= 2
+    assert f'knowledge_{engine.kb_version}.db' in versioned
+    assert held.derived['kb_db'].get_courses_for_major(MAJOR)
+
+    del held
+    gc.collect()
+    assert [p.name for p in tmp_path.glob('knowledge_*.db')] == [f'knowledge_{engine.kb_version}.db']
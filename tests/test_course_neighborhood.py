@@ -0,0 +1,80 @@
+"""
+Course neighborhoods against networkx ego graphs on the shipped knowledge base
+"""
+
+import networkx as nx
+import pytest
+
+from reasoning_engine import ReasoningEngine
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return ReasoningEngine()
+
+
+@pytest.fixture(scope='module')
+def graph(engine):
+    """Prerequisite graph with edges prereq -> course (dependents are successors)"""
+    G = nx.DiGraph()
+    for course in engine.courses_dict.values():
+        G.add_node(course['course_id'])
+        G.add_edges_from((p, course['course_id']) for p in course.get('prerequisites', ())
+                         if p in engine.courses_dict)
+    return G
+
+
+def node_ids(neighborhood):
+    return {node['id'] for node in neighborhood['nodes']}
+
+
+def expected_frontier(graph, shown):
+    return {cid for cid in shown
+            if any(n not in shown for n in [*graph.predecessors(cid), *graph.successors(cid)])}
+
+
+@pytest.mark.parametrize('hops', [1, 2, 3])
+def test_matches_ego_graphs(engine, graph, hops):
+    for course_id in engine.courses_dict:
+        neighborhood = engine.get_course_neighborhood(course_id, hops)
+        dependents = set(nx.ego_graph(graph, course_id, hops)) - {course_id}
+        prerequisites = set(nx.ego_graph(graph.reverse(copy=False), course_id, hops)) - {course_id}
+        shown = node_ids(neighborhood)
+
+        assert shown == dependents | prerequisites | {course_id}
+        assert set(neighborhood['edges']) == set(graph.subgraph(shown).edges())
+        assert set(neighborhood['frontier']) == expected_frontier(graph, shown)
+
+        # Prerequisites are laid out above the center, dependents below
+        positions = neighborhood['positions']
+        center_y = positions[course_id][1]
+        assert {cid for cid in shown if positions[cid][1] < center_y} == prerequisites
+        assert {cid for cid in shown if positions[cid][1] > center_y} == dependents
+
+
+def test_expanded_course_outside_subgraph_is_ignored(engine, graph):
+    course_id = max(engine.courses_dict, key=lambda cid: graph.degree(cid))
+    neighborhood = engine.get_course_neighborhood(course_id, 1)
+    outside = next(cid for cid in engine.courses_dict
+                   if cid not in node_ids(neighborhood) and graph.degree(cid))
+
+    assert engine.get_course_neighborhood(course_id, 1, expanded=[outside]) == neighborhood
+
+
+def test_expanding_frontier_until_empty(engine, graph):
+    course_id = max(engine.courses_dict, key=lambda cid: graph.degree(cid))
+    expanded = []
+    neighborhood = engine.get_course_neighborhood(course_id, 1)
+    while neighborhood['frontier']:
+        previous = node_ids(neighborhood)
+        expanded.extend(neighborhood['frontier'])
+        neighborhood = engine.get_course_neighborhood(course_id, 1, expanded=expanded)
+        shown = node_ids(neighborhood)
+        # Each expansion adds exactly the direct neighbors of the expanded courses
+        assert shown == previous | {n for cid in expanded
+                                    for n in [*graph.predecessors(cid), *graph.successors(cid)]}
+        assert set(neighborhood['frontier']) == expected_frontier(graph, shown)
+
+    # Everything reachable through prerequisite links is shown
+    assert node_ids(neighborhood) == nx.node_connected_component(graph.to_undirected(), course_id)
+    assert set(neighborhood['edges']) == set(graph.subgraph(node_ids(neighborhood)).edges())
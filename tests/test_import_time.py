@@ -0,0 +1,67 @@
+"""
+Import-time budget for the Streamlit app
+
+Graph libraries, pandas and numpy are imported by the views and functions that
+use them; importing the app or the engine must not load them. Each module is
+timed in its own interpreter, so nothing is already cached by another import.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative import budgets in milliseconds (measured ~0.35 s and ~4 ms)
+APP_BUDGET_MS = 1000
+ENGINE_BUDGET_MS = 100
+
+DEFERRED_PACKAGES = ('networkx', 'pyvis', 'numpy', 'pandas')
+
+
+def import_times(module: str) -> dict:
+    """Run python -X importtime on a fresh interpreter; get module -> cumulative ms"""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    times = {}
+    for line in completed.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+@pytest.fixture(scope='module')
+def app_import_times():
+    return import_times('app')
+
+
+@pytest.fixture(scope='module')
+def engine_import_times():
+    return import_times('reasoning_engine')
+
+
+def deferred_packages_loaded(times: dict) -> set:
+    return {name.split('.')[0] for name in times} & set(DEFERRED_PACKAGES)
+
+
+def test_app_does_not_import_deferred_packages(app_import_times):
+    assert not deferred_packages_loaded(app_import_times)
+
+
+def test_app_import_within_budget(app_import_times):
+    assert app_import_times['app'] < APP_BUDGET_MS
+
+
+def test_engine_does_not_import_deferred_packages(engine_import_times):
+    assert not deferred_packages_loaded(engine_import_times)
+
+
+def test_engine_import_within_budget(engine_import_times):
+    assert engine_import_times['reasoning_engine'] < ENGINE_BUDGET_MS
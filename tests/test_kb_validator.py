@@ -0,0 +1,84 @@
+"""
+Knowledge base validation: prerequisite cycles, dangling references and plan keys
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from kb_validator import find_prerequisite_cycles, validate_knowledge
+from reasoning_engine import ReasoningEngine
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def make_courses(prerequisites):
+    return [{
+        'course_id': course_id, 'course_name': course_id, 'credits': 4, 'course_group': 'Cơ sở ngành',
+        'major': ['KHMT'], 'prerequisites': prereqs
+    } for course_id, prereqs in prerequisites.items()]
+
+
+def cycle_sets(courses):
+    return sorted(sorted(cycle) for cycle in find_prerequisite_cycles(courses))
+
+
+def test_self_prerequisite_is_a_cycle():
+    assert cycle_sets(make_courses({'A': ['A'], 'B': ['A']})) == [['A']]
+
+
+def test_two_cycle():
+    assert cycle_sets(make_courses({'A': ['B'], 'B': ['A'], 'C': ['A']})) == [['A', 'B']]
+
+
+def test_acyclic_chain_has_no_cycles():
+    assert cycle_sets(make_courses({'A': ['B', 'C'], 'B': ['C'], 'C': []})) == []
+
+
+def test_cycle_behind_dangling_edge():
+    # A's first prerequisite is unknown; the B <-> C cycle is only reached past it
+    courses = make_courses({'A': ['GONE', 'B'], 'B': ['C'], 'C': ['B', 'GONE']})
+    assert cycle_sets(courses) == [['B', 'C']]
+
+    report = validate_knowledge(courses, {}, {})
+    assert report['dangling_prerequisites'] == [('A', 'GONE'), ('C', 'GONE')]
+    assert report['issue_count'] == 3
+
+
+def test_shipped_knowledge_base_findings():
+    report = ReasoningEngine().get_validation_report()
+
+    assert not report['cycles']
+    assert list(report['dangling_prerequisites']) == [('CS312', 'CS110'), ('CS315', 'CS110')]
+    assert list(report['dangling_plan_entries']) == [('TTNT_K2023', 2, 'PE012')]
+    assert report['issue_count'] == 3
+
+
+def test_non_numeric_semester_is_reported():
+    courses = make_courses({'A': []})
+    teaching_plans = {'teaching_plans': {'KHMT_K2024': {'semesters': {
+        '1': {'courses': [{'id': 'A', 'type': 'compulsory'}]},
+        'hè': {'courses': [{'id': 'GONE', 'type': 'compulsory'}]}
+    }}}}
+
+    report = validate_knowledge(courses, {}, teaching_plans)
+    assert report['invalid_semesters'] == [('KHMT_K2024', 'hè')]
+    assert report['dangling_plan_entries'] == []
+    assert report['issue_count'] == 1
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_engine_loads_plan_with_non_numeric_semester(tmp_path, backend):
+    with open(ROOT / 'knowledge' / 'teaching_plans.json', encoding='utf-8') as f:
+        teaching_plans = json.load(f)
+    semesters = teaching_plans['teaching_plans']['KHMT_K2024']['semesters']
+    semesters['hè'] = semesters['1']
+    path = tmp_path / 'teaching_plans.json'
+    path.write_text(json.dumps(teaching_plans), encoding='utf-8')
+
+    engine = ReasoningEngine(teaching_plans_path=path, backend=backend, kb_db_path=tmp_path / 'kb.db')
+
+    assert list(engine.get_validation_report()['invalid_semesters']) == [('KHMT_K2024', 'hè')]
+    assert engine.get_course_offered_semesters('IT001', 'KHMT', 'K20') == ['HK1']
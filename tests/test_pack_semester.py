@@ -0,0 +1,240 @@
+"""
+Semester packing on a small synthetic knowledge base
+
+The reference enumerates every subset of the candidates, keeps those passing the
+hard rules, the elective slot caps and the R005 credit window, and ranks them by
+(courses per tier, summed score); pack_semester must return the same top sets.
+"""
+
+import itertools
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from reasoning_engine import ReasoningEngine
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MAJOR = 'KHMT'
+COHORT = 'K20'
+SEMESTER = 4
+
+POOL = [
+    # (course_id, credits, course_group, knowledge_area)
+    ('C1', 4, 'Cơ sở ngành', 'Computer Science'),
+    ('C2', 3, 'Đại cương', 'Mathematics'),
+    ('E1', 4, 'Chuyên ngành', 'Artificial Intelligence'),
+    ('E2', 4, 'Chuyên ngành', 'Computer Vision'),
+    ('E3', 4, 'Chuyên ngành', 'Machine Learning'),
+    ('E4', 3, 'Chuyên ngành', 'Software Engineering'),
+    ('F1', 2, 'Cơ sở ngành', 'Computer Science'),
+    ('F2', 3, 'Chuyên ngành', 'Networking'),
+    ('F3', 4, 'Chuyên ngành', 'Databases'),
+    ('F4', 2, 'Đại cương', 'General Education'),
+    ('F5', 4, 'Chuyên ngành', 'Artificial Intelligence'),
+    ('ENG01', 4, 'Đại cương', 'General Education'),
+    ('ME001', 0, 'Đại cương', 'Computer Science'),
+    ('PE231', 0, 'Đại cương', 'Computer Science'),
+    ('PE232', 0, 'Đại cương', 'Computer Science'),
+]
+
+# E3 is a choice of both slot groups; E1 and E3 represent their slots (tier 2)
+SEMESTER_PLAN = [
+    {'id': 'C1', 'credits': 4, 'type': 'compulsory'},
+    {'id': 'C2', 'credits': 3, 'type': 'compulsory'},
+    {'id': 'PE232', 'credits': 0, 'type': 'compulsory'},
+    {'elective_slot': 'Môn cơ sở ngành 1 (chọn 1)', 'credits': 4, 'type': 'elective',
+     'choices': ['E1', 'E2', 'E3']},
+    {'elective_slot': 'Môn tự chọn tự do 1 (chọn 1)', 'credits': 4, 'type': 'elective',
+     'choices': ['E3', 'E4']},
+]
+
+
+@pytest.fixture(scope='module')
+def engine(tmp_path_factory):
+    path = tmp_path_factory.mktemp('knowledge')
+    courses = [{
+        'course_id': course_id, 'course_name': f'Môn {course_id}', 'credits': credits,
+        'major': [MAJOR], 'course_group': group, 'knowledge_area': [area],
+        'prerequisites': [], 'description': ''
+    } for course_id, credits, group, area in POOL]
+    teaching_plans = {
+        'cohort_mappings': {COHORT: {'enrollment_year': 2025, 'curriculum': 'K2024'}},
+        'teaching_plans': {f'{MAJOR}_K2024': {
+            'major': MAJOR, 'curriculum_year': 2024,
+            'semesters': {str(SEMESTER): {'courses': SEMESTER_PLAN}}
+        }}
+    }
+    (path / 'courses.json').write_text(json.dumps({'courses': courses}), encoding='utf-8')
+    (path / 'teaching_plans.json').write_text(json.dumps(teaching_plans), encoding='utf-8')
+    return ReasoningEngine(courses_path=path / 'courses.json',
+                           rules_path=ROOT / 'knowledge' / 'rules.json',
+                           teaching_plans_path=path / 'teaching_plans.json')
+
+
+def make_profile(interests=('AI', 'ML')):
+    return {
+        'major': MAJOR, 'cohort': COHORT, 'enrollment_year': 2025, 'current_year': 2,
+        'current_semester_number': SEMESTER - 1, 'completed_courses': ['IT001'],
+        'studied_courses': ['IT001'], 'failed_courses': [], 'current_courses': [],
+        'course_grades': {'IT001': 8.0}, 'interests': list(interests), 'time_availability': 'Medium'
+    }
+
+
+def pool_courses(engine, ids=None):
+    return [engine.courses_dict[course_id] for course_id, *_ in POOL if ids is None or course_id in ids]
+
+
+def all_sets(result):
+    return [result['best']] + result['alternatives']
+
+
+def set_ids(packing):
+    return {c['course_id'] for c in packing['courses']}
+
+
+def slot_groups(engine, semester_number):
+    """Merged slot groups of the semester as (choice ids, slot count)"""
+    merged = {}
+    for slot in engine.get_semester_courses(MAJOR, semester_number, COHORT)['elective_slots']:
+        choices, count = merged.get(engine._get_slot_base_name(slot['slot_name']), (set(), 0))
+        merged[engine._get_slot_base_name(slot['slot_name'])] = (
+            choices | {c['course_id'] for c in slot['choices']}, count + 1)
+    return list(merged.values())
+
+
+def fits_slots(course_ids, groups):
+    """Whether the slot courses among course_ids can take distinct slots"""
+    picks = [course_id for course_id in course_ids if any(course_id in choices for choices, _ in groups)]
+    slots = [choices for choices, count in groups for _ in range(count)]
+    if len(picks) > len(slots):
+        return False
+    return any(all(pick in slot for pick, slot in zip(picks, order))
+               for order in itertools.permutations(slots, len(picks)))
+
+
+def brute_force(engine, profile, candidates, semester_number, keep):
+    """Top `keep` set keys (courses per tier, summed score) and whether the window is reachable"""
+    year = (semester_number + 1) // 2
+    semester = 'HK1' if semester_number % 2 else 'HK2'
+    planned = engine.get_semester_courses(MAJOR, semester_number, COHORT)
+    compulsory = {c['course_id'] for c in planned['compulsory']}
+    elective = {c['course_id'] for c in planned['elective']}
+    groups = slot_groups(engine, semester_number)
+    min_credits = engine.get_min_credits_per_semester()
+    max_credits = engine.get_max_credits_per_semester()
+    ability = engine.infer_student_ability(profile)
+
+    def tier_of(course):
+        if course['course_id'] in compulsory:
+            return 1
+        if course['course_id'] in elective:
+            return 2
+        return 3 if course['course_group'] in ['Đại cương', 'Cơ sở ngành'] else 4
+
+    items = [(course['course_id'], course['credits'], tier_of(course),
+              engine.compute_recommendation_score(course, profile, ability)['total_score'])
+             for course in candidates
+             if 0 < course['credits'] <= max_credits
+             and engine._check_special_course_rules(course, year, semester)]
+
+    sets = []
+    for size in range(len(items) + 1):
+        for chosen in itertools.combinations(items, size):
+            credits = sum(item[1] for item in chosen)
+            if credits <= max_credits and fits_slots([item[0] for item in chosen], groups):
+                tiers = tuple(sum(item[2] == tier for item in chosen) for tier in range(1, 5))
+                sets.append((credits, tiers, sum(item[3] for item in chosen)))
+
+    feasible = any(credits >= min_credits for credits, _, _ in sets)
+    if feasible:
+        sets = [s for s in sets if s[0] >= min_credits]
+    sets.sort(key=lambda s: (s[1], s[2]), reverse=True)
+    return feasible, [(tiers, score) for _, tiers, score in sets[:keep]]
+
+
+def packing_key(packing):
+    positive = [c for c in packing['courses'] if c['credits'] > 0]
+    return (tuple(sum(c['tier'] == tier for c in positive) for tier in range(1, 5)),
+            sum(c['total_score'] for c in positive))
+
+
+def test_sets_stay_within_credit_window(engine):
+    result = engine.pack_semester(make_profile(), pool_courses(engine), SEMESTER)
+
+    assert result['feasible']
+    assert len(result['alternatives']) == 3
+    for packing in all_sets(result):
+        assert result['min_credits'] <= packing['total_credits'] <= result['max_credits']
+
+
+def test_unreachable_minimum_takes_every_course(engine):
+    candidates = pool_courses(engine, {'C1', 'C2', 'F1'})
+    result = engine.pack_semester(make_profile(), candidates, SEMESTER)
+
+    assert not result['feasible']
+    assert set_ids(result['best']) == {'C1', 'C2', 'F1'}
+    assert result['best']['total_credits'] == 9
+
+
+def test_hard_rules_exclude_courses(engine):
+    # Semester 4 is year 2 HK2: ENG01 (year 1), ME001 (year 1 HK1) and PE231 (HK1) are out
+    result = engine.pack_semester(make_profile(), pool_courses(engine), SEMESTER)
+    for packing in all_sets(result):
+        assert not set_ids(packing) & {'ENG01', 'ME001', 'PE231'}
+
+    # Semester 1 is year 1 HK1: the reverse
+    result = engine.pack_semester(make_profile(), pool_courses(engine), 1)
+    assert {'ENG01', 'ME001', 'PE231'} <= set_ids(result['best'])
+    for packing in all_sets(result):
+        assert 'PE232' not in set_ids(packing)
+
+
+def test_zero_credit_courses_join_every_set(engine):
+    result = engine.pack_semester(make_profile(), pool_courses(engine), SEMESTER)
+
+    for packing in all_sets(result):
+        assert 'PE232' in set_ids(packing)
+        assert packing['total_credits'] == sum(c['credits'] for c in packing['courses'])
+    assert len({frozenset(set_ids(packing)) for packing in all_sets(result)}) == 4
+
+
+def test_slot_caps_with_choice_in_two_groups(engine):
+    groups = slot_groups(engine, SEMESTER)
+    assert [count for _, count in groups] == [1, 1]
+
+    result = engine.pack_semester(make_profile(), pool_courses(engine), SEMESTER)
+
+    # E1 takes the first slot, so E3 must take the free elective one
+    assert {'E1', 'E3'} <= set_ids(result['best'])
+    for packing in all_sets(result):
+        assert fits_slots(set_ids(packing), groups)
+        assert not {'E1', 'E2'} <= set_ids(packing)
+
+
+def test_fits_slots_backtracks():
+    assert ReasoningEngine._fits_slots([[0, 1], [0]], [1, 1])
+    assert ReasoningEngine._fits_slots([[0], [0, 1], [1]], [1, 2])
+    assert not ReasoningEngine._fits_slots([[0], [0]], [1, 1])
+    assert not ReasoningEngine._fits_slots([[0, 1], [0, 1], [0, 1]], [1, 1])
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_matches_brute_force(engine, seed):
+    rng = random.Random(seed)
+    courses = rng.sample(pool_courses(engine), k=rng.randint(5, 11))
+    # Random credits (some zero) make the window and the caps bind differently
+    candidates = [{**course, 'credits': rng.choice([0, 1, 2, 3, 3, 4, 4, 5])} for course in courses]
+    profile = make_profile(rng.sample(['AI', 'ML', 'CV', 'SE', 'Network', 'Database'], k=2))
+    semester_number = rng.choice([SEMESTER, SEMESTER, 3])
+
+    result = engine.pack_semester(profile, candidates, semester_number)
+    feasible, expected = brute_force(engine, profile, candidates, semester_number, keep=4)
+
+    assert result['feasible'] == feasible
+    got = [packing_key(packing) for packing in all_sets(result)]
+    assert [tiers for tiers, _ in got] == [tiers for tiers, _ in expected]
+    assert [score for _, score in got] == pytest.approx([score for _, score in expected], abs=1e-9)
@@ -0,0 +1,83 @@
+"""
+Shared knowledge base eligibility against ReasoningEngine.get_eligible_courses
+"""
+
+import random
+
+import pytest
+
+from reasoning_engine import ReasoningEngine
+from shared_kb import SharedKnowledgeBase, batch_eligible_courses
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return ReasoningEngine()
+
+
+@pytest.fixture(scope='module')
+def shared_kb(engine):
+    with SharedKnowledgeBase.publish(engine) as kb:
+        yield kb
+
+
+def make_profile(engine, rng):
+    major = rng.choice(['KHMT', 'TTNT'])
+    # K18 follows the 2023 curriculum, the only one with elective slot choices
+    cohort = rng.choice(['K18', 'K18', 'K19', 'K20', 'K17'])
+    ids = [c['course_id'] for c in engine.get_courses_for_major(major)]
+    completed = rng.sample(ids, k=rng.randint(0, len(ids)))
+    rest = [c for c in ids if c not in completed]
+    current = rng.sample(rest, k=min(len(rest), rng.randint(0, 4)))
+    failed = rng.sample(ids, k=rng.randint(0, 3))
+
+    # Failed slot electives, some with an alternative of the slot done or in progress
+    slot_groups = engine._get_elective_slot_groups(major, cohort)
+    if slot_groups and rng.random() < 0.7:
+        for course_id in rng.sample(sorted(slot_groups), k=3):
+            failed.append(course_id)
+            alternatives = [alt for alt in slot_groups[course_id] if alt != course_id]
+            if alternatives and rng.random() < 0.5:
+                (completed if rng.random() < 0.5 else current).append(rng.choice(alternatives))
+
+    # Ids outside the catalog are ignored
+    if rng.random() < 0.1:
+        completed.append('ZZ999')
+        failed.append('XX999')
+    return {'major': major, 'cohort': cohort, 'completed_courses': completed,
+            'current_courses': current, 'failed_courses': failed}
+
+
+@pytest.fixture(scope='module')
+def profiles(engine):
+    return [make_profile(engine, random.Random(seed)) for seed in range(300)]
+
+
+def engine_eligible(engine, profile):
+    return [c['course_id'] for c in engine.get_eligible_courses(profile)]
+
+
+def test_eligible_courses_match_engine(engine, shared_kb, profiles):
+    for profile in profiles:
+        assert shared_kb.get_eligible_courses(profile) == engine_eligible(engine, profile), profile
+
+
+def test_profiles_cover_dropped_failed_electives(engine, profiles):
+    # Some profile must have a failed elective dropped for a done alternative
+    def drops_failed_elective(profile):
+        slot_groups = engine._get_elective_slot_groups(profile['major'], profile['cohort'])
+        done = set(profile['completed_courses']) | set(profile['current_courses'])
+        return any(course_id in slot_groups and done & (set(slot_groups[course_id]) - {course_id})
+                   for course_id in profile['failed_courses'])
+
+    assert sum(drops_failed_elective(p) for p in profiles) >= 20
+
+
+def test_unknown_major_has_no_eligible_courses(shared_kb):
+    assert shared_kb.get_eligible_courses({'major': 'XYZ', 'completed_courses': []}) == []
+
+
+def test_batch_workers_match_engine(engine, profiles):
+    sample = profiles[:40]
+    results = batch_eligible_courses(sample, workers=2, chunk_size=8)
+    assert results == [engine_eligible(engine, profile) for profile in sample]
@@ -0,0 +1,117 @@
+"""
+Weight sweep results against the engine's own per-setting rankings
+
+The reference re-scores every candidate with the engine's component functions
+and sorts stably (equal scores keep eligible-list order), as the reasoning view
+does; the sweep must reproduce its top-k lists and rank correlations exactly.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from reasoning_engine import ReasoningEngine
+from weight_sweep import build_component_matrices, make_weight_grid, run_weight_sweep
+
+
+INTERESTS = ['AI', 'ML', 'NLP', 'CV', 'Database', 'Network', 'SE', 'Algorithm', 'DataScience']
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return ReasoningEngine()
+
+
+@pytest.fixture(scope='module')
+def profiles(engine):
+    profiles = []
+    for seed in range(40):
+        rng = random.Random(seed)
+        major = rng.choice(['KHMT', 'TTNT'])
+        course_ids = [c['course_id'] for c in engine.get_courses_for_major(major)]
+        done = rng.sample(course_ids, k=rng.randint(0, 40))
+        failed = rng.sample(done, k=min(len(done), rng.randint(0, 2)))
+        profiles.append({
+            'major': major, 'cohort': rng.choice(['K18', 'K19', 'K20']), 'enrollment_year': 2023,
+            'current_year': rng.randint(1, 4), 'current_semester_number': rng.randint(1, 7),
+            'completed_courses': [c for c in done if c not in failed], 'studied_courses': done,
+            'failed_courses': failed, 'current_courses': [],
+            'course_grades': {c: rng.uniform(3, 10) for c in done},
+            'interests': rng.sample(INTERESTS, k=rng.randint(0, 3)),
+            'time_availability': rng.choice(['Low', 'Medium', 'High'])
+        })
+    return profiles
+
+
+def reference_sweep(engine, profiles, grid, baseline, top_k, rank_depth):
+    """Per-setting overlap, Spearman rho and exposure from the engine's scores"""
+    components = []
+    for profile in profiles:
+        ability = engine.infer_student_ability(profile)
+        match_counts = engine.get_interest_match_counts(profile.get('interests', []))
+        candidates = [c for c in engine.get_eligible_courses(profile) if not c.get('is_failed')]
+        if candidates:
+            components.append([(
+                c['course_id'],
+                engine.compute_interest_match(c, profile.get('interests', []), match_counts),
+                engine.compute_difficulty_fit(engine.compute_difficulty_score(c), ability['academic_readiness']),
+                engine.compute_time_fit(c, profile.get('time_availability', 'Medium'))
+            ) for c in candidates])
+
+    def ranking(candidates, weights):
+        alpha, beta, gamma = (float(w) for w in weights)
+        scored = [(alpha * i + beta * d + gamma * t, course_id) for course_id, i, d, t in candidates]
+        return [course_id for _, course_id in sorted(scored, key=lambda x: x[0], reverse=True)]
+
+    course_ids = [c['course_id'] for c in engine.courses]
+    column = {course_id: idx for idx, course_id in enumerate(course_ids)}
+    overlap, correlation, exposure = [], [], np.zeros((len(grid), len(course_ids)))
+    for g, weights in enumerate(grid):
+        kept, rhos = [], []
+        for candidates in components:
+            base = ranking(candidates, baseline)
+            new = ranking(candidates, weights)
+            top = new[:top_k]
+            kept.append(len(set(base[:top_k]) & set(top)) / len(base[:top_k]))
+            for course_id in top:
+                exposure[g, column[course_id]] += 1 / len(components)
+
+            deep = base[:rank_depth] if rank_depth is not None else base
+            if len(deep) >= 2:
+                rank = {course_id: r for r, course_id in enumerate(c for c in new if c in set(deep))}
+                gaps = sum((rank[course_id] - r) ** 2 for r, course_id in enumerate(deep))
+                rhos.append(1 - 6 * gaps / (len(deep) * (len(deep) ** 2 - 1)))
+        overlap.append(np.mean(kept))
+        correlation.append(np.mean(rhos))
+    return np.array(overlap), np.array(correlation), exposure
+
+
+@pytest.mark.parametrize('top_k, rank_depth', [(5, 8), (5, 3), (3, None)])
+def test_sweep_matches_engine_rankings(engine, profiles, top_k, rank_depth):
+    weights = engine.rules['recommendation_weights']
+    baseline = (weights['alpha_interest'], weights['beta_difficulty'], weights['gamma_time'])
+    grid = make_weight_grid(4)
+
+    result = run_weight_sweep(build_component_matrices(engine, profiles), grid, baseline, top_k, rank_depth)
+    overlap, correlation, exposure = reference_sweep(engine, profiles, grid, baseline, top_k, rank_depth)
+
+    np.testing.assert_allclose(result['topk_overlap'], overlap, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(result['rank_correlation'], correlation, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(result['exposure'], exposure, rtol=0, atol=1e-12)
+
+
+def test_baseline_scores_equal_engine_scores(engine, profiles):
+    components = build_component_matrices(engine, profiles)
+    weights = engine.rules['recommendation_weights']
+    column = {course_id: idx for idx, course_id in enumerate(components['course_ids'])}
+    for s, profile in enumerate(profiles):
+        ability = engine.infer_student_ability(profile)
+        for course in engine.get_eligible_courses(profile):
+            if course.get('is_failed'):
+                continue
+            j = column[course['course_id']]
+            swept = (weights['alpha_interest'] * components['interest'][s, j]
+                     + weights['beta_difficulty'] * components['difficulty'][s, j]
+                     + weights['gamma_time'] * components['time'][s, j])
+            assert swept == engine.compute_recommendation_score(course, profile, ability)['total_score']
@@ -0,0 +1,291 @@
+"""
+Weight Sensitivity Sweep for Course Recommendation System
+Evaluates many recommendation_weights settings against a population of student profiles
+
+The three fit components (interest, difficulty, time) do not depend on the weights,
+so they are computed once per student x course into matrices. Every weight setting
+is then a single vectorized weighted sum over those matrices - no rescoring.
+
+Usage:
+    python weight_sweep.py --steps 43 --top-k 5
+"""
+
+import argparse
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from reasoning_engine import ReasoningEngine
+
+
+TIME_LEVELS = ('Low', 'Medium', 'High')
+
+
+def make_weight_grid(steps: int) -> np.ndarray:
+    """
+    Get every (alpha, beta, gamma) on a simplex lattice (weights sum to 1)
+
+    Rankings only depend on the direction of the weight vector, so the simplex
+    covers every distinct setting; steps=43 gives 990 points.
+
+    Returns:
+        Array of shape (n_settings, 3)
+    """
+    points = [(a / steps, b / steps, (steps - a - b) / steps)
+              for a in range(steps + 1) for b in range(steps + 1 - a)]
+    return np.array(points)
+
+
+def build_component_matrices(engine: ReasoningEngine, profiles: Iterable[Dict]) -> Dict:
+    """
+    Compute the weight-independent fit components for every student x course
+
+    Candidates of a student are their eligible, not failed courses (as scored by the
+    reasoning view); all other cells are masked out.
+
+    Returns:
+        Dictionary with 'course_ids' (columns), float64 matrices 'interest',
+        'difficulty' and 'time' of shape (n_students, n_courses), and boolean 'mask'
+    """
+    profiles = list(profiles)
+    courses = engine.courses
+    course_ids = [c['course_id'] for c in courses]
+    column = {course_id: idx for idx, course_id in enumerate(course_ids)}
+    features = [engine.get_course_features(course_id) for course_id in course_ids]
+
+    course_difficulty = np.array([f['difficulty'] for f in features], dtype=np.float64)
+    time_by_level = {
+        level: np.array([f['time_fit'][level] for f in features], dtype=np.float64)
+        for level in TIME_LEVELS
+    }
+    has_area = np.array([bool(c.get('knowledge_area')) for c in courses])
+
+    n_students, n_courses = len(profiles), len(course_ids)
+    interest = np.empty((n_students, n_courses), dtype=np.float64)
+    time_fit = np.empty((n_students, n_courses), dtype=np.float64)
+    readiness = np.empty(n_students, dtype=np.float64)
+    mask = np.zeros((n_students, n_courses), dtype=bool)
+
+    interest_rows = {}
+    for s, profile in enumerate(profiles):
+        interests = frozenset(profile.get('interests', []))
+        row = interest_rows.get(interests)
+        if row is None:
+            # Same cases as compute_interest_match
+            if not interests:
+                row = np.full(n_courses, 0.5, dtype=np.float64)
+            else:
+                row = np.full(n_courses, 0.2, dtype=np.float64)
+                for course_id, matched in engine.get_interest_match_counts(interests).items():
+                    row[column[course_id]] = min(matched / len(interests), 1.0)
+                row[~has_area] = 0.3
+            interest_rows[interests] = row
+        interest[s] = row
+
+        time_fit[s] = time_by_level.get(profile.get('time_availability', 'Medium'), time_by_level['Medium'])
+        readiness[s] = engine.infer_student_ability(profile)['academic_readiness']
+        for course in engine.get_eligible_courses(profile):
+            if not course.get('is_failed'):
+                mask[s, column[course['course_id']]] = True
+
+    # Vectorized compute_difficulty_fit
+    max_difficulty = 15.0
+    gap = course_difficulty[None, :] - readiness[:, None]
+    difficulty = 1.0 - np.minimum(np.abs(gap) / max_difficulty, 1.0)
+    difficulty[gap > 2] *= 0.7
+
+    return {
+        'course_ids': course_ids,
+        'interest': interest,
+        'difficulty': difficulty,
+        'time': time_fit,
+        'mask': mask
+    }
+
+
+def _pack_left(keep: np.ndarray) -> np.ndarray:
+    """Get, per row, the positions of the kept cells first (in order), trimmed to the widest row"""
+    width = max(int(keep.sum(axis=1).max()), 1)
+    return np.argsort(~keep, axis=1, kind='stable')[:, :width]
+
+
+def _count_dominating(packed: np.ndarray, valid: np.ndarray, chunk: int = 512) -> np.ndarray:
+    """
+    Count, for every candidate, the candidates that outrank it under any non-negative weights
+
+    i outranks j for every weight setting if it is strictly better in all components,
+    or at least as good in all components and earlier in course order (ties keep course order).
+    Candidates are compared one position at a time, so memory stays at
+    chunk x width x components instead of growing with width squared.
+    """
+    n_students, width, _ = packed.shape
+    positions = np.arange(width)
+    counts = np.empty((n_students, width), dtype=np.int32)
+    for start in range(0, n_students, chunk):
+        block = packed[start:start + chunk]
+        block_valid = valid[start:start + chunk]
+        for j in range(width):
+            target = block[:, j:j + 1, :]
+            outranks = (block > target).all(axis=2)
+            outranks |= (block >= target).all(axis=2) & (positions < j)
+            outranks &= block_valid
+            counts[start:start + chunk, j] = outranks.sum(axis=1)
+    return counts
+
+
+def run_weight_sweep(components: Dict, grid: np.ndarray, baseline: Sequence[float],
+                     top_k: int = 5, rank_depth: int = 20) -> Dict:
+    """
+    Compare the rankings produced by every weight setting with the baseline setting
+
+    Args:
+        components: Output of build_component_matrices
+        grid: Weight settings, shape (n_settings, 3)
+        baseline: Reference (alpha, beta, gamma), usually rules['recommendation_weights']
+        top_k: Size of the recommended list
+        rank_depth: Spearman correlation is computed over each student's baseline
+                    top rank_depth candidates (None for the full candidate ranking)
+
+    Returns:
+        Dictionary with 'weights', per-setting 'topk_overlap' (mean share of the
+        baseline top-k kept), 'rank_correlation' (mean Spearman rho) and
+        'exposure' (share of students whose top-k contains each course, shape
+        (n_settings, n_courses)), plus 'course_ids' and 'n_students'
+    """
+    mask = components['mask']
+    active = mask.any(axis=1)
+    mask = mask[active]
+    n_students, n_courses = mask.shape
+
+    # Pack each student's candidates to the left (in course order): [student, position, component]
+    columns = _pack_left(mask)
+    valid = np.take_along_axis(mask, columns, axis=1)
+    n_candidates = valid.sum(axis=1)
+    width = columns.shape[1]
+    packed = np.stack([np.take_along_axis(components[name][active], columns, axis=1)
+                       for name in ('interest', 'difficulty', 'time')], axis=2)
+    # Padding sorts after every candidate. Scores are summed in the engine's order
+    # in float64, so they equal compute_recommendation_score bit for bit; equal
+    # scores are ranked in course order (as the engine's stable sort does).
+    offset = np.where(valid, 0.0, -np.inf)
+
+    def _scores(values, weights, offsets):
+        # values: [component, student, position]
+        scores = values[0] * float(weights[0]) + offsets
+        scores += values[1] * float(weights[1])
+        scores += values[2] * float(weights[2])
+        return scores
+
+    k = min(top_k, width)
+    depth = width if rank_depth is None else min(rank_depth, width)
+    rows = np.arange(n_students)[:, None]
+
+    base_order = np.argsort(-_scores(packed.transpose(2, 0, 1), baseline, offset), axis=1, kind='stable')
+    base_rank = np.empty_like(base_order)
+    base_rank[rows, base_order] = np.arange(width)
+    n_top = np.minimum(n_candidates, k)
+
+    # Only candidates outranked by fewer than k others (for every weight setting)
+    # can ever reach a top-k list - score just those
+    band = _pack_left(valid & (_count_dominating(packed, valid) < k))
+    band_values = np.ascontiguousarray(np.take_along_axis(packed, band[:, :, None], axis=1).transpose(2, 0, 1))
+    band_offset = np.take_along_axis(offset, band, axis=1)
+    band_valid = np.take_along_axis(valid, band, axis=1)
+    # The baseline top-k is always in the band (nothing outranks it k times)
+    band_base_top = band_valid & (np.take_along_axis(base_rank, band, axis=1) < k)
+    # Padding maps to an extra exposure bin that is dropped
+    band_columns = np.where(band_valid, np.take_along_axis(columns, band, axis=1), n_courses)
+    band_k = min(k, band.shape[1])
+
+    # Spearman inputs: the baseline's top candidates, back in course order (valid
+    # ones first, as padding has the highest positions) and re-scored per setting
+    deep = np.sort(base_order[:, :depth], axis=1)
+    deep_values = np.ascontiguousarray(np.take_along_axis(packed, deep[:, :, None], axis=1).transpose(2, 0, 1))
+    deep_offset = offset[rows, deep]
+    n_deep = np.minimum(n_candidates, depth)
+    deep_valid = np.arange(depth)[None, :] < n_deep[:, None]
+    deep_base_rank = np.where(deep_valid, np.take_along_axis(base_rank, deep, axis=1), 0)
+    ranked = n_deep >= 2
+    rho_denominator = (n_deep * (n_deep.astype(np.float64) ** 2 - 1))[ranked]
+    # New and baseline ranks are both permutations of 0..n-1, so
+    # sum((new - base)^2) = 2 * sum(r^2) - 2 * sum(new * base) - a single sort per setting
+    valid_positions = np.where(deep_valid, np.arange(depth)[None, :], 0)
+    position_squares = (valid_positions ** 2).sum(axis=1)
+
+    overlap = np.empty(len(grid))
+    correlation = np.empty(len(grid))
+    exposure = np.empty((len(grid), n_courses))
+    for g, weights in enumerate(grid):
+        # Top-k list: everything above the k-th best score, then the candidates tied
+        # with it in course order (the band is in course order) until k are chosen
+        band_scores = _scores(band_values, weights, band_offset)
+        kth = -np.partition(-band_scores, band_k - 1, axis=1)[:, band_k - 1:band_k]
+        above = band_scores > kth
+        tied = band_scores == kth
+        in_top = above | (tied & (np.cumsum(tied, axis=1) <= band_k - above.sum(axis=1, keepdims=True)))
+
+        kept = (in_top & band_base_top).sum(axis=1)
+        overlap[g] = np.mean(kept / n_top)
+
+        exposure[g] = np.bincount(band_columns[in_top], minlength=n_courses + 1)[:n_courses] / n_students
+
+        # Spearman rho of the baseline's top candidates under the new weights
+        deep_scores = _scores(deep_values, weights, deep_offset)
+        order = np.argsort(-deep_scores, axis=1, kind='stable')
+        squared_gaps = 2 * (position_squares
+                            - (valid_positions * np.take_along_axis(deep_base_rank, order, axis=1)).sum(axis=1))
+        rho = 1 - 6 * squared_gaps[ranked] / rho_denominator
+        correlation[g] = rho.mean() if len(rho) else np.nan
+
+    return {
+        'weights': np.asarray(grid),
+        'topk_overlap': overlap,
+        'rank_correlation': correlation,
+        'exposure': exposure,
+        'course_ids': components['course_ids'],
+        'n_students': n_students
+    }
+
+
+def load_population(db_path: str = None, major: str = None, cohort: str = None) -> List[Dict]:
+    """Load the stored student profiles (see student_store.StudentStore)"""
+    from student_store import StudentStore
+
+    store = StudentStore(db_path)
+    return [store.load_profile(student_id) for student_id in store.list_students(major, cohort)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep recommendation_weights over the stored student population")
+    parser.add_argument('--db', help="Student database (default: STUDENT_DB_PATH or data/students.db)")
+    parser.add_argument('--major')
+    parser.add_argument('--cohort')
+    parser.add_argument('--steps', type=int, default=43, help="Simplex lattice steps (43 -> 990 settings)")
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--rank-depth', type=int, default=20)
+    parser.add_argument('--show', type=int, default=10, help="Number of most divergent settings to print")
+    args = parser.parse_args()
+
+    engine = ReasoningEngine()
+    profiles = load_population(args.db, args.major, args.cohort)
+    if not profiles:
+        parser.error("No student profiles found")
+
+    weights = engine.rules['recommendation_weights']
+    baseline = (weights['alpha_interest'], weights['beta_difficulty'], weights['gamma_time'])
+    result = run_weight_sweep(build_component_matrices(engine, profiles), make_weight_grid(args.steps),
+                              baseline, args.top_k, args.rank_depth)
+
+    print(f"{len(result['weights'])} settings x {result['n_students']} students, "
+          f"baseline alpha={baseline[0]} beta={baseline[1]} gamma={baseline[2]}")
+    print(f"{'alpha':>6} {'beta':>6} {'gamma':>6} {'top-k kept':>10} {'spearman':>9}  most exposed")
+    for g in np.argsort(result['topk_overlap'])[:args.show]:
+        alpha, beta, gamma = result['weights'][g]
+        top_courses = np.argsort(-result['exposure'][g])[:3]
+        exposed = ', '.join(f"{result['course_ids'][c]} {result['exposure'][g][c]:.0%}" for c in top_courses)
+        print(f"{alpha:6.2f} {beta:6.2f} {gamma:6.2f} {result['topk_overlap'][g]:10.3f} "
+              f"{result['rank_correlation'][g]:9.3f}  {exposed}")
+
+
+if __name__ == "__main__":
+    main()
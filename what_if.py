@@ -0,0 +1,120 @@
+"""
+What-if Simulation for Course Recommendation System
+Compares hypothetical pass/fail outcomes of a student's current courses
+"""
+
+from typing import Dict, List, Mapping
+
+from reasoning_engine import ReasoningEngine
+
+
+OUTCOMES = ('pass', 'fail')
+
+
+class WhatIfSimulator:
+    """
+    Diff hypothetical end-of-semester outcomes against the all-pass baseline
+
+    The baseline (every current course passed) is evaluated once per simulator.
+    A scenario failing some courses can only change eligibility of those courses,
+    their elective slot alternatives and their direct dependents, so only that part
+    of the prerequisite graph is re-evaluated; everything else is taken from the
+    baseline. One simulator can therefore compare many scenarios cheaply.
+    """
+
+    def __init__(self, engine: ReasoningEngine, student_data: Dict):
+        self.engine = engine
+        self.student_data = student_data
+        self.major = student_data.get('major')
+        self.cohort = student_data.get('cohort', 'K20')
+        self.current_semester = student_data.get('current_semester_number', 1)
+        self.current_courses = list(dict.fromkeys(student_data.get('current_courses', [])))
+
+        self._slot_groups = engine._get_elective_slot_groups(self.major, self.cohort)
+        self._major_order = {c['course_id']: i for i, c in enumerate(engine.get_courses_for_major(self.major))}
+
+        base_state = self._advance([])
+        self.base_eligible = {c['course_id'] for c in engine.get_eligible_courses(base_state)}
+        self.base_progress = engine.calculate_graduation_progress(base_state)
+
+    def _advance(self, failed_now: List[str]) -> Dict:
+        """Get the student state after this semester with failed_now failed and the rest passed"""
+        state = dict(self.student_data)
+        state['completed_courses'] = list(dict.fromkeys(
+            list(self.student_data.get('completed_courses', []))
+            + [c for c in self.current_courses if c not in failed_now]
+        ))
+        state['failed_courses'] = list(dict.fromkeys(
+            [c for c in self.student_data.get('failed_courses', []) if c not in state['completed_courses']]
+            + failed_now
+        ))
+        state['current_courses'] = []
+        return state
+
+    def _in_major_order(self, course_ids) -> List[str]:
+        return sorted(course_ids, key=self._major_order.__getitem__)
+
+    def simulate(self, outcomes: Mapping[str, str]) -> Dict:
+        """
+        Evaluate one scenario
+
+        Args:
+            outcomes: course_id -> 'pass' or 'fail' for current courses
+                      (courses not listed are assumed passed)
+
+        Returns:
+            Dictionary with the failed courses and their diffs against the baseline:
+            'eligibility' ('lost'/'gained' course ids), 'retake_semesters'
+            (course_id -> semester number), 'blocked_courses' (downstream courses
+            not yet completed) and 'progress' (credit deltas)
+        """
+        for course_id, outcome in outcomes.items():
+            if course_id not in self.current_courses:
+                raise ValueError(f"{course_id} is not a current course")
+            if outcome not in OUTCOMES:
+                raise ValueError(f"Unknown outcome '{outcome}' for {course_id} (expected one of {OUTCOMES})")
+
+        engine = self.engine
+        failed_now = [c for c in self.current_courses if outcomes.get(c, 'pass') == 'fail']
+        state = self._advance(failed_now)
+        completed = set(state['completed_courses'])
+        failed = set(state['failed_courses'])
+
+        # Only these courses can differ from the baseline
+        dependents = engine.get_prerequisite_dependents()
+        affected = set(failed_now)
+        for course_id in failed_now:
+            affected.update(dependents.get(course_id, ()))
+            affected.update(self._slot_groups.get(course_id, ()))
+        affected &= self._major_order.keys()
+        eligible = {c for c in affected
+                    if engine._is_course_eligible(c, completed, (), failed, self._slot_groups)}
+
+        progress = engine.calculate_graduation_progress(state)
+        base_progress = self.base_progress
+        return {
+            'failed': failed_now,
+            'eligibility': {
+                'lost': self._in_major_order((affected & self.base_eligible) - eligible),
+                # A failed course becoming eligible again is a retake, not a gain
+                'gained': self._in_major_order(eligible - self.base_eligible - set(failed_now))
+            },
+            'retake_semesters': {
+                c: engine.get_next_retake_semester(c, self.current_semester, self.major, self.cohort)
+                for c in failed_now
+            },
+            'blocked_courses': [c for c in engine.get_downstream_courses(failed_now)
+                                if c in self._major_order and c not in completed],
+            'progress': {
+                'total_completed': progress['total_completed'],
+                'total_delta': progress['total_completed'] - base_progress['total_completed'],
+                'category_deltas': {
+                    cat: data['completed'] - base_progress['categories'][cat]['completed']
+                    for cat, data in progress['categories'].items()
+                }
+            }
+        }
+
+    def compare(self, scenarios: List[Mapping[str, str]]) -> List[Dict]:
+        """Evaluate several scenarios against the shared baseline"""
+        return [self.simulate(outcomes) for outcomes in scenarios]